@@ -0,0 +1,272 @@
+"""
+ASGI entry point
+Serves the Flask app under an asyncio server:
+
+    gunicorn -c gunicorn_asgi.conf.py asgi:application
+
+Every existing route runs unchanged on a bounded thread pool (a2wsgi). The
+hottest student read endpoints are answered natively on the event loop with an
+async database driver (aiosqlite / asyncpg) and connection pool, sharing the
+read cache and ETags with the Flask handlers: payment details, transactions
+and complaints. The SSE event streams are also served on the event loop, so
+an open stream costs no thread.
+"""
+
+import asyncio
+import os
+import re
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import make_url, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.http import parse_cookie, parse_etags, quote_etag
+
+from events import AsyncSubscription, format_event, HEARTBEAT, RETRY
+from main import (app, cache, broadcaster, student_cache_key, student_etag, student_summary, year_wise_payments,
+                  ledger_paid_by_year, transaction_list, complaint_list, student_channel, EMPLOYEE_CHANNEL,
+                  Student, Transaction, Complaint)
+
+# Threads per process available to the synchronous Flask routes
+WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 16))
+ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 10))
+ASYNC_DB_MAX_OVERFLOW = int(os.environ.get('ASYNC_DB_MAX_OVERFLOW', 10))
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgres': 'postgresql+asyncpg',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+}
+
+# libpq connection parameters asyncpg does not accept as keyword arguments
+LIBPQ_ONLY_PARAMS = ('channel_binding', 'gssencmode', 'options', 'sslcert', 'sslcrl', 'sslkey',
+                     'sslrootcert', 'target_session_attrs')
+
+
+def async_database_url(url):
+    """Map the app's database URL to the matching async driver.
+
+    Returns ``(url, connect_args)``. Hosted PostgreSQL URLs carry libpq
+    options such as ``?sslmode=require`` that asyncpg rejects: ``sslmode``
+    becomes asyncpg's ``ssl``, ``connect_timeout`` its ``timeout`` and
+    ``application_name`` a server setting; the other libpq-only options are
+    dropped.
+    """
+    scheme, rest = url.split('://', 1)
+    if scheme not in ASYNC_DRIVERS:
+        raise RuntimeError(f'No async driver configured for {scheme} databases')
+    async_url = make_url(f'{ASYNC_DRIVERS[scheme]}://{rest}')
+    connect_args = {}
+    if async_url.get_backend_name() == 'postgresql':
+        query = dict(async_url.query)
+        if 'sslmode' in query:
+            connect_args['ssl'] = query.pop('sslmode')
+        if 'connect_timeout' in query:
+            connect_args['timeout'] = float(query.pop('connect_timeout'))
+        if 'application_name' in query:
+            connect_args['server_settings'] = {'application_name': query.pop('application_name')}
+        for name in LIBPQ_ONLY_PARAMS:
+            query.pop(name, None)
+        async_url = async_url.set(query=query)
+    return async_url, connect_args
+
+
+class AsyncReadApp:
+    """ASGI app that serves selected GET routes on the event loop and hands
+    everything else to the Flask WSGI app.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+        self.engine = None
+        self.routes = [
+            (re.compile(r'/api/student/payment-details/(?P<roll_number>[^/]+)'), self.student_payment_details),
+            (re.compile(r'/api/student/transactions/(?P<roll_number>[^/]+)'), self.student_transactions),
+            (re.compile(r'/api/student/complaints/(?P<roll_number>[^/]+)'), self.student_complaints),
+        ]
+        # Event streams: path -> channels for a session (None when not signed in)
+        self.streams = {
+            '/api/student/events':
+                lambda session: [student_channel(session['student_id'])] if 'student_id' in session else None,
+            '/api/employee/events':
+                lambda session: [EMPLOYEE_CHANNEL] if 'user_id' in session else None,
+        }
+
+    def get_engine(self):
+        # Created on first use so it binds to the worker's own event loop
+        if self.engine is None:
+            url, connect_args = async_database_url(self.flask_app.config['SQLALCHEMY_DATABASE_URI'])
+            self.engine = create_async_engine(
+                url,
+                connect_args=connect_args,
+                pool_size=ASYNC_DB_POOL_SIZE,
+                max_overflow=ASYNC_DB_MAX_OVERFLOW,
+                pool_pre_ping=True
+            )
+        return self.engine
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            if scope['path'] in self.streams:
+                return await self.stream(scope, receive, send, self.streams[scope['path']])
+            for pattern, handler in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match:
+                    return await self.respond(send, *await self.dispatch(handler, scope, **match.groupdict()))
+
+        return await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.engine is not None:
+                    await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def dispatch(self, handler, scope, **kwargs):
+        headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+        try:
+            return await handler(parse_etags(headers.get('if-none-match')), **kwargs)
+        except Exception as e:
+            self.flask_app.logger.error(f"Async handler error on {scope['path']}: {str(e)}")
+            return 500, {'success': False, 'message': 'Server error'}, None
+
+    async def respond(self, send, status, payload, etag):
+        headers = [(b'content-type', b'application/json')]
+        body = b''
+        if etag is not None:
+            headers.append((b'etag', quote_etag(etag).encode('latin-1')))
+            headers.append((b'cache-control', b'private, no-cache'))
+        if status != 304:
+            body = (self.flask_app.json.dumps(payload) + '\n').encode('utf-8')
+        headers.append((b'content-length', str(len(body)).encode('latin-1')))
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    def load_session(self, scope):
+        """Read the Flask session from the signed session cookie"""
+        headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+        value = parse_cookie(headers.get('cookie', '')).get(self.flask_app.config['SESSION_COOKIE_NAME'])
+        serializer = self.flask_app.session_interface.get_signing_serializer(self.flask_app)
+        if not value or serializer is None:
+            return {}
+        try:
+            return serializer.loads(value, max_age=int(self.flask_app.permanent_session_lifetime.total_seconds()))
+        except Exception:
+            return {}
+
+    async def stream(self, scope, receive, send, channels_for):
+        """Same event stream as main.event_stream, held open until the client disconnects"""
+        channels = channels_for(self.load_session(scope))
+        if channels is None:
+            return await self.respond(send, 401, {'success': False, 'message': 'Not authenticated'}, None)
+
+        async def wait_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        heartbeat = self.flask_app.config['EVENTS_HEARTBEAT_SECONDS']
+        subscription = broadcaster.subscribe(AsyncSubscription(channels, asyncio.get_running_loop()))
+        disconnected = asyncio.ensure_future(wait_disconnect())
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ]})
+            await send({'type': 'http.response.body', 'body': RETRY.encode('utf-8'), 'more_body': True})
+            while not subscription.overflowed:
+                getter = asyncio.ensure_future(subscription.get(heartbeat))
+                done, _ = await asyncio.wait({getter, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected in done:
+                    getter.cancel()
+                    return
+                message = getter.result()
+                frame = HEARTBEAT if message is None else format_event(message)
+                await send({'type': 'http.response.body', 'body': frame.encode('utf-8'), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            broadcaster.unsubscribe(subscription)
+            disconnected.cancel()
+
+    async def cached_read(self, if_none_match, roll_number, view, load):
+        """Shared cache/ETag flow of the student read endpoints"""
+        cache_key = student_cache_key(roll_number, view)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            if if_none_match.contains(cached['etag']):
+                return 304, None, cached['etag']
+            return 200, cached['payload'], cached['etag']
+
+        async with self.get_engine().connect() as connection:
+            student = (await connection.execute(
+                select(Student.id, Student.revision).where(Student.roll_number == roll_number)
+            )).first()
+            if not student:
+                return 404, {'success': False, 'message': 'Student not found'}, None
+
+            etag = student_etag(student, view)
+            if if_none_match.contains(etag):
+                return 304, None, etag
+
+            payload = await load(connection, student.id)
+
+        cache.set(cache_key, {'etag': etag, 'payload': payload})
+        return 200, payload, etag
+
+    async def student_payment_details(self, if_none_match, roll_number):
+        async def load(connection, student_id):
+            student = (await connection.execute(
+                select(Student.id, Student.name, Student.roll_number, Student.branch, Student.academic_year,
+                       Student.total_fees, Student.paid_amount, Student.pending_amount)
+                .where(Student.id == student_id)
+            )).first()
+            rows = (await connection.execute(
+                select(Transaction.transaction_id, Transaction.amount, Transaction.fee_type,
+                       Transaction.academic_year, Transaction.status, Transaction.date, Transaction.bill_number)
+                .where(Transaction.student_id == student_id)
+            )).all()
+            paid_by_year = dict((await connection.execute(ledger_paid_by_year(student_id))).all())
+            return {
+                'success': True,
+                'student': student_summary(student),
+                'yearWiseData': year_wise_payments(student, rows, paid_by_year)
+            }
+
+        return await self.cached_read(if_none_match, roll_number, 'payment-details', load)
+
+    async def student_transactions(self, if_none_match, roll_number):
+        async def load(connection, student_id):
+            rows = (await connection.execute(
+                select(Transaction.transaction_id, Transaction.amount, Transaction.fee_type,
+                       Transaction.academic_year, Transaction.status, Transaction.date)
+                .where(Transaction.student_id == student_id)
+            )).all()
+            return {'success': True, 'transactions': transaction_list(rows)}
+
+        return await self.cached_read(if_none_match, roll_number, 'transactions', load)
+
+    async def student_complaints(self, if_none_match, roll_number):
+        async def load(connection, student_id):
+            rows = (await connection.execute(
+                select(Complaint.complaint_id, Complaint.subject, Complaint.description,
+                       Complaint.status, Complaint.response, Complaint.created_at)
+                .where(Complaint.student_id == student_id)
+            )).all()
+            return {'success': True, 'complaints': complaint_list(rows)}
+
+        return await self.cached_read(if_none_match, roll_number, 'complaints', load)
+
+
+# Streams are served on the event loop here, so clients can always open them
+app.config['EVENTS_STREAMING'] = True
+application = AsyncReadApp(app)
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+API Route Benchmark Suite
+Seeds a synthetic dataset (students x academic years x transactions x
+complaints) into a dedicated database, starts the app under gunicorn and
+drives every /api route in main.py at each concurrency level. Records
+p50/p95/p99 latency, throughput, errors and server memory (current RSS per
+route, peak RSS for the run) and writes everything to a JSON file so runs can
+be compared between commits.
+
+Runs offline against a throwaway SQLite file (default) or a local Postgres
+database. The target database is dropped and recreated, never point it at
+real data.
+
+Usage:
+    python benchmarks/api_routes.py [--database-url postgresql://localhost/fees_bench]
+                                    [--students 2000] [--years 4] [--transactions 3]
+                                    [--complaints 1] [--concurrency 1,8,32]
+                                    [--requests 200] [--workers 2] [--routes student,health]
+                                    [--output results.json] [--compare baseline.json]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import signal
+import argparse
+import platform
+import itertools
+import subprocess
+import tempfile
+from datetime import datetime, date
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+BRANCHES = ['CSE', 'ECE', 'EEE', 'MECH', 'CIVIL', 'IT']
+CATEGORIES = ['GEN', 'OBC', 'SC', 'ST']
+FEE_TYPES = ['Tuition', 'Hostel', 'Transport', 'Exam']
+PASSWORD = 'vemuit@2008'
+EMPLOYEE_EMAIL = 'vemuit@gmail.com'
+
+
+def academic_years(count):
+    return [f'{2024 - k}-{(25 - k) % 100:02d}' for k in range(count)]
+
+
+def seed(students, years, transactions, complaints, batch_size=5000):
+    """Recreate the schema and fill it with a reproducible synthetic dataset.
+
+    Returns the ids of pending transactions, which the verify routes consume.
+    """
+    from sqlalchemy import bindparam, insert
+    from main import app, db, init_db, rebuild_fee_ledger, Student, Transaction, Complaint
+
+    rng = random.Random(42)
+    year_list = academic_years(years)
+
+    def flush(model, rows):
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(insert(model), rows[start:start + batch_size])
+        rows.clear()
+
+    init_db()
+    with app.app_context():
+        student_rows = [{
+            'name': f'Student {i}',
+            'roll_number': f'BENCH{i:06d}',
+            'gender': rng.choice(['M', 'F']),
+            'category': rng.choice(CATEGORIES),
+            'academic_year': rng.choice(year_list),
+            'branch': rng.choice(BRANCHES),
+            'total_fees': 100000 * years,
+            'paid_amount': 0,
+            'pending_amount': 100000 * years,
+        } for i in range(students)]
+        flush(Student, student_rows)
+        db.session.commit()
+
+        transaction_rows, complaint_rows, paid = [], [], {}
+        transaction_numbers = itertools.count()
+        for student_id, in db.session.query(Student.id).order_by(Student.id):
+            for year in year_list:
+                for _ in range(transactions):
+                    status = rng.choices(['verified', 'pending', 'rejected'], [7, 2, 1])[0]
+                    amount = rng.choice([5000, 10000, 25000])
+                    transaction_rows.append({
+                        'transaction_id': f'TXN{next(transaction_numbers):09d}B',
+                        'student_id': student_id,
+                        'amount': amount,
+                        'fee_type': rng.choice(FEE_TYPES),
+                        'academic_year': year,
+                        'utr_number': f'UTR{rng.getrandbits(48)}',
+                        'mobile_number': '9999999999',
+                        'date': date(int(year[:4]), rng.randint(1, 12), rng.randint(1, 28)),
+                        'status': status,
+                        'created_at': datetime.utcnow(),
+                    })
+                    if status == 'verified':
+                        paid[student_id] = paid.get(student_id, 0) + amount
+            for _ in range(complaints):
+                complaint_rows.append({
+                    'complaint_id': f'COMP{len(complaint_rows):08d}B',
+                    'student_id': student_id,
+                    'subject': 'Fee receipt missing',
+                    'description': 'Payment verified but no receipt was issued.',
+                    'status': rng.choice(['pending', 'resolved']),
+                    'created_at': datetime.utcnow(),
+                })
+            if len(transaction_rows) >= batch_size:
+                flush(Transaction, transaction_rows)
+        flush(Transaction, transaction_rows)
+        flush(Complaint, complaint_rows)
+
+        db.session.execute(
+            Student.__table__.update()
+            .where(Student.id == bindparam('sid'))
+            .values(paid_amount=bindparam('paid'), pending_amount=100000 * years - bindparam('paid')),
+            [{'sid': student_id, 'paid': amount} for student_id, amount in paid.items()]
+        )
+        db.session.commit()
+        rebuild_fee_ledger()
+
+        pending = [transaction_id for transaction_id, in db.session.query(Transaction.transaction_id)
+                   .filter(Transaction.status == 'pending')]
+        db.engine.dispose()
+    rng.shuffle(pending)
+    return pending
+
+
+class Workload:
+    """Request factories for every /api route, sharing a pool of pending transactions"""
+
+    def __init__(self, students, years, pending):
+        self.students = students
+        self.years = academic_years(years)
+        self.pending = iter(pending)
+        self.counter = itertools.count()
+
+    def roll(self):
+        return f'BENCH{random.randrange(self.students):06d}'
+
+    def unique(self):
+        return f'{os.getpid()}{next(self.counter)}'
+
+    def next_pending(self):
+        return next(self.pending, 'TXN-EXHAUSTED')
+
+    def routes(self):
+        """(name, login, expected statuses, build) where build returns (method, path, kwargs)"""
+        student_save = lambda: ('POST', '/api/student/save', {'json': {
+            'rollNumber': self.roll(), 'name': 'Updated Name', 'branch': random.choice(BRANCHES),
+            'academicYear': random.choice(self.years), 'category': random.choice(CATEGORIES),
+            'totalAmount': 400000, 'paidAmount': 0, 'pendingAmount': 400000}})
+        filters = lambda: {'branch': random.choice(BRANCHES), 'academicYear': random.choice(self.years)}
+        import_file = lambda: ('POST', '/api/students/import', {'files': {'file': (
+            'students.csv',
+            'Roll Number,Name,Branch,Academic Year,Category,Total Fees\n' + ''.join(
+                f'IMP{self.unique()},Imported,CSE,{self.years[0]},GEN,100000\n' for _ in range(50)),
+            'text/csv')}})
+
+        return [
+            ('student.auth', None, {200}, lambda: ('POST', '/api/student/auth', {'json': {
+                'rollNumber': self.roll(), 'password': PASSWORD}})),
+            ('student.payment-details', None, {200},
+             lambda: ('GET', f'/api/student/payment-details/{self.roll()}', {})),
+            ('student.dashboard', None, {200}, lambda: ('GET', f'/api/student/dashboard/{self.roll()}', {})),
+            ('student.transactions', None, {200},
+             lambda: ('GET', f'/api/student/transactions/{self.roll()}', {})),
+            ('student.complaints', None, {200},
+             lambda: ('GET', f'/api/student/complaints/{self.roll()}', {})),
+            ('student.submit-transaction', None, {200}, lambda: ('POST', '/api/student/submit-transaction', {
+                'json': {'rollNumber': self.roll(), 'paidAmount': 5000, 'feeType': random.choice(FEE_TYPES),
+                         'academicYear': random.choice(self.years), 'utrNumber': f'UTR{self.unique()}',
+                         'mobileNumber': '9999999999', 'transDate': '2024-07-01'}})),
+            ('student.complaint', 'student', {200}, lambda: ('POST', '/api/student/complaint', {'json': {
+                'subject': 'Benchmark', 'description': 'Synthetic complaint'}})),
+            ('student.save', None, {200}, student_save),
+            ('verify-transaction', None, {200}, lambda: ('POST', '/api/verify-transaction', {'json': {
+                'transactionId': self.next_pending(), 'action': random.choice(['verify', 'reject'])}})),
+            ('verify-transactions.bulk', None, {200}, lambda: ('POST', '/api/verify-transactions/bulk', {
+                'json': {'transactions': [{'transactionId': self.next_pending(), 'action': 'verify'}
+                                          for _ in range(20)]}})),
+            ('students.list', None, {200}, lambda: ('GET', '/api/students/list?limit=500', {})),
+            ('students.filter', None, {200}, lambda: ('POST', '/api/students/filter', {'json': filters()})),
+            ('students.export.csv', None, {200}, lambda: ('GET', '/api/students/export', {'params': filters()})),
+            ('students.export.xlsx', None, {200},
+             lambda: ('GET', '/api/students/export', {'params': dict(filters(), format='xlsx')})),
+            ('transactions.export', None, {200}, lambda: ('GET', '/api/transactions/export', {
+                'params': {'branch': random.choice(BRANCHES), 'status': 'verified'}})),
+            ('students.create', None, {201}, lambda: ('POST', '/api/students', {'json': {
+                'name': 'New Student', 'rollNumber': f'NEW{self.unique()}', 'gender': 'F', 'category': 'GEN',
+                'academicYear': self.years[0], 'branch': 'CSE', 'feeType': 'Tuition', 'billNumber': None,
+                'totalAmount': 100000, 'paidAmount': 0}})),
+            ('students.import', None, {200}, import_file),
+            ('employee.auth', None, {200}, lambda: ('POST', '/api/employee/auth', {'json': {
+                'email': EMPLOYEE_EMAIL, 'password': PASSWORD}})),
+            ('employee.session', 'employee', {200}, lambda: ('GET', '/api/employee/session', {})),
+            ('employee.register', None, {200}, lambda: ('POST', '/api/employee/register', {'json': dict(
+                zip(['username', 'email'], [f'bench{self.unique()}'] * 2), password='pw-benchmark')})),
+            ('employee.register-auth', None, {200}, lambda: ('POST', '/api/employee/register-auth', {'json': {
+                'email': EMPLOYEE_EMAIL, 'authMethod': 'face', 'faceData': 'synthetic'}})),
+            ('employee.check-registration', None, {200},
+             lambda: ('POST', '/api/employee/check-registration', {'json': {'email': EMPLOYEE_EMAIL}})),
+            ('employee.create-demo-user', None, {200},
+             lambda: ('POST', '/api/employee/create-demo-user', {})),
+            ('logout', None, {200}, lambda: ('GET', '/api/logout', {})),
+            ('health.db', None, {200}, lambda: ('GET', '/api/health/db', {})),
+            ('health.hashing', None, {200}, lambda: ('GET', '/api/health/hashing', {})),
+        ]
+
+
+def login(http, base_url, kind, workload):
+    if kind == 'student':
+        http.post(f'{base_url}/api/student/auth', json={'rollNumber': workload.roll(), 'password': PASSWORD})
+    elif kind == 'employee':
+        http.post(f'{base_url}/api/employee/auth', json={'email': EMPLOYEE_EMAIL, 'password': PASSWORD})
+
+
+def percentile(sorted_values, fraction):
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index] * 1000
+
+
+def drive(base_url, route, concurrency, total, workload):
+    """Send ``total`` requests for one route with ``concurrency`` in flight"""
+    name, login_as, expected, build = route
+    sessions = []
+    for _ in range(concurrency):
+        http = requests.Session()
+        login(http, base_url, login_as, workload)
+        sessions.append(http)
+
+    def one(index):
+        http = sessions[index % concurrency]
+        method, path, kwargs = build()
+        started = time.perf_counter()
+        try:
+            response = http.request(method, base_url + path, timeout=120, **kwargs)
+            ok = response.status_code in expected
+            size = len(response.content)
+        except requests.RequestException:
+            ok, size = False, 0
+        return time.perf_counter() - started, ok, size
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _, _ in results)
+    return {
+        'requests': total,
+        'errors': sum(1 for _, ok, _ in results if not ok),
+        'throughput': round(total / elapsed, 2),
+        'p50': round(percentile(latencies, 0.50), 2),
+        'p95': round(percentile(latencies, 0.95), 2),
+        'p99': round(percentile(latencies, 0.99), 2),
+        'bytesPerResponse': sum(size for _, _, size in results) // total,
+    }
+
+
+def server_memory(pid):
+    """(current RSS, peak RSS) in MB summed over the gunicorn master and workers (Linux)"""
+    def read_kb(process, field):
+        try:
+            with open(f'/proc/{process}/status') as status:
+                for line in status:
+                    if line.startswith(field):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as children:
+            processes = [pid] + [int(child) for child in children.read().split()]
+    except OSError:
+        return None, None
+    return (round(sum(read_kb(p, 'VmRSS:') for p in processes) / 1024, 1),
+            round(sum(read_kb(p, 'VmHWM:') for p in processes) / 1024, 1))
+
+
+def start_server(env, port, workers, threads):
+    command = ['gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+               '--threads', str(threads), '--timeout', '300', 'main:app']
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, start_new_session=True)
+    for _ in range(200):
+        try:
+            requests.get(f'http://127.0.0.1:{port}/api/logout', timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.1)
+    os.killpg(process.pid, signal.SIGTERM)
+    raise RuntimeError('server did not start')
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    """Print p95 and throughput change per route/concurrency against an earlier run"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline['meta'].get('commit')})")
+    print(f"{'route':<30} {'conc':>5} {'p95 ms':>18} {'req/s':>20}")
+    for name, levels in current['routes'].items():
+        for concurrency, result in levels.items():
+            old = baseline['routes'].get(name, {}).get(concurrency)
+            if not old:
+                continue
+            p95_change = (result['p95'] - old['p95']) / old['p95'] * 100 if old['p95'] else 0
+            rps_change = (result['throughput'] - old['throughput']) / old['throughput'] * 100 \
+                if old['throughput'] else 0
+            print(f"{name:<30} {concurrency:>5} {old['p95']:>7.1f} -> {result['p95']:>7.1f} "
+                  f"{old['throughput']:>7.1f} -> {result['throughput']:>7.1f} "
+                  f"({p95_change:+.0f}% / {rps_change:+.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every /api route')
+    parser.add_argument('--database-url', help='benchmark database (default: a temporary SQLite file); '
+                                                'it is dropped and recreated')
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--years', type=int, default=4, help='academic years per student')
+    parser.add_argument('--transactions', type=int, default=3, help='transactions per student per year')
+    parser.add_argument('--complaints', type=int, default=1, help='complaints per student')
+    parser.add_argument('--concurrency', default='1,8,32', help='comma separated levels')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route per level')
+    parser.add_argument('--routes', help='comma separated route name prefixes to run (default: all)')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=1, help='threads per gunicorn worker')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<commit>-<dialect>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    temp_dir = None
+    database_url = args.database_url
+    if not database_url:
+        temp_dir = tempfile.TemporaryDirectory()
+        database_url = f"sqlite:///{os.path.join(temp_dir.name, 'bench.db')}"
+    dialect = database_url.split(':', 1)[0].split('+', 1)[0]
+
+    # The server and the seeding code below both read the app config from the environment
+    os.environ.update({
+        'FLASK_ENV': 'production',
+        'DATABASE_URL': database_url,
+        'SECRET_KEY': 'benchmark-secret-key',
+    })
+    env = dict(os.environ)
+
+    print(f"Seeding {args.students} students x {args.years} years x {args.transactions} transactions "
+          f"into {dialect}...")
+    started = time.perf_counter()
+    pending = seed(args.students, args.years, args.transactions, args.complaints)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s ({len(pending)} pending transactions)")
+
+    workload = Workload(args.students, args.years, pending)
+    routes = workload.routes()
+    if args.routes:
+        prefixes = tuple(args.routes.split(','))
+        routes = [route for route in routes if route[0].startswith(prefixes)]
+    levels = [int(c) for c in args.concurrency.split(',')]
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'database': dialect,
+            'dataset': {'students': args.students, 'years': args.years,
+                        'transactionsPerYear': args.transactions, 'complaints': args.complaints},
+            'server': {'workers': args.workers, 'threads': args.threads},
+            'requestsPerLevel': args.requests,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'routes': {},
+    }
+
+    base_url = f'http://127.0.0.1:{args.port}'
+    process = start_server(env, args.port, args.workers, args.threads)
+    try:
+        print(f"{'route':<30} {'conc':>5} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5} {'rss MB':>8}")
+        for route in routes:
+            name = route[0]
+            results['routes'][name] = {}
+            drive(base_url, route, 1, 3, workload)  # warm up
+            for concurrency in levels:
+                result = drive(base_url, route, concurrency, args.requests, workload)
+                result['rssMb'] = server_memory(process.pid)[0]
+                results['routes'][name][str(concurrency)] = result
+                print(f"{name:<30} {concurrency:>5} {result['throughput']:>9.1f} {result['p50']:>8.1f} "
+                      f"{result['p95']:>8.1f} {result['p99']:>8.1f} {result['errors']:>5} "
+                      f"{result['rssMb'] or 0:>8.1f}")
+        results['meta']['peakRssMb'] = server_memory(process.pid)[1]
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+        if temp_dir:
+            temp_dir.cleanup()
+
+    output = args.output or os.path.join(BASE_DIR, 'benchmarks', 'results',
+                                         f"{results['meta']['commit'] or 'unknown'}-{dialect}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nPeak server RSS: {results['meta']['peakRssMb']} MB")
+    print(f"Results written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
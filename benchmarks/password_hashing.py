@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Password Hashing Benchmark
+Measures employee logins/sec (password verifications) through the hashing
+pool at several pool sizes, with a fixed number of concurrent callers.
+
+Usage:
+    python benchmarks/password_hashing.py [--workers 0,1,2,4] [--clients 16]
+                                          [--logins 200] [--method pbkdf2:sha256:600000]
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from password_hashing import PasswordHasher
+
+
+def run(workers, clients, logins, method):
+    """Return logins/sec for one pool size"""
+    hasher = PasswordHasher(method=method, max_workers=workers, max_queue=clients, timeout=600)
+    pwhash = hasher.hash('benchmark-password')
+    hasher.verify(pwhash, 'benchmark-password')  # start the pool before timing
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(lambda _: hasher.verify(pwhash, 'benchmark-password'), range(logins)))
+    elapsed = time.perf_counter() - started
+
+    hasher.shutdown()
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark password verification throughput')
+    parser.add_argument('--workers', default='0,1,2,4',
+                        help='comma separated pool sizes (0 = hash inline in the caller)')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent login requests')
+    parser.add_argument('--logins', type=int, default=200, help='logins per run')
+    parser.add_argument('--method', default='pbkdf2:sha256:600000', help='werkzeug hash method')
+    args = parser.parse_args()
+
+    print(f"Password hashing benchmark ({args.method}, {args.clients} clients, "
+          f"{args.logins} logins, {os.cpu_count()} CPUs)")
+    print("=" * 50)
+    for workers in [int(w) for w in args.workers.split(',')]:
+        label = 'inline' if workers == 0 else f'{workers} workers'
+        print(f"{label:>12}: {run(workers, args.clients, args.logins, args.method):8.1f} logins/sec")
+
+
+if __name__ == "__main__":
+    main()
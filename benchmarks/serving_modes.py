@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Serving Mode Load Test
+Starts the app once with sync gunicorn workers (the Procfile default) and once
+in the asyncio mode (gunicorn_asgi.conf.py), then drives the same GET
+endpoint at increasing concurrency and reports requests/sec and p95 latency
+per worker process.
+
+Both servers use the database configured for the app, so seed a student
+first (e.g. flask import-students) and pass its roll number.
+
+Usage:
+    python benchmarks/serving_modes.py --roll-number 21A91A0501
+                                       [--workers 2] [--concurrency 8,32,128]
+                                       [--requests 2000]
+"""
+
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'sync': ['gunicorn', '--bind', '127.0.0.1:{port}', '--workers', '{workers}', 'main:app'],
+    'asgi': ['gunicorn', '-c', 'gunicorn_asgi.conf.py', '--bind', '127.0.0.1:{port}',
+             '--workers', '{workers}', 'asgi:application'],
+}
+
+
+def start_server(mode, port, workers):
+    command = [part.format(port=port, workers=workers) for part in MODES[mode]]
+    process = subprocess.Popen(command, cwd=BASE_DIR, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, start_new_session=True)
+    for _ in range(100):
+        try:
+            requests.get(f'http://127.0.0.1:{port}/api/logout', timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.1)
+    stop_server(process)
+    raise RuntimeError(f'{mode} server did not start')
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait(timeout=30)
+
+
+def drive(url, concurrency, total):
+    """Send ``total`` GETs with ``concurrency`` in flight; return (req/s, p95 ms, errors)"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+
+    def one(_):
+        started = time.perf_counter()
+        try:
+            ok = session.get(url, timeout=30).status_code == 200
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    errors = sum(1 for _, ok in results if not ok)
+    return total / elapsed, p95, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare sync and asyncio serving modes')
+    parser.add_argument('--roll-number', required=True, help='student to read')
+    parser.add_argument('--path', default='/api/student/transactions/{roll_number}',
+                        help='endpoint to load (default: student transactions)')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--concurrency', default='8,32,128', help='comma separated levels')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per level')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    path = args.path.format(roll_number=args.roll_number)
+    print(f"Serving mode load test: GET {path}, {args.workers} workers, {args.requests} requests/level")
+    print("=" * 70)
+    print(f"{'mode':>6} {'concurrency':>12} {'req/s':>10} {'req/s/worker':>14} {'p95 ms':>10} {'errors':>8}")
+
+    for mode in MODES:
+        process = start_server(mode, args.port, args.workers)
+        try:
+            url = f'http://127.0.0.1:{args.port}{path}'
+            drive(url, 4, 50)  # warm up pools and caches
+            for concurrency in [int(c) for c in args.concurrency.split(',')]:
+                rps, p95, errors = drive(url, concurrency, args.requests)
+                print(f"{mode:>6} {concurrency:>12} {rps:>10.1f} {rps / args.workers:>14.1f} "
+                      f"{p95:>10.1f} {errors:>8}")
+        finally:
+            stop_server(process)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+SQLite Write Contention Benchmark
+Runs the same payment workload (submit a transaction, then verify it) against
+a fresh SQLite database twice: once with the default settings and once with
+SQLITE_TUNING=true (WAL, tuned PRAGMAs, single writer thread with group
+commit). Several worker processes with several threads each drive the app
+through the Flask test client, so lock contention is real but no HTTP server
+is needed. Reports writes/sec, p50/p95 latency and failed requests per mode.
+
+Usage:
+    python benchmarks/sqlite_writes.py [--processes 4] [--threads 8]
+                                       [--payments 100] [--students 200]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+MODES = {'default': 'false', 'tuned': 'true'}
+
+
+def mode_environment(database_path, tuning):
+    env = dict(os.environ)
+    env.update({
+        'FLASK_ENV': 'production',
+        'DATABASE_URL': f'sqlite:///{database_path}',
+        'SQLITE_TUNING': tuning,
+        'CACHE_BACKEND': 'none',
+    })
+    return env
+
+
+def setup(students):
+    """Create the schema and seed students (runs in a child process)"""
+    from main import app, db, Student
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(Student(
+            name=f'Student {i}',
+            roll_number=f'BENCH{i:05d}',
+            category='GEN',
+            academic_year='2024-25',
+            branch='CSE',
+            total_fees=100000,
+            paid_amount=0,
+            pending_amount=100000
+        ) for i in range(students))
+        db.session.commit()
+
+
+def worker(threads, payments, students):
+    """Submit and verify ``payments`` transactions per thread; print results as JSON"""
+    from main import app
+
+    def run(_):
+        client = app.test_client()
+        latencies, failures = [], 0
+        for _ in range(payments):
+            started = time.perf_counter()
+            response = client.post('/api/student/submit-transaction', json={
+                'rollNumber': f'BENCH{random.randrange(students):05d}',
+                'paidAmount': 100,
+                'feeType': 'Tuition',
+                'academicYear': '2024-25',
+                'utrNumber': f'UTR{random.getrandbits(48)}',
+                'mobileNumber': '9999999999',
+                'transDate': '2024-07-01'
+            })
+            if response.status_code == 200:
+                response = client.post('/api/verify-transaction', json={
+                    'transactionId': response.get_json()['transaction']['id'],
+                    'action': 'verify'
+                })
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                failures += 1
+        return latencies, failures
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(run, range(threads)))
+
+    print(json.dumps({
+        'latencies': [latency for latencies, _ in results for latency in latencies],
+        'failures': sum(failures for _, failures in results)
+    }))
+
+
+def run_mode(tuning, args):
+    with tempfile.TemporaryDirectory() as directory:
+        env = mode_environment(os.path.join(directory, 'bench.db'), tuning)
+        script = os.path.abspath(__file__)
+        subprocess.run([sys.executable, script, '--setup', '--students', str(args.students)],
+                       env=env, cwd=BASE_DIR, check=True)
+
+        started = time.perf_counter()
+        processes = [
+            subprocess.Popen([sys.executable, script, '--worker', '--threads', str(args.threads),
+                              '--payments', str(args.payments), '--students', str(args.students)],
+                             env=env, cwd=BASE_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            for _ in range(args.processes)
+        ]
+        outputs = [json.loads(process.communicate()[0].decode().strip().splitlines()[-1])
+                   for process in processes]
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for output in outputs for latency in output['latencies'])
+    failures = sum(output['failures'] for output in outputs)
+    return {
+        'payments': len(latencies),
+        'paymentsPerSecond': (len(latencies) - failures) / elapsed,
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'failures': failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare default and tuned SQLite write throughput')
+    parser.add_argument('--processes', type=int, default=4, help='worker processes (like gunicorn workers)')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent requests per process')
+    parser.add_argument('--payments', type=int, default=100, help='submit+verify pairs per thread')
+    parser.add_argument('--students', type=int, default=200, help='students to spread payments over')
+    parser.add_argument('--setup', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.setup:
+        return setup(args.students)
+    if args.worker:
+        return worker(args.threads, args.payments, args.students)
+
+    print(f"SQLite write benchmark: {args.processes} processes x {args.threads} threads, "
+          f"{args.payments} payments each (submit + verify)")
+    print("=" * 70)
+    print(f"{'mode':>8} {'payments':>10} {'payments/s':>12} {'p50 ms':>10} {'p95 ms':>10} {'failed':>8}")
+    for mode, tuning in MODES.items():
+        result = run_mode(tuning, args)
+        print(f"{mode:>8} {result['payments']:>10} {result['paymentsPerSecond']:>12.1f} "
+              f"{result['p50']:>10.1f} {result['p95']:>10.1f} {result['failures']:>8}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Response cache backends
+An in-process LRU cache with per-entry TTL (default) and an optional Redis
+backend that is shared between worker processes.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe in-process cache that evicts the least recently used entry
+    once ``max_entries`` is reached and expires entries after ``ttl`` seconds.
+
+    Each gunicorn worker holds its own copy, so writes handled by one worker
+    only invalidate that worker's entries; the TTL bounds staleness elsewhere.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """Cache shared by all workers, stored as JSON in Redis"""
+
+    def __init__(self, url, ttl=60, prefix='fees:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_BACKEND=redis requires the redis package (pip install redis)')
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, json.dumps(value), ex=ttl or self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + '*'):
+            self._client.delete(key)
+
+
+class NullCache:
+    """Cache that stores nothing (CACHE_BACKEND=none)"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+def create_cache(config):
+    """Build the cache backend selected by the app config"""
+    backend = config.get('CACHE_BACKEND', 'memory')
+    ttl = config.get('CACHE_TTL', 60)
+    if backend == 'redis':
+        return RedisCache(config['CACHE_REDIS_URL'], ttl=ttl)
+    if backend == 'none':
+        return NullCache()
+    return LRUCache(max_entries=config.get('CACHE_MAX_ENTRIES', 10000), ttl=ttl)
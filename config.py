@@ -2,6 +2,43 @@ import os
 from datetime import timedelta
 import secrets
 
+def build_engine_options(database_uri, pool_size=5, max_overflow=10, pool_recycle=1800,
+                         pool_timeout=30, statement_timeout_ms=30000, connect_timeout=10):
+    """Build SQLALCHEMY_ENGINE_OPTIONS for a database URL.
+
+    Every value can be overridden with DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE, DB_POOL_TIMEOUT, DB_STATEMENT_TIMEOUT_MS and
+    DB_CONNECT_TIMEOUT environment variables.
+    """
+    # Drop connections the server (or a proxy) closed while idle before using them
+    options = {'pool_pre_ping': True}
+    if database_uri.startswith('sqlite'):
+        return options
+
+    statement_timeout_ms = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', statement_timeout_ms))
+    connect_timeout = int(os.environ.get('DB_CONNECT_TIMEOUT', connect_timeout))
+    options.update(
+        pool_size=int(os.environ.get('DB_POOL_SIZE', pool_size)),
+        max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', max_overflow)),
+        pool_recycle=int(os.environ.get('DB_POOL_RECYCLE', pool_recycle)),
+        pool_timeout=int(os.environ.get('DB_POOL_TIMEOUT', pool_timeout)),
+    )
+
+    if database_uri.startswith('postgres'):
+        options['connect_args'] = {
+            'connect_timeout': connect_timeout,
+            'options': f'-c statement_timeout={statement_timeout_ms}',
+            # Detect half-open connections instead of hanging on them
+            'keepalives': 1,
+            'keepalives_idle': 30,
+        }
+    elif database_uri.startswith('mysql'):
+        options['connect_args'] = {
+            'connect_timeout': connect_timeout,
+            'init_command': f'SET SESSION max_execution_time={statement_timeout_ms}',
+        }
+    return options
+
 class Config:
     """Base configuration class"""
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -31,31 +68,48 @@ class ProductionConfig(Config):
     DATABASE_URL = os.environ.get('DATABASE_URL')
     
     if DATABASE_URL:
-        # Use cloud database
-        SQLALCHEMY_DATABASE_URI = DATABASE_URL
+        # Use cloud database (SQLAlchemy only accepts the postgresql:// scheme)
+        SQLALCHEMY_DATABASE_URI = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
     else:
         # Fallback to SQLite
         SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(Config.BASE_DIR, "instance", "fee_management.db")}'
 
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
+
 class RailwayConfig(ProductionConfig):
     """Railway.app specific configuration"""
     # Railway automatically provides DATABASE_URL environment variable
-    pass
+    # Long-lived containers talking to a dedicated Postgres: a larger steady pool
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(
+        ProductionConfig.SQLALCHEMY_DATABASE_URI, pool_size=10, max_overflow=10, pool_recycle=1800
+    )
 
 class SupabaseConfig(ProductionConfig):
     """Supabase specific configuration"""
     # Supabase provides PostgreSQL connection string
-    pass
+    # Connections usually go through the Supavisor pooler, which has its own
+    # connection limit, so keep the app-side pool small and recycle often
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(
+        ProductionConfig.SQLALCHEMY_DATABASE_URI, pool_size=5, max_overflow=5, pool_recycle=600
+    )
 
 class NeonConfig(ProductionConfig):
     """Neon.tech specific configuration"""
     # Neon provides PostgreSQL connection string
-    pass
+    # Serverless compute suspends when idle and drops connections; recycle
+    # before that happens and allow time for a cold start on connect
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(
+        ProductionConfig.SQLALCHEMY_DATABASE_URI, pool_size=3, max_overflow=7, pool_recycle=240,
+        connect_timeout=20
+    )
 
 class PlanetScaleConfig(ProductionConfig):
     """PlanetScale specific configuration"""
     # PlanetScale provides MySQL connection string
-    pass
+    # Idle connections are closed server-side, so recycle well before that
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(
+        ProductionConfig.SQLALCHEMY_DATABASE_URI, pool_size=5, max_overflow=10, pool_recycle=280
+    )
 
 # Configuration dictionary
 config = {
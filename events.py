@@ -0,0 +1,169 @@
+"""
+Server-sent events
+One broadcaster per process fans published events out to the SSE streams
+open in that process. Publishing goes through a backend: the local backend
+only reaches streams of the publishing process, the redis backend relays
+every event through Redis pub/sub so streams in all workers receive it.
+"""
+
+import asyncio
+import json
+import queue
+import threading
+import time
+
+# Comment line sent while idle so proxies keep the connection open
+HEARTBEAT = ': ping\n\n'
+# Tells EventSource how long to wait before reconnecting (ms)
+RETRY = 'retry: 5000\n\n'
+
+
+def format_event(message):
+    """Serialize ``{'event', 'data'}`` as one SSE frame"""
+    return f"event: {message['event']}\ndata: {json.dumps(message['data'], separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """Events for one open stream, read by a request thread.
+
+    A stream that falls ``max_queue`` events behind is marked overflowed and
+    should be closed; the client reconnects and refetches.
+    """
+
+    def __init__(self, channels, max_queue=100):
+        self.channels = frozenset(channels)
+        self.overflowed = False
+        self._queue = queue.Queue(max_queue)
+
+    def put(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    """Same as Subscription for a stream served on an asyncio event loop"""
+
+    def __init__(self, channels, loop, max_queue=100):
+        self.channels = frozenset(channels)
+        self.overflowed = False
+        self._loop = loop
+        self._queue = asyncio.Queue(max_queue)
+
+    def put(self, message):
+        # Called from whichever thread published
+        self._loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBackend:
+    """Deliver events to this process only (EVENTS_BACKEND=local)"""
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, channel, message):
+        self._deliver(channel, message)
+
+
+class RedisBackend:
+    """Relay events between processes through Redis pub/sub (EVENTS_BACKEND=redis)"""
+
+    def __init__(self, url, prefix='fees:events:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('EVENTS_BACKEND=redis requires the redis package (pip install redis)')
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._deliver = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def ensure_listening(self):
+        # Started on the first subscriber so each forked worker gets its own listener
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._listen, name='events-redis', daemon=True)
+                self._thread.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + '*')
+                for item in pubsub.listen():
+                    channel = item['channel'].decode('utf-8')[len(self.prefix):]
+                    self._deliver(channel, json.loads(item['data']))
+            except Exception:
+                time.sleep(1)
+
+    def publish(self, channel, message):
+        self._client.publish(self.prefix + channel, json.dumps(message))
+
+
+class Broadcaster:
+    def __init__(self, backend=None):
+        self.backend = backend or LocalBackend()
+        self.backend.start(self.deliver)
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscription):
+        if hasattr(self.backend, 'ensure_listening'):
+            self.backend.ensure_listening()
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def publish(self, channel, event, data):
+        """Send an event to every stream subscribed to ``channel``"""
+        self.backend.publish(channel, {'event': event, 'data': data})
+
+    def deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def stats(self):
+        with self._lock:
+            return {'streams': len({s for subscribers in self._channels.values() for s in subscribers})}
+
+
+def create_broadcaster(config):
+    """Build the broadcaster with the backend selected by the app config"""
+    if config.get('EVENTS_BACKEND', 'local') == 'redis':
+        return Broadcaster(RedisBackend(config['EVENTS_REDIS_URL']))
+    return Broadcaster(LocalBackend())
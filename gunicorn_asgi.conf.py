@@ -0,0 +1,20 @@
+"""
+Gunicorn configuration for the asyncio serving mode
+Usage: gunicorn -c gunicorn_asgi.conf.py asgi:application
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'uvicorn_worker.UvicornWorker'
+
+# Keep-alive connections are cheap for an event loop worker
+keepalive = 5
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+
+# Restart workers periodically to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = 1000
@@ -0,0 +1,123 @@
+"""
+Idempotency keys
+A request sent with an ``Idempotency-Key`` header is recorded together with a
+hash of its body. Repeating the key returns the stored response instead of
+running the request again, so a client can safely retry a payment submission
+or verification after a timeout. Records expire after a TTL and are evicted
+periodically; a request that died half-way releases its key after a lock
+timeout.
+
+Nothing here knows about the app's models; the app passes in the key table.
+"""
+
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+IN_PROGRESS = 'in_progress'
+COMPLETED = 'completed'
+
+# Outcomes of IdempotencyStore.begin
+STARTED = 'started'
+REPLAY = 'replay'
+BUSY = 'busy'
+MISMATCH = 'mismatch'
+
+
+def request_fingerprint(method, path, body):
+    """Hash identifying a request, compared when a key is reused"""
+    digest = hashlib.sha256(f'{method} {path}\n'.encode('utf-8'))
+    digest.update(body or b'')
+    return digest.hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, engine, table, ttl_seconds=86400, lock_seconds=60, purge_interval=300):
+        self.engine = engine
+        self.table = table
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.lock = timedelta(seconds=lock_seconds)
+        self.purge_interval = timedelta(seconds=purge_interval)
+        self._next_purge = datetime.utcnow()
+        self._purge_lock = threading.Lock()
+
+    def begin(self, key, fingerprint):
+        """Claim ``key`` for a request; returns ``(outcome, record)``.
+
+        STARTED: run the request, then call ``complete`` or ``release``.
+        REPLAY: ``record`` holds the stored response. BUSY: the first request
+        with this key is still running. MISMATCH: the key was used for a
+        different request.
+        """
+        self._maybe_purge()
+        now = datetime.utcnow()
+        t = self.table
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(insert(t).values(
+                    key=key, fingerprint=fingerprint, status=IN_PROGRESS,
+                    created_at=now, locked_until=now + self.lock, expires_at=now + self.ttl
+                ))
+            return STARTED, None
+        except IntegrityError:
+            pass
+
+        with self.engine.begin() as connection:
+            # Take over a key that expired or whose request never finished
+            taken = connection.execute(
+                update(t).where(
+                    t.c.key == key,
+                    (t.c.expires_at <= now) | ((t.c.status == IN_PROGRESS) & (t.c.locked_until <= now))
+                ).values(
+                    fingerprint=fingerprint, status=IN_PROGRESS, response_status=None, response_body=None,
+                    created_at=now, locked_until=now + self.lock, expires_at=now + self.ttl
+                )
+            )
+            if taken.rowcount == 1:
+                return STARTED, None
+            record = connection.execute(select(t).where(t.c.key == key)).first()
+
+        if record is None:
+            # Evicted between the insert and the lookup
+            return self.begin(key, fingerprint)
+        if record.fingerprint != fingerprint:
+            return MISMATCH, record
+        if record.status == IN_PROGRESS:
+            return BUSY, record
+        return REPLAY, record
+
+    def complete(self, key, status_code, body):
+        """Store the response of a STARTED request for replay"""
+        t = self.table
+        with self.engine.begin() as connection:
+            connection.execute(
+                update(t).where(t.c.key == key, t.c.status == IN_PROGRESS).values(
+                    status=COMPLETED, response_status=status_code, response_body=body, locked_until=None
+                )
+            )
+
+    def release(self, key):
+        """Forget a STARTED request that failed, so a retry runs it again"""
+        t = self.table
+        with self.engine.begin() as connection:
+            connection.execute(delete(t).where(t.c.key == key, t.c.status == IN_PROGRESS))
+
+    def purge(self):
+        """Delete expired keys; returns how many were removed"""
+        t = self.table
+        with self.engine.begin() as connection:
+            return connection.execute(delete(t).where(t.c.expires_at <= datetime.utcnow())).rowcount
+
+    def _maybe_purge(self):
+        # At most one eviction pass per process every purge_interval
+        now = datetime.utcnow()
+        if now < self._next_purge or not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_purge = now + self.purge_interval
+            self.purge()
+        finally:
+            self._purge_lock.release()
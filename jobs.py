@@ -0,0 +1,303 @@
+"""
+Background jobs
+Long-running work (imports, exports, reconciliation, receipt batches, database
+initialization) is stored as rows of a job table and run by worker processes
+started with ``flask run-worker``, so it never blocks a web worker and needs
+no broker. Workers claim jobs with a conditional UPDATE, hold them under a
+lease that a heartbeat keeps extending, retry failures with exponential
+backoff and cap how many jobs of each type run at once across all workers.
+
+Nothing here knows about the app's models; the app passes in the job table.
+"""
+
+import os
+import shutil
+import signal
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, text, update
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+# pg_advisory_xact_lock key serializing claims, so per-type limits hold on PostgreSQL
+_CLAIM_LOCK_KEY = 7310422
+
+
+class JobType:
+    def __init__(self, name, handler, concurrency=1, max_attempts=3, retry_delay=30):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+
+class JobContext:
+    """What a handler gets: the payload, a scratch directory and progress reporting.
+
+    A handler returns a JSON-serializable result; to offer a file for download
+    it writes it into ``work_dir`` and sets ``result_file`` to its name.
+    """
+
+    def __init__(self, queue, job, worker_id):
+        self._queue = queue
+        self._worker_id = worker_id
+        self.id = job['id']
+        self.payload = job['payload'] or {}
+        self.attempt = job['attempts']
+        self.work_dir = queue.work_dir(job['id'])
+        self.result_file = None
+
+    def path(self, name):
+        return os.path.join(self.work_dir, name)
+
+    def progress(self, done, total=None, message=None):
+        self._queue.set_progress(self.id, self._worker_id, done, total, message)
+
+
+class JobQueue:
+    def __init__(self, engine, table, directory, lease_seconds=300):
+        self.engine = engine
+        self.table = table
+        self.directory = directory
+        self.lease = timedelta(seconds=lease_seconds)
+        self.types = {}
+
+    def register(self, name, concurrency=1, max_attempts=3, retry_delay=30):
+        """Decorator registering ``handler(ctx)`` as the handler for a job type"""
+        def decorator(handler):
+            self.types[name] = JobType(name, handler, concurrency, max_attempts, retry_delay)
+            return handler
+        return decorator
+
+    def work_dir(self, job_id):
+        return os.path.join(self.directory, str(job_id))
+
+    def enqueue(self, executor, job_type, payload=None, created_by=None):
+        """Insert a queued job (no commit) and return its id"""
+        if job_type not in self.types:
+            raise ValueError(f'Unknown job type: {job_type}')
+        now = datetime.utcnow()
+        return executor.execute(insert(self.table).values(
+            job_type=job_type,
+            status=QUEUED,
+            payload=payload or {},
+            attempts=0,
+            max_attempts=self.types[job_type].max_attempts,
+            progress_done=0,
+            run_at=now,
+            created_by=created_by,
+            created_at=now,
+            updated_at=now
+        )).inserted_primary_key[0]
+
+    def cancel(self, executor, job_id):
+        """Cancel a job that has not started yet (no commit); True if it was queued"""
+        now = datetime.utcnow()
+        t = self.table
+        return executor.execute(
+            update(t).where(t.c.id == job_id, t.c.status == QUEUED)
+            .values(status=CANCELLED, finished_at=now, updated_at=now)
+        ).rowcount == 1
+
+    def claim(self, worker_id, types=None):
+        """Take the oldest due job of a type that is below its concurrency limit"""
+        names = [name for name in self.types if types is None or name in types]
+        now = datetime.utcnow()
+        t = self.table
+        # sqlite_immediate makes SQLITE_TUNING connections take the write lock
+        # up front, so two workers never deadlock upgrading a read lock
+        with self.engine.connect().execution_options(sqlite_immediate=True) as connection:
+            with connection.begin():
+                if connection.dialect.name == 'postgresql':
+                    connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': _CLAIM_LOCK_KEY})
+                running = dict(connection.execute(
+                    select(t.c.job_type, func.count())
+                    .where(t.c.status == RUNNING, t.c.job_type.in_(names))
+                    .group_by(t.c.job_type)
+                ).all())
+                open_types = [name for name in names if running.get(name, 0) < self.types[name].concurrency]
+                if not open_types:
+                    return None
+
+                job = connection.execute(
+                    select(t).where(t.c.status == QUEUED, t.c.run_at <= now, t.c.job_type.in_(open_types))
+                    .order_by(t.c.run_at, t.c.id).limit(1)
+                ).first()
+                if job is None:
+                    return None
+                # attempts must still match: the job may have run, failed and been re-queued since
+                claimed = connection.execute(
+                    update(t).where(t.c.id == job.id, t.c.status == QUEUED, t.c.attempts == job.attempts).values(
+                        status=RUNNING,
+                        attempts=t.c.attempts + 1,
+                        locked_by=worker_id,
+                        locked_until=now + self.lease,
+                        started_at=now,
+                        updated_at=now
+                    )
+                )
+                if claimed.rowcount != 1:
+                    return None
+        return dict(job._mapping, status=RUNNING, attempts=job.attempts + 1)
+
+    def _update_own(self, job_id, worker_id, **values):
+        t = self.table
+        values['updated_at'] = datetime.utcnow()
+        with self.engine.begin() as connection:
+            return connection.execute(
+                update(t).where(t.c.id == job_id, t.c.status == RUNNING, t.c.locked_by == worker_id)
+                .values(**values)
+            ).rowcount == 1
+
+    def set_progress(self, job_id, worker_id, done, total=None, message=None):
+        values = {'progress_done': done, 'locked_until': datetime.utcnow() + self.lease}
+        if total is not None:
+            values['progress_total'] = total
+        if message is not None:
+            values['progress_message'] = message[:200]
+        self._update_own(job_id, worker_id, **values)
+
+    def heartbeat(self, job_ids, worker_id):
+        """Extend the leases of jobs this worker is still running"""
+        if not job_ids:
+            return
+        now = datetime.utcnow()
+        t = self.table
+        with self.engine.begin() as connection:
+            connection.execute(
+                update(t).where(t.c.id.in_(job_ids), t.c.status == RUNNING, t.c.locked_by == worker_id)
+                .values(locked_until=now + self.lease, updated_at=now)
+            )
+
+    def complete(self, job_id, worker_id, result=None, result_file=None):
+        self._update_own(job_id, worker_id, status=SUCCEEDED, result=result, result_file=result_file,
+                         error=None, locked_by=None, locked_until=None, finished_at=datetime.utcnow())
+
+    def fail(self, job, worker_id, error):
+        """Queue the job again after a backoff, or mark it failed once out of attempts"""
+        now = datetime.utcnow()
+        if job['attempts'] < job['max_attempts']:
+            delay = self.types[job['job_type']].retry_delay * 2 ** (job['attempts'] - 1)
+            self._update_own(job['id'], worker_id, status=QUEUED, error=error, locked_by=None,
+                             locked_until=None, run_at=now + timedelta(seconds=delay))
+        else:
+            self._update_own(job['id'], worker_id, status=FAILED, error=error, locked_by=None,
+                             locked_until=None, finished_at=now)
+
+    def requeue_expired(self):
+        """Give jobs whose worker stopped heartbeating back to the queue (or fail them)"""
+        now = datetime.utcnow()
+        t = self.table
+        expired = (t.c.status == RUNNING) & (t.c.locked_until < now)
+        with self.engine.begin() as connection:
+            connection.execute(
+                update(t).where(expired, t.c.attempts >= t.c.max_attempts).values(
+                    status=FAILED, error='Worker stopped responding', locked_by=None,
+                    locked_until=None, finished_at=now, updated_at=now
+                )
+            )
+            connection.execute(
+                update(t).where(expired).values(
+                    status=QUEUED, locked_by=None, locked_until=None, run_at=now, updated_at=now
+                )
+            )
+
+    def purge(self, older_than):
+        """Delete finished jobs (and their files) that finished before ``older_than``"""
+        t = self.table
+        with self.engine.begin() as connection:
+            job_ids = [job_id for (job_id,) in connection.execute(
+                select(t.c.id).where(t.c.status.in_(FINISHED_STATUSES), t.c.finished_at < older_than)
+            )]
+            if job_ids:
+                connection.execute(delete(t).where(t.c.id.in_(job_ids)))
+        for job_id in job_ids:
+            shutil.rmtree(self.work_dir(job_id), ignore_errors=True)
+        return len(job_ids)
+
+
+class Worker:
+    """Run queued jobs on ``concurrency`` threads until SIGTERM/SIGINT.
+
+    ``context`` is entered around every job (the app passes ``app.app_context``).
+    A maintenance thread extends the leases of running jobs and re-queues
+    jobs abandoned by workers that died.
+    """
+
+    def __init__(self, queue, context, logger, concurrency=1, poll_interval=1.0, types=None):
+        self.queue = queue
+        self.context = context
+        self.logger = logger
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.types = types
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self._stop = threading.Event()
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(self.worker_id, self.types)
+            except Exception as e:
+                self.logger.error(f"Job claim error: {str(e)}")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        with self._lock:
+            self._running.add(job['id'])
+        ctx = JobContext(self.queue, job, self.worker_id)
+        self.logger.info(f"Job {job['id']} ({job['job_type']}) started, attempt {job['attempts']}")
+        try:
+            os.makedirs(ctx.work_dir, exist_ok=True)
+            with self.context():
+                result = self.queue.types[job['job_type']].handler(ctx)
+            self.queue.complete(job['id'], self.worker_id, result, ctx.result_file)
+            self.logger.info(f"Job {job['id']} ({job['job_type']}) succeeded")
+        except Exception as e:
+            self.logger.error(f"Job {job['id']} ({job['job_type']}) error: {str(e)}")
+            self.queue.fail(job, self.worker_id, f'{type(e).__name__}: {e}')
+        finally:
+            with self._lock:
+                self._running.discard(job['id'])
+
+    def _maintain(self):
+        interval = max(1.0, self.queue.lease.total_seconds() / 3)
+        while not self._stop.wait(interval):
+            try:
+                with self._lock:
+                    running = list(self._running)
+                self.queue.heartbeat(running, self.worker_id)
+                self.queue.requeue_expired()
+            except Exception as e:
+                self.logger.error(f"Job maintenance error: {str(e)}")
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        threads = [threading.Thread(target=self._loop, name=f'job-worker-{i}', daemon=True)
+                   for i in range(self.concurrency)]
+        threads.append(threading.Thread(target=self._maintain, name='job-maintenance', daemon=True))
+        self.queue.requeue_expired()
+        for thread in threads:
+            thread.start()
+        # Running jobs are finished before exiting; nothing new is claimed
+        while any(thread.is_alive() for thread in threads[:-1]):
+            for thread in threads[:-1]:
+                thread.join(timeout=1)
@@ -1,16 +1,44 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, Response, stream_with_context, send_file
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timedelta
 import os
-from werkzeug.security import generate_password_hash, check_password_hash
 import logging
 from decimal import Decimal
 import uuid
-from logging.handlers import RotatingFileHandler
+import csv
+import io
+import zipfile
+import shutil
+import hashlib
+import click
+import time
+import threading
+import functools
 from flask_cors import CORS
 import secrets
 from flask_migrate import Migrate
+from sqlalchemy import case, delete, event, exists, func, insert, literal, select, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 import requests
+from exports import iter_csv, iter_xlsx, CSV_MIMETYPE, XLSX_MIMETYPE
+from student_import import iter_student_rows
+from cache import create_cache
+from password_hashing import PasswordHasher, HashingBusy
+from sqlite_tuning import configure_sqlite, SQLiteWriter
+from profiling import RequestProfiler
+from structured_logging import LoggingPipeline
+from search import create_search_index, document_id, exclude_from_migrations
+from receipts import ReceiptCache, render_batch, PDF_MIMETYPE
+from jobs import JobQueue, Worker
+from idempotency import IdempotencyStore, request_fingerprint, REPLAY, BUSY, MISMATCH
+from events import create_broadcaster, Subscription, format_event, HEARTBEAT, RETRY
+from reconciliation import (
+    iter_statement_rows, normalize_utr, classify,
+    MATCHED, AMOUNT_MISMATCH, ALREADY_PROCESSED, UNMATCHED, DUPLICATE, INVALID
+)
+from config import config, build_engine_options
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -20,6 +48,7 @@ class Config:
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     SECRET_KEY = secrets.token_hex(32)
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(BASE_DIR, "instance", "fee_management.db")}'
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SESSION_COOKIE_SECURE = False  # Set to True in production
     SESSION_COOKIE_HTTPONLY = True
@@ -27,14 +56,156 @@ class Config:
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=30)
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     CORS_ORIGINS = ['*']
+    # Student read cache: 'memory' (per-process LRU), 'redis' (shared) or 'none'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 60))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+    # Password hashing: full werkzeug method string (hashes made with anything
+    # else are upgraded on the next successful login), pool size and queue cap
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 32))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    # SQLite production mode (opt-in): WAL + tuned PRAGMAs on every connection
+    # and payment writes group-committed by a single writer thread per process
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'false').lower() == 'true'
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 268435456)),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -65536)),
+    }
+    SQLITE_WRITER_MAX_BATCH = int(os.environ.get('SQLITE_WRITER_MAX_BATCH', 64))
+    # Request profiling (opt-in): SQL/handler timings as Server-Timing headers,
+    # /metrics, N+1 warnings and cProfile dumps for a sampled fraction of
+    # requests, or for requests sent with X-Profile equal to PROFILING_TOKEN
+    # (the header is ignored when no token is set)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_N_PLUS_ONE_THRESHOLD = int(os.environ.get('PROFILING_N_PLUS_ONE_THRESHOLD', 5))
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+    PROFILING_DIR = os.path.join(BASE_DIR, 'logs', 'profiles')
+    # Logging: 'file' (logs/app-<slot>.log per worker) or 'stdout'; keep this
+    # fraction of access log lines (errors and slow requests are always kept)
+    LOG_TARGET = os.environ.get('LOG_TARGET', 'file')
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_ACCESS_SAMPLE_RATE = float(os.environ.get('LOG_ACCESS_SAMPLE_RATE', 1.0))
+    LOG_SLOW_REQUEST_MS = float(os.environ.get('LOG_SLOW_REQUEST_MS', 1000))
+    # Server-rendered receipt/statement PDFs, cached on disk by content hash
+    RECEIPT_CACHE_DIR = os.environ.get('RECEIPT_CACHE_DIR', os.path.join(BASE_DIR, 'instance', 'receipts'))
+    RECEIPT_INSTITUTION = os.environ.get('RECEIPT_INSTITUTION', 'Fee Management System')
+    # Background jobs (run by `flask run-worker`): uploads and results live in
+    # JOBS_DIR, which web and worker processes must share; JOBS_CONCURRENCY
+    # overrides per-type limits, e.g. "export=4,import_students=1"
+    JOBS_DIR = os.environ.get('JOBS_DIR', os.path.join(BASE_DIR, 'instance', 'jobs'))
+    JOBS_LEASE_SECONDS = int(os.environ.get('JOBS_LEASE_SECONDS', 300))
+    JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', 1.0))
+    JOBS_CONCURRENCY = dict(
+        (name.strip(), int(limit)) for name, limit in
+        (item.split('=') for item in os.environ.get('JOBS_CONCURRENCY', '').split(',') if '=' in item)
+    )
+    # Live updates over SSE: 'local' reaches streams of the publishing worker
+    # only, 'redis' relays events to streams open in every worker. Each stream
+    # holds a request open, so streams are only served when the server can
+    # afford that: EVENTS_STREAMING=true for threaded workers (gthread), and
+    # always under asgi.py. Otherwise clients poll. Threaded streams are
+    # closed after EVENTS_MAX_STREAM_SECONDS and the browser reconnects
+    EVENTS_STREAMING = os.environ.get('EVENTS_STREAMING', 'false').lower() == 'true'
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'local')
+    EVENTS_REDIS_URL = os.environ.get('EVENTS_REDIS_URL', CACHE_REDIS_URL)
+    EVENTS_HEARTBEAT_SECONDS = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', 15))
+    EVENTS_MAX_STREAM_SECONDS = float(os.environ.get('EVENTS_MAX_STREAM_SECONDS', 300))
+    # Idempotency-Key responses are replayed for this long; a request that
+    # never finished frees its key after IDEMPOTENCY_LOCK_SECONDS
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400))
+    IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', 60))
 
 # Apply configuration
 app.config.from_object(Config)
 
+# Cloud deployments select their database and pool profile from config.py
+# (FLASK_ENV=production/railway/supabase/neon/planetscale)
+if os.environ.get('FLASK_ENV') in config and os.environ.get('FLASK_ENV') not in ('development', 'default'):
+    app.config.from_object(config[os.environ['FLASK_ENV']])
+
 # Initialize extensions
 db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+migrate = Migrate(app, db, include_object=exclude_from_migrations)
 cors = CORS(app, resources={r"/api/*": {"origins": Config.CORS_ORIGINS}})
+cache = create_cache(app.config)
+receipt_cache = ReceiptCache(app.config['RECEIPT_CACHE_DIR'])
+broadcaster = create_broadcaster(app.config)
+password_hasher = PasswordHasher(
+    method=app.config['PASSWORD_HASH_METHOD'],
+    max_workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_queue=app.config['PASSWORD_HASH_MAX_QUEUE'],
+    timeout=app.config['PASSWORD_HASH_TIMEOUT']
+)
+
+# Database connection instrumentation
+db_connect_stats = {'connects': 0, 'invalidated': 0, 'lastConnectMs': None, 'maxConnectMs': 0.0}
+db_connect_stats_lock = threading.Lock()
+
+def _timed_connect(dialect, connection_record, cargs, cparams):
+    started = time.perf_counter()
+    connection = dialect.connect(*cargs, **cparams)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with db_connect_stats_lock:
+        db_connect_stats['connects'] += 1
+        db_connect_stats['lastConnectMs'] = round(elapsed_ms, 2)
+        db_connect_stats['maxConnectMs'] = round(max(db_connect_stats['maxConnectMs'], elapsed_ms), 2)
+    return connection
+
+def _connection_invalidated(dbapi_connection, connection_record, exception):
+    with db_connect_stats_lock:
+        db_connect_stats['invalidated'] += 1
+
+with app.app_context():
+    event.listen(db.engine, 'do_connect', _timed_connect)
+    event.listen(db.engine, 'invalidate', _connection_invalidated)
+
+# SQLite production mode
+sqlite_writer = None
+if app.config['SQLITE_TUNING'] and app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+    with app.app_context():
+        configure_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+        sqlite_writer = SQLiteWriter(db.engine, max_batch=app.config['SQLITE_WRITER_MAX_BATCH'])
+
+# Search index (FTS5 on SQLite, tsvector + pg_trgm on PostgreSQL)
+with app.app_context():
+    search_index = create_search_index(db.engine.dialect.name)
+
+# Request profiling
+profiler = None
+if app.config['PROFILING_ENABLED']:
+    with app.app_context():
+        profiler = RequestProfiler(
+            app, db.engine,
+            n_plus_one_threshold=app.config['PROFILING_N_PLUS_ONE_THRESHOLD'],
+            sample_rate=app.config['PROFILING_SAMPLE_RATE'],
+            token=app.config['PROFILING_TOKEN'],
+            profile_dir=app.config['PROFILING_DIR']
+        )
+
+def run_write(job):
+    """Run ``job(executor)`` in a transaction of its own and commit it.
+
+    With SQLITE_TUNING the job is queued to the single writer thread and
+    group-committed on its connection; otherwise it runs on the request's
+    session. Either way ``executor`` accepts ``execute()`` and ``begin_nested()``.
+    """
+    if sqlite_writer is not None:
+        result = sqlite_writer.submit(job)
+        # End the session's read transaction: its snapshot predates the write
+        db.session.rollback()
+        return result
+    try:
+        result = job(db.session)
+        db.session.commit()
+        return result
+    except Exception:
+        db.session.rollback()
+        raise
 
 # Ensure required directories exist
 os.makedirs(os.path.join(Config.BASE_DIR, 'instance'), exist_ok=True)
@@ -45,19 +216,47 @@ from decimal import Decimal
 import uuid
 from datetime import datetime
 import logging
-from logging.handlers import RotatingFileHandler
 
-# Setup logging
-handler = RotatingFileHandler(
-    os.path.join(Config.BASE_DIR, 'logs', 'app.log'),
-    maxBytes=10000000,
-    backupCount=5
+# Setup logging: JSON lines written off the request path by a listener thread
+logging_pipeline = LoggingPipeline(
+    app,
+    log_dir=os.path.join(Config.BASE_DIR, 'logs'),
+    target=app.config['LOG_TARGET'],
+    level=app.config['LOG_LEVEL'],
+    access_sample_rate=app.config['LOG_ACCESS_SAMPLE_RATE'],
+    slow_request_ms=app.config['LOG_SLOW_REQUEST_MS']
 )
-handler.setFormatter(logging.Formatter(
-    '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
-))
-app.logger.addHandler(handler)
-app.logger.setLevel(logging.INFO)
+
+# Page sizes for list endpoints
+STUDENT_PAGE_SIZE = 500
+STUDENT_PAGE_SIZE_MAX = 1000
+
+# Maximum number of transactions accepted by one bulk verification request
+BULK_VERIFY_MAX = 1000
+
+# Sections returned by /api/student/dashboard (selectable with ?fields=)
+DASHBOARD_FIELDS = ('student', 'yearWiseData', 'transactions', 'complaints')
+
+# Rows written per statement/commit when importing students
+IMPORT_BATCH_SIZE = 1000
+
+# Statement lines matched per query when reconciling bank statements
+RECONCILE_BATCH_SIZE = 1000
+RECONCILE_STATUSES = (MATCHED, AMOUNT_MISMATCH, ALREADY_PROCESSED, UNMATCHED, DUPLICATE, INVALID)
+
+# Rows fetched per round trip when streaming exports
+EXPORT_BATCH_SIZE = 1000
+
+# Changed records returned per /api/sync page
+SYNC_PAGE_SIZE = 500
+SYNC_PAGE_SIZE_MAX = 2000
+# Change log entries younger than this may still have uncommitted neighbours
+# with lower ids (PostgreSQL sequences), so the cursor does not move past them
+SYNC_SETTLE_SECONDS = 5
+# Longest accepted client-generated idempotency key for offline writes
+CLIENT_KEY_MAX_LENGTH = 64
+# Longest accepted Idempotency-Key header
+IDEMPOTENCY_KEY_MAX_LENGTH = 128
 
 # Database Models
 class User(db.Model):
@@ -75,13 +274,22 @@ class User(db.Model):
     auth_method = db.Column(db.String(20), nullable=True)  # 'biometric', 'face', 'password'
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
 
 class Student(db.Model):
     __tablename__ = 'students'
+    __table_args__ = (
+        # Employee dashboard filters (branch -> year -> category)
+        db.Index('ix_students_branch_year_category', 'branch', 'academic_year', 'category'),
+        # Paid/pending list types and statistics
+        db.Index('ix_students_pending_amount', 'pending_amount'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     roll_number = db.Column(db.String(20), unique=True, nullable=False)
@@ -99,6 +307,8 @@ class Student(db.Model):
     transactions = db.relationship('Transaction', backref='student', lazy=True)
     complaints = db.relationship('Complaint', backref='student', lazy=True)
     biometric_id = db.Column(db.String(256), unique=True, nullable=True)
+    # Bumped on every write that changes what the student's read endpoints return
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def to_dict(self):
         return {
@@ -119,6 +329,12 @@ class Student(db.Model):
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Per-student payment lookups, optionally narrowed by year and status
+        db.Index('ix_transactions_student_year_status', 'student_id', 'academic_year', 'status'),
+        # Verification queue (pending transactions)
+        db.Index('ix_transactions_status', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     transaction_id = db.Column(db.String(50), unique=True, nullable=False)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
@@ -134,9 +350,14 @@ class Transaction(db.Model):
     date = db.Column(db.DateTime, default=datetime.utcnow)
     mobile_number = db.Column(db.String(15))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Key generated by an offline client so a replayed submission is not stored twice
+    client_key = db.Column(db.String(64), unique=True, index=True, nullable=True)
 
 class Complaint(db.Model):
     __tablename__ = 'complaints'
+    __table_args__ = (
+        db.Index('ix_complaints_student_status', 'student_id', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     complaint_id = db.Column(db.String(50), unique=True, nullable=False)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
@@ -147,6 +368,1135 @@ class Complaint(db.Model):
     responded_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    client_key = db.Column(db.String(64), unique=True, index=True, nullable=True)
+
+class StudentFeeLedger(db.Model):
+    """Running paid totals per student, academic year and fee type.
+
+    Maintained in the same DB transaction that verifies a payment so year-wise
+    balances can be read without re-summing every transaction.
+    """
+    __tablename__ = 'student_fee_ledger'
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'academic_year', 'fee_type', name='uq_fee_ledger_student_year_type'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
+    academic_year = db.Column(db.String(20), nullable=False)
+    fee_type = db.Column(db.String(50), nullable=False)
+    paid = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class FeeCollectionRollup(db.Model):
+    """Verified collections per branch, academic year, category and day.
+
+    Incremented in the same DB transaction that verifies a payment, so the
+    analytics summary reads a few hundred rollup rows instead of every
+    transaction. Branch and category are the student's at verification time;
+    ``flask rebuild-rollups`` recomputes everything from current data.
+    """
+    __tablename__ = 'fee_collection_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('branch', 'academic_year', 'category', 'day', name='uq_fee_collection_rollup_key'),
+        db.Index('ix_fee_collection_rollups_day', 'day'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    branch = db.Column(db.String(50), nullable=False)
+    academic_year = db.Column(db.String(20), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    transactions = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class BackgroundJob(db.Model):
+    """A unit of long-running work for the background worker (see jobs.py)"""
+    __tablename__ = 'background_jobs'
+    __table_args__ = (
+        # Claim query: due queued jobs, oldest first
+        db.Index('ix_background_jobs_status_run_at', 'status', 'run_at'),
+        db.Index('ix_background_jobs_type_status', 'job_type', 'status'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    payload = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    result_file = db.Column(db.String(200))
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer)
+    progress_message = db.Column(db.String(200))
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+    # No foreign key: an init_db job drops and recreates users while its row survives
+    created_by = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.job_type,
+            'status': self.status,
+            'attempts': self.attempts,
+            'maxAttempts': self.max_attempts,
+            'progress': {
+                'done': self.progress_done,
+                'total': self.progress_total,
+                'message': self.progress_message
+            },
+            'result': self.result,
+            'resultUrl': f'/api/jobs/{self.id}/result' if self.result_file else None,
+            'error': self.error,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'startedAt': self.started_at.isoformat() if self.started_at else None,
+            'finishedAt': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class UtrRegistry(db.Model):
+    """Every UTR number in use by a pending or verified transaction.
+
+    The primary key is the normalized UTR, so a duplicate submission fails on
+    the index insert; rejecting a transaction releases its UTR for resubmission.
+    """
+    __tablename__ = 'utr_registry'
+    utr_number = db.Column(db.String(50), primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class IdempotencyKey(db.Model):
+    """Response stored for a request sent with an Idempotency-Key header.
+
+    ``key`` is scoped to the endpoint and the signed-in user, so two clients
+    choosing the same key never see each other's responses.
+    """
+    __tablename__ = 'idempotency_keys'
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    response_status = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+    locked_until = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class ChangeLog(db.Model):
+    """One row per write to a student, transaction or complaint, read by /api/sync.
+
+    The autoincrement id is the sync cursor. Records are identified by their
+    public key (roll number, transaction or complaint id) so an entry outlives
+    the row: a logged record that no longer exists is sent as a tombstone.
+    """
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        # Per-student sync (student_id = ? AND id > cursor)
+        db.Index('ix_change_log_student_id', 'student_id', 'id'),
+        # Latest entry of a record (superseded entries are skipped and compacted)
+        db.Index('ix_change_log_entity_key', 'entity', 'entity_key', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_key = db.Column(db.String(50), nullable=False)
+    # No foreign key: tombstones must survive the student's deletion
+    student_id = db.Column(db.Integer, nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Fee ledger helpers
+def credit_fee_ledger(student_id, academic_year, fee_type, amount, executor=None):
+    """Atomically add a verified payment to the student's ledger row.
+
+    Uses ``paid = paid + :amount`` so concurrent verifications never lose an
+    update; the row is created on first payment for that year and fee type.
+    Must be called inside the caller's transaction (no commit here);
+    ``executor`` defaults to the request session.
+    """
+    executor = executor or db.session
+    amount = Decimal(str(amount))
+    ledger_filter = (
+        (StudentFeeLedger.student_id == student_id) &
+        (StudentFeeLedger.academic_year == academic_year) &
+        (StudentFeeLedger.fee_type == fee_type)
+    )
+    credit = update(StudentFeeLedger).where(ledger_filter).values(
+        paid=StudentFeeLedger.paid + amount,
+        updated_at=datetime.utcnow()
+    ).execution_options(synchronize_session=False)
+
+    if executor.execute(credit).rowcount:
+        return
+
+    try:
+        with executor.begin_nested():
+            executor.execute(insert(StudentFeeLedger).values(
+                student_id=student_id,
+                academic_year=academic_year,
+                fee_type=fee_type,
+                paid=amount
+            ))
+    except IntegrityError:
+        # Another request created the row first; fall back to incrementing it
+        executor.execute(credit)
+
+def credit_student_balance(student_id, amount, executor=None):
+    """Atomically move a verified amount from pending to paid on the student row"""
+    amount = Decimal(str(amount))
+    (executor or db.session).execute(
+        # Each SET reads only its own column: MySQL evaluates assignments left to
+        # right, so reading paid_amount in pending_amount would see the new value
+        update(Student).where(Student.id == student_id).values(
+            paid_amount=func.coalesce(Student.paid_amount, 0) + amount,
+            pending_amount=func.coalesce(Student.pending_amount, Student.total_fees, 0) - amount,
+            revision=Student.revision + 1,
+            updated_at=datetime.utcnow()
+        ).execution_options(synchronize_session=False)
+    )
+
+def register_utr(utr_number, transaction_row_id, executor=None):
+    """Claim a UTR for a transaction (no commit); raises IntegrityError if it is taken"""
+    utr_number = normalize_utr(utr_number)
+    if utr_number:
+        (executor or db.session).execute(insert(UtrRegistry).values(
+            utr_number=utr_number,
+            transaction_id=transaction_row_id,
+            created_at=datetime.utcnow()
+        ))
+
+def release_utr(*transaction_row_ids, executor=None):
+    """Free the UTRs of rejected transactions (no commit)"""
+    if transaction_row_ids:
+        (executor or db.session).execute(
+            delete(UtrRegistry).where(UtrRegistry.transaction_id.in_(set(transaction_row_ids)))
+        )
+
+def credit_collection_rollup(branch, academic_year, category, day, amount, count=1, executor=None):
+    """Add verified payments to the day's rollup row (no commit), same upsert as the ledger"""
+    executor = executor or db.session
+    amount = Decimal(str(amount))
+    rollup_filter = (
+        (FeeCollectionRollup.branch == branch) &
+        (FeeCollectionRollup.academic_year == academic_year) &
+        (FeeCollectionRollup.category == category) &
+        (FeeCollectionRollup.day == day)
+    )
+    credit = update(FeeCollectionRollup).where(rollup_filter).values(
+        transactions=FeeCollectionRollup.transactions + count,
+        amount=FeeCollectionRollup.amount + amount,
+        updated_at=datetime.utcnow()
+    ).execution_options(synchronize_session=False)
+
+    if executor.execute(credit).rowcount:
+        return
+
+    try:
+        with executor.begin_nested():
+            executor.execute(insert(FeeCollectionRollup).values(
+                branch=branch,
+                academic_year=academic_year,
+                category=category,
+                day=day,
+                transactions=count,
+                amount=amount
+            ))
+    except IntegrityError:
+        executor.execute(credit)
+
+def rebuild_collection_rollups():
+    """Recompute every rollup row from verified transactions in one INSERT ... SELECT"""
+    day = func.date(func.coalesce(Transaction.verified_at, Transaction.date))
+    totals = select(
+        Student.branch,
+        Transaction.academic_year,
+        Student.category,
+        day,
+        func.count(Transaction.id),
+        func.sum(Transaction.amount),
+        func.current_timestamp()
+    ).join(Student, Student.id == Transaction.student_id).where(
+        Transaction.status == 'verified'
+    ).group_by(Student.branch, Transaction.academic_year, Student.category, day)
+
+    db.session.query(FeeCollectionRollup).delete(synchronize_session=False)
+    db.session.execute(insert(FeeCollectionRollup).from_select(
+        ['branch', 'academic_year', 'category', 'day', 'transactions', 'amount', 'updated_at'], totals
+    ))
+    db.session.commit()
+
+def rebuild_fee_ledger():
+    """Recompute every ledger row from verified transactions"""
+    db.session.query(StudentFeeLedger).delete(synchronize_session=False)
+    totals = db.session.query(
+        Transaction.student_id,
+        Transaction.academic_year,
+        Transaction.fee_type,
+        func.sum(Transaction.amount)
+    ).filter(Transaction.status == 'verified').group_by(
+        Transaction.student_id, Transaction.academic_year, Transaction.fee_type
+    )
+    db.session.add_all(StudentFeeLedger(
+        student_id=student_id,
+        academic_year=academic_year,
+        fee_type=fee_type,
+        paid=paid
+    ) for student_id, academic_year, fee_type, paid in totals)
+    db.session.commit()
+
+def touch_students(*student_ids, executor=None):
+    """Bump the revision of students whose transactions/complaints changed (no commit)"""
+    if student_ids:
+        (executor or db.session).execute(
+            update(Student).where(Student.id.in_(set(student_ids))).values(
+                revision=Student.revision + 1,
+                updated_at=datetime.utcnow()
+            ).execution_options(synchronize_session=False)
+        )
+
+def apply_verification(executor, transaction_id, action, comment='', bill_number=None, verified_by=None):
+    """Verify or reject one pending transaction and credit the student (no commit).
+
+    Returns ``(transaction, error)``: a dict with the transaction's new status,
+    or ``None`` and the reason nothing was changed.
+    """
+    transaction = executor.execute(
+        select(Transaction.id, Transaction.transaction_id, Transaction.student_id, Transaction.amount,
+               Transaction.fee_type, Transaction.academic_year, Transaction.status,
+               Student.branch, Student.category)
+        .join(Student, Student.id == Transaction.student_id)
+        .where(Transaction.transaction_id == transaction_id)
+    ).first()
+    if not transaction:
+        return None, 'Transaction not found'
+    if transaction.status != 'pending':
+        return None, 'Transaction already processed'
+
+    status = 'verified' if action == 'verify' else 'rejected'
+    now = datetime.utcnow()
+    values = {
+        'status': status,
+        'verification_comment': comment,
+        'verified_at': now,
+        'verified_by': verified_by
+    }
+    if action == 'verify' and bill_number:
+        values['bill_number'] = bill_number
+    # Only one of two concurrent requests can move the row out of 'pending';
+    # the other changes nothing and must not credit the student again
+    claimed = executor.execute(
+        update(Transaction).where(Transaction.id == transaction.id, Transaction.status == 'pending')
+        .values(**values).execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        return None, 'Transaction already processed'
+    if 'bill_number' in values:
+        reindex_search(transactions=[transaction.id], executor=executor)
+    record_changes(students=[transaction.student_id] if action == 'verify' else None,
+                   transactions=[transaction.id], executor=executor)
+
+    if action == 'verify':
+        # Credit the student's balance and fee ledger in this same DB transaction
+        credit_student_balance(transaction.student_id, transaction.amount, executor)
+        credit_fee_ledger(transaction.student_id, transaction.academic_year,
+                          transaction.fee_type, transaction.amount, executor)
+        credit_collection_rollup(transaction.branch, transaction.academic_year, transaction.category,
+                                 now.date(), transaction.amount, executor=executor)
+    else:
+        release_utr(transaction.id, executor=executor)
+        touch_students(transaction.student_id, executor=executor)
+
+    return {
+        'id': transaction.transaction_id,
+        'studentId': transaction.student_id,
+        'status': status,
+        'amount': float(transaction.amount)
+    }, None
+
+def apply_verifications(executor, decisions, dialect, verified_by=None):
+    """Verify or reject a batch of pending transactions and credit the students (no commit).
+
+    ``decisions`` maps transaction_id -> ``(action, comment, bill_number)``.
+    The batch is read with one IN query (row-locked where the backend supports
+    FOR UPDATE) and claimed with one conditional UPDATE per action, so a
+    transaction verified concurrently is left out and never credited twice.
+    Balances are then credited once per student, ledger rows once per
+    (student, year, fee type) and rollups once per (branch, year, category).
+    Returns transaction_id -> ``(transaction, error)`` like apply_verification.
+    ``dialect`` is the engine's, read by the caller (see upsert_students).
+    """
+    query = (
+        select(Transaction.id, Transaction.transaction_id, Transaction.student_id, Transaction.amount,
+               Transaction.fee_type, Transaction.academic_year, Transaction.status,
+               Student.branch, Student.category)
+        .join(Student, Student.id == Transaction.student_id)
+        .where(Transaction.transaction_id.in_(list(decisions)))
+    )
+    if dialect.name != 'sqlite':
+        query = query.with_for_update(of=Transaction)
+    rows = {row.transaction_id: row for row in executor.execute(query)}
+
+    outcomes = {transaction_id: (None, 'Transaction not found')
+                for transaction_id in decisions if transaction_id not in rows}
+    pending = {}
+    for transaction_id, row in rows.items():
+        if row.status == 'pending':
+            pending[row.id] = row
+        else:
+            outcomes[transaction_id] = (None, 'Transaction already processed')
+
+    now = datetime.utcnow()
+    claimed = set()
+    for action, status in (('verify', 'verified'), ('reject', 'rejected')):
+        batch = {row_id: decisions[row.transaction_id] for row_id, row in pending.items()
+                 if decisions[row.transaction_id][0] == action}
+        if not batch:
+            continue
+        values = {
+            'status': status,
+            'verification_comment': case({row_id: comment for row_id, (_, comment, _) in batch.items()},
+                                         value=Transaction.id),
+            'verified_at': now,
+            'verified_by': verified_by
+        }
+        bills = {row_id: bill_number for row_id, (_, _, bill_number) in batch.items() if bill_number}
+        if action == 'verify' and bills:
+            values['bill_number'] = case(bills, value=Transaction.id, else_=Transaction.bill_number)
+        claim = update(Transaction).where(
+            Transaction.id.in_(list(batch)), Transaction.status == 'pending'
+        ).values(**values).execution_options(synchronize_session=False)
+        if dialect.update_returning:
+            claimed.update(executor.execute(claim.returning(Transaction.id)).scalars())
+        else:
+            # The rows are locked above, so only this batch can have set this timestamp
+            executor.execute(claim)
+            claimed.update(executor.execute(select(Transaction.id).where(
+                Transaction.id.in_(list(batch)), Transaction.status == status, Transaction.verified_at == now
+            )).scalars())
+
+    student_credits = {}
+    ledger_credits = {}
+    rollup_credits = {}
+    rejected = {}
+    billed = []
+    for row_id, row in pending.items():
+        if row_id not in claimed:
+            outcomes[row.transaction_id] = (None, 'Transaction already processed')
+            continue
+        action, _, bill_number = decisions[row.transaction_id]
+        outcomes[row.transaction_id] = ({
+            'id': row.transaction_id,
+            'studentId': row.student_id,
+            'status': 'verified' if action == 'verify' else 'rejected',
+            'amount': float(row.amount)
+        }, None)
+        if action != 'verify':
+            rejected[row_id] = row.student_id
+            continue
+        amount = Decimal(row.amount)
+        student_credits[row.student_id] = student_credits.get(row.student_id, Decimal(0)) + amount
+        ledger_key = (row.student_id, row.academic_year, row.fee_type)
+        ledger_credits[ledger_key] = ledger_credits.get(ledger_key, Decimal(0)) + amount
+        rollup_key = (row.branch, row.academic_year, row.category)
+        rollup_amount, rollup_count = rollup_credits.get(rollup_key, (Decimal(0), 0))
+        rollup_credits[rollup_key] = (rollup_amount + amount, rollup_count + 1)
+        if bill_number:
+            billed.append(row_id)
+
+    for student_id, amount in student_credits.items():
+        credit_student_balance(student_id, amount, executor)
+    for (student_id, academic_year, fee_type), amount in ledger_credits.items():
+        credit_fee_ledger(student_id, academic_year, fee_type, amount, executor)
+    for (branch, academic_year, category), (amount, count) in rollup_credits.items():
+        credit_collection_rollup(branch, academic_year, category, now.date(), amount, count, executor=executor)
+    release_utr(*rejected, executor=executor)
+    touch_students(*(set(rejected.values()) - set(student_credits)), executor=executor)
+    if billed:
+        reindex_search(transactions=billed, executor=executor)
+    if claimed:
+        record_changes(students=list(student_credits), transactions=list(claimed), executor=executor)
+    return outcomes
+
+# Search index helpers
+SEARCH_PAGE_SIZE = 20
+SEARCH_PAGE_SIZE_MAX = 100
+SEARCH_KINDS = ('student', 'transaction', 'complaint')
+
+def search_documents(executor, students=None, transactions=None, complaints=None):
+    """Build search documents for the given row ids (lists or id subqueries)"""
+    documents = []
+    if students is not None:
+        for row in executor.execute(
+            select(Student.id, Student.roll_number, Student.name).where(Student.id.in_(students))
+        ):
+            documents.append({'id': document_id('student', row.id), 'kind': 'student',
+                              'ref': row.roll_number, 'roll_number': row.roll_number,
+                              'title': row.name, 'content': f'{row.name} {row.roll_number}'})
+    if transactions is not None:
+        for row in executor.execute(
+            select(Transaction.id, Transaction.transaction_id, Transaction.utr_number,
+                   Transaction.bill_number, Student.roll_number)
+            .join(Student, Student.id == Transaction.student_id)
+            .where(Transaction.id.in_(transactions))
+        ):
+            documents.append({'id': document_id('transaction', row.id), 'kind': 'transaction',
+                              'ref': row.transaction_id, 'roll_number': row.roll_number,
+                              'title': row.utr_number or row.transaction_id,
+                              'content': ' '.join(filter(None, [row.transaction_id, row.utr_number,
+                                                                row.bill_number]))})
+    if complaints is not None:
+        for row in executor.execute(
+            select(Complaint.id, Complaint.complaint_id, Complaint.subject, Student.roll_number)
+            .join(Student, Student.id == Complaint.student_id)
+            .where(Complaint.id.in_(complaints))
+        ):
+            documents.append({'id': document_id('complaint', row.id), 'kind': 'complaint',
+                              'ref': row.complaint_id, 'roll_number': row.roll_number,
+                              'title': row.subject, 'content': f'{row.complaint_id} {row.subject}'})
+    return documents
+
+def reindex_search(students=None, transactions=None, complaints=None, executor=None):
+    """Refresh the search documents of changed rows inside the caller's transaction (no commit)"""
+    executor = executor or db.session
+    search_index.replace(executor, search_documents(executor, students, transactions, complaints))
+
+def rebuild_search_index(batch_size=1000):
+    """Recreate the search index from every student, transaction and complaint"""
+    search_index.create_schema(db.session)
+    search_index.clear(db.session)
+    for model, kind in ((Student, 'students'), (Transaction, 'transactions'), (Complaint, 'complaints')):
+        ids = [row_id for row_id, in db.session.query(model.id).order_by(model.id)]
+        for start in range(0, len(ids), batch_size):
+            reindex_search(**{kind: ids[start:start + batch_size]})
+    db.session.commit()
+
+# Delta sync helpers
+SYNC_ENTITIES = (
+    # (entity, model, public key column, result key)
+    ('student', Student, Student.roll_number, 'students'),
+    ('transaction', Transaction, Transaction.transaction_id, 'transactions'),
+    ('complaint', Complaint, Complaint.complaint_id, 'complaints'),
+)
+
+def record_changes(students=None, transactions=None, complaints=None, executor=None):
+    """Log changed rows for /api/sync inside the caller's transaction (no commit).
+
+    Takes row ids (lists or id subqueries) like reindex_search. Call it before
+    deleting rows so their tombstone keys can still be read.
+    """
+    executor = executor or db.session
+    now = datetime.utcnow()
+    for (entity, model, key, _), ids in zip(SYNC_ENTITIES, (students, transactions, complaints)):
+        if ids is None or (isinstance(ids, (list, set, tuple)) and not ids):
+            continue
+        student_id = model.id if model is Student else model.student_id
+        executor.execute(insert(ChangeLog).from_select(
+            ['entity', 'entity_key', 'student_id', 'changed_at'],
+            select(literal(entity), key, student_id, literal(now, db.DateTime))
+            .where(model.id.in_(list(ids) if isinstance(ids, set) else ids))
+        ))
+
+def sync_records(keys):
+    """Current state of logged records: ``(payload, deleted)`` keyed by result key"""
+    payload, deleted = {}, {}
+    if keys['student']:
+        students = Student.query.filter(Student.roll_number.in_(keys['student'])).all()
+        payload['students'] = [dict(student_summary(student), category=student.category,
+                                    updatedAt=student.updated_at.isoformat() if student.updated_at else None)
+                               for student in students]
+        found = {student.roll_number for student in students}
+        deleted['students'] = [key for key in keys['student'] if key not in found]
+    if keys['transaction']:
+        rows = db.session.execute(
+            select(Transaction.transaction_id, Transaction.amount, Transaction.fee_type,
+                   Transaction.academic_year, Transaction.status, Transaction.date,
+                   Transaction.bill_number, Student.roll_number)
+            .join(Student, Student.id == Transaction.student_id)
+            .where(Transaction.transaction_id.in_(keys['transaction']))
+        ).all()
+        payload['transactions'] = [dict(item, rollNumber=row.roll_number, billNumber=row.bill_number)
+                                   for item, row in zip(transaction_list(rows), rows)]
+        found = {row.transaction_id for row in rows}
+        deleted['transactions'] = [key for key in keys['transaction'] if key not in found]
+    if keys['complaint']:
+        rows = db.session.execute(
+            select(Complaint.complaint_id, Complaint.subject, Complaint.description, Complaint.status,
+                   Complaint.response, Complaint.created_at, Student.roll_number)
+            .join(Student, Student.id == Complaint.student_id)
+            .where(Complaint.complaint_id.in_(keys['complaint']))
+        ).all()
+        payload['complaints'] = [dict(item, rollNumber=row.roll_number)
+                                 for item, row in zip(complaint_list(rows), rows)]
+        found = {row.complaint_id for row in rows}
+        deleted['complaints'] = [key for key in keys['complaint'] if key not in found]
+    return payload, deleted
+
+def sync_changes(since, limit, student_id=None):
+    """Records changed after cursor ``since``, optionally only one student's.
+
+    Reads up to ``limit`` log entries in id order, skipping entries superseded
+    by a later one for the same record. The returned cursor stops before the
+    first entry younger than SYNC_SETTLE_SECONDS, so those records are sent
+    again on the next sync rather than risking a skipped lower id.
+    """
+    scope = [] if student_id is None else [ChangeLog.student_id == student_id]
+    if since > (db.session.scalar(select(func.max(ChangeLog.id)).where(*scope)) or 0):
+        # The log was reset (database re-initialized): start over from 0
+        return {'reset': True, 'cursor': 0, 'hasMore': True}
+
+    later = aliased(ChangeLog)
+    entries = db.session.execute(
+        select(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_key, ChangeLog.changed_at)
+        .where(ChangeLog.id > since, *scope)
+        .where(~exists().where(later.entity == ChangeLog.entity,
+                               later.entity_key == ChangeLog.entity_key,
+                               later.id > ChangeLog.id))
+        .order_by(ChangeLog.id)
+        .limit(limit)
+    ).all()
+
+    cursor, settled = since, True
+    settled_before = datetime.utcnow() - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    keys = {entity: [] for entity, _, _, _ in SYNC_ENTITIES}
+    for entry in entries:
+        keys[entry.entity].append(entry.entity_key)
+        settled = settled and entry.changed_at <= settled_before
+        if settled:
+            cursor = entry.id
+
+    payload, deleted = sync_records(keys)
+    result = {'cursor': cursor, 'hasMore': len(entries) == limit and settled}
+    for _, _, _, name in SYNC_ENTITIES:
+        result[name] = payload.get(name, [])
+    result['deleted'] = {name: deleted.get(name, []) for _, _, _, name in SYNC_ENTITIES}
+    return result
+
+def compact_change_log():
+    """Delete log entries superseded by a later entry for the same record"""
+    later = aliased(ChangeLog)
+    removed = db.session.execute(
+        delete(ChangeLog).where(exists().where(later.entity == ChangeLog.entity,
+                                               later.entity_key == ChangeLog.entity_key,
+                                               later.id > ChangeLog.id))
+    ).rowcount
+    db.session.commit()
+    return removed
+
+def client_key_from(data):
+    """Validated ``clientKey`` of an offline write: ``(key, error)``, key None when absent"""
+    key = data.get('clientKey')
+    if key is None:
+        return None, None
+    if not isinstance(key, str) or not key.strip() or len(key) > CLIENT_KEY_MAX_LENGTH:
+        return None, 'Invalid clientKey'
+    return key.strip(), None
+
+# Conditional GET helpers
+def not_modified(etag):
+    """Return a 304 if the client already holds ``etag``, otherwise None"""
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    return None
+
+def etag_response(payload, etag):
+    """Serialize ``payload`` with a strong ETag that clients must revalidate"""
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+# Student read cache helpers
+STUDENT_CACHE_VIEWS = ('payment-details', 'transactions', 'complaints', 'dashboard')
+
+def student_cache_key(roll_number, view):
+    return f'student:{roll_number}:{view}'
+
+def student_etag(student, view):
+    return f'{view}-{student.id}-{student.revision}'
+
+def invalidate_student_cache(*roll_numbers):
+    """Drop every cached read view of the given students (call after commit)"""
+    cache.delete(*[student_cache_key(roll_number, view)
+                   for roll_number in roll_numbers if roll_number
+                   for view in STUDENT_CACHE_VIEWS])
+    receipt_cache.invalidate('statement', *filter(None, roll_numbers))
+
+def invalidate_student_cache_by_id(*student_ids):
+    """Same as invalidate_student_cache for students known only by primary key"""
+    if student_ids:
+        roll_numbers = [roll for (roll,) in db.session.query(Student.roll_number)
+                        .filter(Student.id.in_(set(student_ids)))]
+        invalidate_student_cache(*roll_numbers)
+
+# Live events: one channel per student plus one shared by all employees
+EMPLOYEE_CHANNEL = 'employees'
+
+def student_channel(student_id):
+    return f'student:{student_id}'
+
+def publish_event(channels, event, data):
+    """Push an event to open SSE streams (call after commit; never raises)"""
+    for channel in channels:
+        try:
+            broadcaster.publish(channel, event, data)
+        except Exception as e:
+            app.logger.error(f"Event publish error: {str(e)}")
+
+def publish_transaction_updates(transactions):
+    """Tell the student and the employees about verified/rejected transactions"""
+    for transaction in transactions:
+        data = {'transactionId': transaction['id'], 'status': transaction['status'],
+                'amount': transaction['amount']}
+        publish_event([student_channel(transaction['studentId']), EMPLOYEE_CHANNEL],
+                      'transaction.updated', data)
+
+def event_stream(channels):
+    """SSE response relaying events of ``channels`` until the client leaves
+    or EVENTS_MAX_STREAM_SECONDS pass"""
+    heartbeat = app.config['EVENTS_HEARTBEAT_SECONDS']
+    max_seconds = app.config['EVENTS_MAX_STREAM_SECONDS']
+
+    def generate():
+        subscription = broadcaster.subscribe(Subscription(channels))
+        try:
+            yield RETRY
+            deadline = time.monotonic() + max_seconds
+            while not subscription.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                message = subscription.get(timeout=min(heartbeat, remaining))
+                yield HEARTBEAT if message is None else format_event(message)
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# Student read payload builders
+def student_summary(student):
+    return {
+        'name': student.name,
+        'rollNumber': student.roll_number,
+        'branch': student.branch,
+        'academicYear': student.academic_year,
+        'totalFees': float(student.total_fees or 0),
+        'paidAmount': float(student.paid_amount or 0),
+        'pendingAmount': float(student.pending_amount or 0)
+    }
+
+def ledger_paid_by_year(student_id):
+    """Query of a student's year-wise paid totals, straight from the fee ledger"""
+    return select(
+        StudentFeeLedger.academic_year,
+        func.sum(StudentFeeLedger.paid)
+    ).where(StudentFeeLedger.student_id == student_id).group_by(StudentFeeLedger.academic_year)
+
+def year_wise_payments(student, transactions, paid_by_year=None):
+    """Group a student's transactions by academic year with ledger-backed totals.
+
+    ``paid_by_year`` ({year: paid}) is read from the ledger unless given.
+    """
+    if paid_by_year is None:
+        paid_by_year = dict(db.session.execute(ledger_paid_by_year(student.id)).all())
+    total_fees = Decimal(student.total_fees or 0)
+
+    year_wise_data = {}
+    for transaction in transactions:
+        year = transaction.academic_year
+        if year not in year_wise_data:
+            paid = Decimal(paid_by_year.get(year) or 0)
+            year_wise_data[year] = {
+                'total_amount': float(total_fees),
+                'paid_amount': float(paid),
+                'pending_amount': float(total_fees - paid),
+                'transactions': []
+            }
+
+        year_wise_data[year]['transactions'].append({
+            'transactionId': transaction.transaction_id,
+            'date': transaction.date.strftime('%Y-%m-%d'),
+            'amount': float(transaction.amount),
+            'feeType': transaction.fee_type,
+            'status': transaction.status,
+            'billNumber': transaction.bill_number
+        })
+    return year_wise_data
+
+def transaction_list(transactions):
+    return [{
+        'id': t.transaction_id,
+        'amount': float(t.amount),
+        'feeType': t.fee_type,
+        'academicYear': t.academic_year,
+        'status': t.status,
+        'date': t.date.isoformat()
+    } for t in transactions]
+
+def complaint_list(complaints):
+    return [{
+        'id': c.complaint_id,
+        'subject': c.subject,
+        'description': c.description,
+        'status': c.status,
+        'response': c.response,
+        'date': c.created_at.isoformat()
+    } for c in complaints]
+
+# Receipt and statement PDF helpers
+RECEIPT_COLUMNS = (
+    Transaction.transaction_id, Transaction.bill_number, Transaction.status, Transaction.amount,
+    Transaction.fee_type, Transaction.academic_year, Transaction.utr_number, Transaction.date,
+    Transaction.verified_at, Student.name, Student.roll_number, Student.branch, Student.category
+)
+
+def receipt_query():
+    return db.session.query(*RECEIPT_COLUMNS).join(Student, Student.id == Transaction.student_id)
+
+def receipt_data(row):
+    """Render data for one receipt from a ``receipt_query()`` row.
+
+    Everything printed on the receipt (including status and bill number) is
+    part of the data, so the cached PDF's hash changes whenever they do.
+    """
+    return {
+        'institution': app.config['RECEIPT_INSTITUTION'],
+        'transactionId': row.transaction_id,
+        'billNumber': row.bill_number,
+        'status': row.status,
+        'amount': float(row.amount),
+        'feeType': row.fee_type,
+        'academicYear': row.academic_year,
+        'utrNumber': row.utr_number,
+        'date': row.date.strftime('%d-%m-%Y') if row.date else None,
+        'verifiedAt': row.verified_at.strftime('%d-%m-%Y') if row.verified_at else None,
+        'student': {
+            'name': row.name,
+            'rollNumber': row.roll_number,
+            'branch': row.branch,
+            'category': row.category
+        }
+    }
+
+def statement_data(student, academic_year):
+    """Render data for a student's fee statement for one academic year"""
+    transactions = (Transaction.query
+                    .filter_by(student_id=student.id, academic_year=academic_year)
+                    .order_by(Transaction.date, Transaction.id).all())
+    fee_types = db.session.query(StudentFeeLedger.fee_type, StudentFeeLedger.paid).filter_by(
+        student_id=student.id, academic_year=academic_year
+    ).order_by(StudentFeeLedger.fee_type).all()
+    total_fees = Decimal(student.total_fees or 0)
+    paid = sum((Decimal(amount) for _, amount in fee_types), Decimal(0))
+    return {
+        'institution': app.config['RECEIPT_INSTITUTION'],
+        'academicYear': academic_year,
+        'student': {
+            'name': student.name,
+            'rollNumber': student.roll_number,
+            'branch': student.branch,
+            'category': student.category
+        },
+        'transactions': [{
+            'transactionId': t.transaction_id,
+            'date': t.date.strftime('%d-%m-%Y') if t.date else None,
+            'feeType': t.fee_type,
+            'billNumber': t.bill_number,
+            'status': t.status,
+            'amount': float(t.amount)
+        } for t in transactions],
+        'feeTypes': [(fee_type, float(amount)) for fee_type, amount in fee_types],
+        'totalFees': float(total_fees),
+        'paid': float(paid),
+        'pendingVerification': float(sum(t.amount for t in transactions if t.status == 'pending') or 0),
+        'outstanding': float(total_fees - paid)
+    }
+
+def pdf_response(path, filename):
+    return send_file(path, mimetype=PDF_MIMETYPE, download_name=filename,
+                     as_attachment=request.args.get('download') in ('1', 'true'), max_age=0)
+
+def zip_receipts(paths, zip_path):
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as bundle:
+        for path in paths:
+            transaction_id = os.path.basename(os.path.dirname(path))
+            bundle.write(path, f'receipt_{transaction_id}.pdf')
+
+def generate_branch_receipts(branch, academic_year=None, workers=None):
+    """Render every verified receipt of a branch into the PDF cache using a process pool"""
+    query = receipt_query().filter(Student.branch == branch, Transaction.status == 'verified')
+    if academic_year:
+        query = query.filter(Transaction.academic_year == academic_year)
+    jobs = [('receipt', row.transaction_id, receipt_data(row))
+            for row in query.order_by(Transaction.id).yield_per(EXPORT_BATCH_SIZE)]
+    return render_batch(app.config['RECEIPT_CACHE_DIR'], jobs, workers)
+
+# Student import helpers
+# Columns an import never overwrites on an existing student: paid_amount only
+# changes through verified payments and pending_amount is recomputed from it
+STUDENT_IMPORT_KEPT_COLUMNS = ('roll_number', 'created_at', 'paid_amount', 'pending_amount')
+
+def _copy_students_postgres(executor, rows, columns, update_columns):
+    """Upsert a batch through COPY into a temp table followed by INSERT ... ON CONFLICT.
+
+    Only reached on PostgreSQL, where run_write passes the request session.
+    """
+    column_list = ', '.join(columns)
+    updates = ', '.join(f'{c} = EXCLUDED.{c}' for c in update_columns)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[c] for c in columns])
+    buffer.seek(0)
+
+    cursor = executor.connection().connection.cursor()
+    try:
+        cursor.execute('DROP TABLE IF EXISTS students_import')
+        cursor.execute(f'CREATE TEMP TABLE students_import ON COMMIT DROP AS '
+                       f'SELECT {column_list} FROM students WITH NO DATA')
+        cursor.copy_expert(f'COPY students_import ({column_list}) FROM STDIN WITH (FORMAT csv)', buffer)
+        cursor.execute(f'INSERT INTO students ({column_list}) SELECT {column_list} FROM students_import '
+                       f'ON CONFLICT (roll_number) DO UPDATE SET {updates}')
+    finally:
+        cursor.close()
+
+def upsert_students(executor, rows, existing_ids, dialect):
+    """Insert or update a batch of validated student rows keyed by roll number (no commit).
+
+    Only the columns present in the rows (the file's columns) are written, and
+    existing students keep their paid and pending amounts (see
+    STUDENT_IMPORT_KEPT_COLUMNS). PostgreSQL with psycopg2 uses COPY, SQLite
+    and other PostgreSQL drivers an executemany INSERT ... ON CONFLICT, and
+    other backends an executemany INSERT for new rows plus a bulk UPDATE by
+    primary key for the ones in ``existing_ids`` (roll number -> id).
+    ``dialect`` is the engine's, read by the caller since the job may run on
+    the SQLite writer thread outside the app context.
+    """
+    name = dialect.name
+    columns = list(rows[0])
+    update_columns = [c for c in columns if c not in STUDENT_IMPORT_KEPT_COLUMNS]
+
+    if name == 'postgresql' and dialect.driver == 'psycopg2':
+        _copy_students_postgres(executor, rows, columns, update_columns)
+    elif name in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if name == 'postgresql' else sqlite.insert
+        statement = dialect_insert(Student.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=['roll_number'],
+            set_={c: statement.excluded[c] for c in update_columns}
+        )
+        executor.execute(statement, rows)
+    else:
+        new_rows = [row for row in rows if row['roll_number'] not in existing_ids]
+        if new_rows:
+            executor.execute(insert(Student), new_rows)
+        changed_rows = [
+            dict({c: row[c] for c in update_columns}, id=existing_ids[row['roll_number']])
+            for row in rows if row['roll_number'] in existing_ids
+        ]
+        if changed_rows:
+            executor.execute(update(Student), changed_rows)
+
+def import_students(stream, file_format, progress=None):
+    """Validate and upsert students from a CSV/XLSX stream in batches.
+
+    Invalid rows are reported and skipped; a batch that fails to write is
+    rolled back and reported without stopping the remaining batches.
+    ``progress(rows)`` is called after each batch.
+    """
+    summary = {'inserted': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    seen_roll_numbers = set()
+    batch = []
+    dialect = db.engine.dialect
+
+    def flush(batch):
+        roll_numbers = [row['roll_number'] for _, row in batch]
+        student_ids = select(Student.id).where(Student.roll_number.in_(roll_numbers))
+
+        def write(executor):
+            existing_ids = dict(executor.execute(
+                select(Student.roll_number, Student.id).where(Student.roll_number.in_(roll_numbers))
+            ).all())
+            upsert_students(executor, [row for _, row in batch], existing_ids, dialect)
+            # Pending follows the (possibly new) total and the paid amount kept above
+            executor.execute(
+                update(Student).where(Student.roll_number.in_(roll_numbers))
+                .values(revision=Student.revision + 1,
+                        pending_amount=func.coalesce(Student.total_fees, 0) - func.coalesce(Student.paid_amount, 0))
+                .execution_options(synchronize_session=False)
+            )
+            reindex_search(students=student_ids, executor=executor)
+            record_changes(students=student_ids, executor=executor)
+            return existing_ids
+
+        try:
+            existing_ids = run_write(write)
+            invalidate_student_cache(*roll_numbers)
+        except Exception as e:
+            app.logger.error(f"Student import batch error: {str(e)}")
+            summary['failed'] += len(batch)
+            summary['errors'].extend({'row': row_number, 'rollNumber': row['roll_number'],
+                                      'message': 'Database error'} for row_number, row in batch)
+            return
+        summary['updated'] += len(existing_ids)
+        summary['inserted'] += len(batch) - len(existing_ids)
+
+    now = datetime.utcnow()
+    for row_number, row, error in iter_student_rows(stream, file_format):
+        if row and row['roll_number'] in seen_roll_numbers:
+            error = 'Duplicate roll number in file'
+        if error:
+            summary['failed'] += 1
+            summary['errors'].append({'row': row_number,
+                                      'rollNumber': row['roll_number'] if row else None,
+                                      'message': error})
+            continue
+
+        seen_roll_numbers.add(row['roll_number'])
+        row['created_at'] = row['updated_at'] = now
+        batch.append((row_number, row))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush(batch)
+            batch = []
+            if progress:
+                progress(summary['inserted'] + summary['updated'] + summary['failed'])
+
+    if batch:
+        flush(batch)
+    return summary
+
+def reconcile_statement(stream, auto_verify=False, verified_by=None, progress=None):
+    """Match a bank statement CSV against submitted transactions by UTR and amount.
+
+    Lines are looked up in the UTR registry a batch at a time; with
+    ``auto_verify`` exact matches of pending transactions are verified the
+    same way as ``/api/verify-transaction``. Returns counts per status and a
+    result per line; ``progress(lines)`` is called after each batch.
+    """
+    summary = {'verified': 0, 'results': []}
+    seen_utrs = set()
+    batch = []
+
+    def flush(batch):
+        utrs = [utr for _, utr, _ in batch]
+        transactions = {
+            row.utr_number: row for row in db.session.execute(
+                select(UtrRegistry.utr_number, Transaction.transaction_id, Transaction.amount, Transaction.status)
+                .join(Transaction, Transaction.id == UtrRegistry.transaction_id)
+                .where(UtrRegistry.utr_number.in_(utrs))
+            )
+        }
+        results = classify(batch, transactions)
+        matched = [result for result in results if result['status'] == MATCHED]
+        if auto_verify and matched:
+            def verify_matched(executor):
+                return [apply_verification(executor, result['transactionId'], 'verify',
+                                           comment='Auto-verified from bank statement',
+                                           verified_by=verified_by)
+                        for result in matched]
+            outcomes = run_write(verify_matched)
+            for result, (transaction, error) in zip(matched, outcomes):
+                result['verified'] = transaction is not None
+                if error:
+                    result['message'] = error
+            verified = [transaction for transaction, _ in outcomes if transaction]
+            summary['verified'] += len(verified)
+            invalidate_student_cache_by_id(*{transaction['studentId'] for transaction in verified})
+            receipt_cache.invalidate('receipt', *[transaction['id'] for transaction in verified])
+            publish_transaction_updates(verified)
+        summary['results'].extend(results)
+
+    for row_number, utr, amount, error in iter_statement_rows(stream):
+        if not error and utr in seen_utrs:
+            error = 'Duplicate UTR in statement'
+            status = DUPLICATE
+        else:
+            status = INVALID
+        if error:
+            summary['results'].append({'row': row_number, 'utr': utr, 'status': status, 'message': error})
+            continue
+
+        seen_utrs.add(utr)
+        batch.append((row_number, utr, amount))
+        if len(batch) >= RECONCILE_BATCH_SIZE:
+            flush(batch)
+            batch = []
+            if progress:
+                progress(len(summary['results']))
+
+    if batch:
+        flush(batch)
+    summary['results'].sort(key=lambda result: result['row'])
+    for result in summary['results']:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return summary
+
+# Idempotency-Key handling for payment submission and verification
+with app.app_context():
+    idempotency_store = IdempotencyStore(db.engine, IdempotencyKey.__table__,
+                                         ttl_seconds=app.config['IDEMPOTENCY_TTL_SECONDS'],
+                                         lock_seconds=app.config['IDEMPOTENCY_LOCK_SECONDS'])
+
+def idempotent(view):
+    """Run a request at most once per ``Idempotency-Key`` header and replay its response.
+
+    Requests without the header run as usual. Responses with status 500 or
+    above are not stored, so the client can retry them with the same key.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return view(*args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return jsonify({'success': False, 'message': 'Invalid Idempotency-Key'}), 400
+
+        if 'user_id' in session:
+            principal = f"user:{session['user_id']}"
+        elif 'student_id' in session:
+            principal = f"student:{session['student_id']}"
+        else:
+            principal = 'anonymous'
+        scoped_key = f'{request.endpoint}:{principal}:{key}'
+        fingerprint = request_fingerprint(request.method, request.path, request.get_data())
+
+        outcome, record = idempotency_store.begin(scoped_key, fingerprint)
+        if outcome == MISMATCH:
+            return jsonify({'success': False,
+                            'message': 'Idempotency-Key was already used for a different request'}), 422
+        if outcome == BUSY:
+            response = jsonify({'success': False,
+                                'message': 'A request with this Idempotency-Key is still in progress'})
+            response.headers['Retry-After'] = '1'
+            return response, 409
+        if outcome == REPLAY:
+            response = app.response_class(record.response_body, status=record.response_status,
+                                          mimetype='application/json')
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except Exception:
+            idempotency_store.release(scoped_key)
+            raise
+        if response.status_code >= 500:
+            idempotency_store.release(scoped_key)
+        else:
+            idempotency_store.complete(scoped_key, response.status_code, response.get_data(as_text=True))
+        return response
+    return wrapper
 
 # Routes
 @app.route('/')
@@ -246,6 +1596,11 @@ def employee_auth():
                 'message': 'Invalid credentials'
             }), 401
 
+        # Upgrade hashes made with older cost parameters while we have the password
+        if password and user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+
         # Handle different authentication methods
         if auth_method == 'biometric':
             if not auth_data and not user.biometric_id:
@@ -286,6 +1641,11 @@ def employee_auth():
                 'message': 'Authentication successful'
             })
             
+    except HashingBusy:
+        return jsonify({
+            'success': False,
+            'message': 'Server busy, please try again'
+        }), 503
     except Exception as e:
         app.logger.error(f"Employee authentication error: {str(e)}")
         return jsonify({
@@ -293,38 +1653,94 @@ def employee_auth():
             'message': 'Authentication failed'
         }), 500
 
+def replay_transaction_submission(client_key, student_id):
+    """Response for a submission already stored under ``client_key``, else None"""
+    transaction = Transaction.query.filter_by(client_key=client_key).first()
+    if not transaction:
+        return None
+    if transaction.student_id != student_id:
+        return jsonify({'success': False, 'message': 'clientKey already used by another submission'}), 409
+    return jsonify({
+        'success': True,
+        'message': 'Transaction submitted successfully',
+        'replayed': True,
+        'transaction': {
+            'id': transaction.transaction_id,
+            'amount': float(transaction.amount),
+            'status': transaction.status
+        }
+    })
+
 @app.route('/api/student/submit-transaction', methods=['POST'])
+@idempotent
 def submit_transaction():
     try:
         data = request.get_json()
         
+        client_key, error = client_key_from(data)
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+
         # Validate student exists
         student = Student.query.filter_by(roll_number=data['rollNumber']).first()
         if not student:
             return jsonify({'success': False, 'message': 'Student not found'}), 404
 
+        # A queued offline submission that already reached the server is answered again
+        if client_key:
+            replay = replay_transaction_submission(client_key, student.id)
+            if replay:
+                return replay
+
         # Create transaction
-        transaction = Transaction(
-            transaction_id=f"TXN{uuid.uuid4().hex[:8].upper()}",
-            student_id=student.id,
-            amount=Decimal(str(data['paidAmount'])),
-            fee_type=data['feeType'],
-            academic_year=data['academicYear'],
-            utr_number=data['utrNumber'],
-            mobile_number=data['mobileNumber'],
-            date=datetime.strptime(data['transDate'], '%Y-%m-%d')
-        )
+        values = {
+            'transaction_id': f"TXN{uuid.uuid4().hex[:8].upper()}",
+            'student_id': student.id,
+            'amount': Decimal(str(data['paidAmount'])),
+            'fee_type': data['feeType'],
+            'academic_year': data['academicYear'],
+            'utr_number': data['utrNumber'],
+            'mobile_number': data['mobileNumber'],
+            'date': datetime.strptime(data['transDate'], '%Y-%m-%d'),
+            'status': 'pending',
+            'client_key': client_key
+        }
 
-        db.session.add(transaction)
-        db.session.commit()
+        def record(executor):
+            row_id = executor.execute(insert(Transaction).values(**values)).inserted_primary_key[0]
+            register_utr(values['utr_number'], row_id, executor)
+            touch_students(student.id, executor=executor)
+            reindex_search(transactions=[row_id], executor=executor)
+            record_changes(transactions=[row_id], executor=executor)
+
+        try:
+            run_write(record)
+        except IntegrityError:
+            # The same offline submission may have been replayed concurrently
+            replay = client_key and replay_transaction_submission(client_key, student.id)
+            if replay:
+                return replay
+            return jsonify({
+                'success': False,
+                'message': 'This UTR number has already been submitted'
+            }), 409
+        invalidate_student_cache(student.roll_number)
+        publish_event([student_channel(student.id), EMPLOYEE_CHANNEL], 'transaction.submitted', {
+            'transactionId': values['transaction_id'],
+            'rollNumber': student.roll_number,
+            'amount': float(values['amount']),
+            'feeType': values['fee_type'],
+            'academicYear': values['academic_year'],
+            'status': values['status']
+        })
 
         return jsonify({
             'success': True,
             'message': 'Transaction submitted successfully',
             'transaction': {
-                'id': transaction.transaction_id,
-                'amount': float(transaction.amount),
-                'status': transaction.status
+                'id': values['transaction_id'],
+                'amount': float(values['amount']),
+                'status': values['status']
             }
         })
 
@@ -334,44 +1750,35 @@ def submit_transaction():
         return jsonify({'success': False, 'message': 'Server error'}), 500
 
 @app.route('/api/verify-transaction', methods=['POST'])
+@idempotent
 def verify_transaction():
     try:
         data = request.get_json()
-        transaction = Transaction.query.filter_by(transaction_id=data['transactionId']).first()
-        
-        if not transaction:
-            return jsonify({'success': False, 'message': 'Transaction not found'}), 404
-
-        if transaction.status != 'pending':
-            return jsonify({'success': False, 'message': 'Transaction already processed'}), 400
-
         action = data['action']
         if action not in ['verify', 'reject']:
             return jsonify({'success': False, 'message': 'Invalid action'}), 400
 
-        transaction.status = 'verified' if action == 'verify' else 'rejected'
-        transaction.verification_comment = data.get('comment', '')
-        transaction.verified_at = datetime.utcnow()
-        transaction.verified_by = session.get('user_id')
+        verified_by = session.get('user_id')
+        transaction, error = run_write(lambda executor: apply_verification(
+            executor, data['transactionId'], action,
+            comment=data.get('comment', ''),
+            bill_number=data.get('billNumber'),
+            verified_by=verified_by
+        ))
+        if error:
+            return jsonify({'success': False, 'message': error}), 404 if error == 'Transaction not found' else 400
 
-        if action == 'verify':
-            # Update student's paid amount
-            student = transaction.student
-            student.paid_amount = float(student.paid_amount or 0) + float(transaction.amount)
-            student.pending_amount = float(student.total_fees or 0) - float(student.paid_amount)
-            
-            if data.get('billNumber'):
-                transaction.bill_number = data['billNumber']
-
-        db.session.commit()
+        invalidate_student_cache_by_id(transaction['studentId'])
+        receipt_cache.invalidate('receipt', transaction['id'])
+        publish_transaction_updates([transaction])
 
         return jsonify({
             'success': True,
-            'message': f'Transaction {transaction.status}',
+            'message': f"Transaction {transaction['status']}",
             'transaction': {
-                'id': transaction.transaction_id,
-                'status': transaction.status,
-                'amount': float(transaction.amount)
+                'id': transaction['id'],
+                'status': transaction['status'],
+                'amount': transaction['amount']
             }
         })
 
@@ -380,61 +1787,198 @@ def verify_transaction():
         app.logger.error(f"Verification error: {str(e)}")
         return jsonify({'success': False, 'message': 'Server error'}), 500
 
+@app.route('/api/verify-transactions/bulk', methods=['POST'])
+@idempotent
+def verify_transactions_bulk():
+    """Verify or reject many transactions with set-based queries and one commit.
+
+    Body: ``{"transactions": [{"transactionId", "action", "billNumber", "comment"}, ...]}``
+    (a bare list is accepted too). The valid items are applied together by
+    apply_verifications. Returns a result per item; invalid items are reported
+    without affecting the rest of the batch.
+    """
+    try:
+        data = request.get_json()
+        items = data.get('transactions', []) if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'message': 'No transactions provided'}), 400
+        if len(items) > BULK_VERIFY_MAX:
+            return jsonify({
+                'success': False,
+                'message': f'At most {BULK_VERIFY_MAX} transactions per request'
+            }), 400
+
+        # The first item for a transaction wins; repeats count as already processed
+        decisions = {}
+        for item in items:
+            if isinstance(item, dict) and item.get('action') in ['verify', 'reject']:
+                decisions.setdefault(item.get('transactionId'), (
+                    item['action'], item.get('comment', ''), item.get('billNumber')
+                ))
+
+        verified_by = session.get('user_id')
+        dialect = db.engine.dialect
+        outcomes = run_write(lambda executor: apply_verifications(
+            executor, decisions, dialect, verified_by=verified_by
+        )) if decisions else {}
+
+        results = []
+        applied = []
+        reported = set()
+        for item in items:
+            if not isinstance(item, dict):
+                results.append({'transactionId': None, 'success': False, 'message': 'Invalid item'})
+                continue
+
+            transaction_id = item.get('transactionId')
+            if item.get('action') not in ['verify', 'reject']:
+                results.append({'transactionId': transaction_id, 'success': False,
+                                'message': 'Invalid action'})
+                continue
+
+            transaction, error = outcomes[transaction_id]
+            if transaction_id in reported:
+                transaction, error = None, 'Transaction already processed'
+            reported.add(transaction_id)
+            if error:
+                results.append({'transactionId': transaction_id, 'success': False, 'message': error})
+                continue
+
+            applied.append(transaction)
+            results.append({
+                'transactionId': transaction_id,
+                'success': True,
+                'status': transaction['status'],
+                'amount': transaction['amount']
+            })
+
+        if applied:
+            invalidate_student_cache_by_id(*{t['studentId'] for t in applied})
+            receipt_cache.invalidate('receipt', *[t['id'] for t in applied])
+            publish_transaction_updates(applied)
+
+        return jsonify({
+            'success': True,
+            'processed': sum(1 for r in results if r['success']),
+            'failed': sum(1 for r in results if not r['success']),
+            'results': results
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Bulk verification error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
 @app.route('/api/student/payment-details/<roll_number>')
 def get_student_payment_details(roll_number):
     try:
+        cache_key = student_cache_key(roll_number, 'payment-details')
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return not_modified(cached['etag']) or etag_response(cached['payload'], cached['etag'])
+
         student = Student.query.filter_by(roll_number=roll_number).first()
         if not student:
             return jsonify({'success': False, 'message': 'Student not found'}), 404
 
+        etag = student_etag(student, 'payment-details')
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+
         transactions = Transaction.query.filter_by(student_id=student.id).all()
-        
-        # Group transactions by academic year
-        year_wise_data = {}
-        for transaction in transactions:
-            year = transaction.academic_year
-            if year not in year_wise_data:
-                year_wise_data[year] = {
-                    'total_amount': float(student.total_fees or 0),
-                    'paid_amount': 0,
-                    'pending_amount': float(student.total_fees or 0),
-                    'transactions': []
-                }
-            
-            if transaction.status == 'verified':
-                year_wise_data[year]['paid_amount'] += float(transaction.amount)
-                year_wise_data[year]['pending_amount'] = (
-                    year_wise_data[year]['total_amount'] - 
-                    year_wise_data[year]['paid_amount']
-                )
-            
-            year_wise_data[year]['transactions'].append({
-                'transactionId': transaction.transaction_id,
-                'date': transaction.date.strftime('%Y-%m-%d'),
-                'amount': float(transaction.amount),
-                'feeType': transaction.fee_type,
-                'status': transaction.status,
-                'billNumber': transaction.bill_number
-            })
 
-        return jsonify({
+        payload = {
             'success': True,
-            'student': {
-                'name': student.name,
-                'rollNumber': student.roll_number,
-                'branch': student.branch,
-                'academicYear': student.academic_year,
-                'totalFees': float(student.total_fees or 0),
-                'paidAmount': float(student.paid_amount or 0),
-                'pendingAmount': float(student.pending_amount or 0)
-            },
-            'yearWiseData': year_wise_data
-        })
+            'student': student_summary(student),
+            'yearWiseData': year_wise_payments(student, transactions)
+        }
+        cache.set(cache_key, {'etag': etag, 'payload': payload})
+        return etag_response(payload, etag)
 
     except Exception as e:
         app.logger.error(f"Error fetching payment details: {str(e)}")
         return jsonify({'success': False, 'message': 'Server error'}), 500
 
+@app.route('/api/student/dashboard/<roll_number>')
+def get_student_dashboard(roll_number):
+    """Payment details, transactions and complaints for one student in a single response.
+
+    ``fields`` optionally limits the response to a comma separated subset of
+    student, yearWiseData, transactions and complaints.
+    """
+    try:
+        requested = request.args.get('fields')
+        fields = set(requested.split(',')) if requested else set(DASHBOARD_FIELDS)
+        unknown = fields - set(DASHBOARD_FIELDS)
+        if unknown:
+            return jsonify({
+                'success': False,
+                'message': f"Unknown fields: {', '.join(sorted(unknown))}"
+            }), 400
+
+        # Only the full dashboard is cached; sparse selections are cheap to rebuild
+        full = fields == set(DASHBOARD_FIELDS)
+        cache_key = student_cache_key(roll_number, 'dashboard')
+        if full:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return not_modified(cached['etag']) or etag_response(cached['payload'], cached['etag'])
+
+        student = Student.query.filter_by(roll_number=roll_number).first()
+        if not student:
+            return jsonify({'success': False, 'message': 'Student not found'}), 404
+
+        etag = student_etag(student, 'dashboard-' + '.'.join(sorted(fields)))
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+
+        payload = {'success': True}
+        if 'student' in fields:
+            payload['student'] = student_summary(student)
+        if fields & {'yearWiseData', 'transactions'}:
+            transactions = Transaction.query.filter_by(student_id=student.id).all()
+            if 'yearWiseData' in fields:
+                payload['yearWiseData'] = year_wise_payments(student, transactions)
+            if 'transactions' in fields:
+                payload['transactions'] = transaction_list(transactions)
+        if 'complaints' in fields:
+            complaints = Complaint.query.filter_by(student_id=student.id).all()
+            payload['complaints'] = complaint_list(complaints)
+
+        if full:
+            cache.set(cache_key, {'etag': etag, 'payload': payload})
+        return etag_response(payload, etag)
+
+    except Exception as e:
+        app.logger.error(f"Error fetching dashboard: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
+def complaint_submitted(complaint, replayed=False):
+    payload = {
+        'success': True,
+        'message': 'Complaint submitted successfully',
+        'complaint': {
+            'id': complaint.complaint_id,
+            'subject': complaint.subject,
+            'status': complaint.status,
+            'date': complaint.created_at.isoformat()
+        }
+    }
+    if replayed:
+        payload['replayed'] = True
+    return jsonify(payload)
+
+def replay_complaint_submission(client_key, student_id):
+    """Response for a complaint already stored under ``client_key``, else None"""
+    complaint = Complaint.query.filter_by(client_key=client_key).first()
+    if not complaint:
+        return None
+    if complaint.student_id != student_id:
+        return jsonify({'success': False, 'message': 'clientKey already used by another submission'}), 409
+    return complaint_submitted(complaint, replayed=True)
+
 @app.route('/api/student/complaint', methods=['POST'])
 def submit_complaint():
     try:
@@ -442,29 +1986,49 @@ def submit_complaint():
             return jsonify({'success': False, 'message': 'Not authenticated'}), 401
 
         data = request.get_json()
+        client_key, error = client_key_from(data)
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
         student = Student.query.get(session['student_id'])
-        
-        complaint = Complaint(
-            complaint_id=f"COMP{uuid.uuid4().hex[:8].upper()}",
-            student_id=student.id,
-            subject=data['subject'],
-            description=data['description']
-        )
 
-        db.session.add(complaint)
-        db.session.commit()
+        if client_key:
+            replay = replay_complaint_submission(client_key, student.id)
+            if replay:
+                return replay
+
+        values = {
+            'complaint_id': f"COMP{uuid.uuid4().hex[:8].upper()}",
+            'student_id': student.id,
+            'subject': data['subject'],
+            'description': data['description'],
+            'client_key': client_key
+        }
 
-        return jsonify({
-            'success': True,
-            'message': 'Complaint submitted successfully',
-            'complaint': {
-                'id': complaint.complaint_id,
-                'subject': complaint.subject,
-                'status': complaint.status,
-                'date': complaint.created_at.isoformat()
-            }
+        def record(executor):
+            row_id = executor.execute(insert(Complaint).values(**values)).inserted_primary_key[0]
+            touch_students(student.id, executor=executor)
+            reindex_search(complaints=[row_id], executor=executor)
+            record_changes(complaints=[row_id], executor=executor)
+            return row_id
+
+        try:
+            complaint = db.session.get(Complaint, run_write(record))
+        except IntegrityError:
+            # The same offline submission may have been replayed concurrently
+            replay = client_key and replay_complaint_submission(client_key, student.id)
+            if replay:
+                return replay
+            raise
+        invalidate_student_cache(student.roll_number)
+        publish_event([student_channel(student.id), EMPLOYEE_CHANNEL], 'complaint.submitted', {
+            'complaintId': complaint.complaint_id,
+            'rollNumber': student.roll_number,
+            'subject': complaint.subject,
+            'status': complaint.status
         })
 
+        return complaint_submitted(complaint)
+
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Complaint error: {str(e)}")
@@ -473,23 +2037,28 @@ def submit_complaint():
 @app.route('/api/student/transactions/<roll_number>')
 def get_student_transactions(roll_number):
     try:
+        cache_key = student_cache_key(roll_number, 'transactions')
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return not_modified(cached['etag']) or etag_response(cached['payload'], cached['etag'])
+
         student = Student.query.filter_by(roll_number=roll_number).first()
         if not student:
             return jsonify({'success': False, 'message': 'Student not found'}), 404
 
+        etag = student_etag(student, 'transactions')
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+
         transactions = Transaction.query.filter_by(student_id=student.id).all()
-        
-        return jsonify({
+
+        payload = {
             'success': True,
-            'transactions': [{
-                'id': t.transaction_id,
-                'amount': float(t.amount),
-                'feeType': t.fee_type,
-                'academicYear': t.academic_year,
-                'status': t.status,
-                'date': t.date.isoformat()
-            } for t in transactions]
-        })
+            'transactions': transaction_list(transactions)
+        }
+        cache.set(cache_key, {'etag': etag, 'payload': payload})
+        return etag_response(payload, etag)
 
     except Exception as e:
         app.logger.error(f"Error fetching transactions: {str(e)}")
@@ -498,60 +2067,152 @@ def get_student_transactions(roll_number):
 @app.route('/api/student/complaints/<roll_number>')
 def get_student_complaints(roll_number):
     try:
+        cache_key = student_cache_key(roll_number, 'complaints')
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return not_modified(cached['etag']) or etag_response(cached['payload'], cached['etag'])
+
         student = Student.query.filter_by(roll_number=roll_number).first()
         if not student:
             return jsonify({'success': False, 'message': 'Student not found'}), 404
 
+        etag = student_etag(student, 'complaints')
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+
         complaints = Complaint.query.filter_by(student_id=student.id).all()
-        
-        return jsonify({
+
+        payload = {
             'success': True,
-            'complaints': [{
-                'id': c.complaint_id,
-                'subject': c.subject,
-                'description': c.description,
-                'status': c.status,
-                'response': c.response,
-                'date': c.created_at.isoformat()
-            } for c in complaints]
-        })
+            'complaints': complaint_list(complaints)
+        }
+        cache.set(cache_key, {'etag': etag, 'payload': payload})
+        return etag_response(payload, etag)
 
     except Exception as e:
         app.logger.error(f"Error fetching complaints: {str(e)}")
         return jsonify({'success': False, 'message': 'Server error'}), 500
 
+@app.route('/api/student/receipt/<transaction_id>')
+def get_receipt_pdf(transaction_id):
+    """Receipt PDF for one transaction (``?download=1`` to save it as a file)"""
+    try:
+        row = receipt_query().filter(Transaction.transaction_id == transaction_id).first()
+        if not row:
+            return jsonify({'success': False, 'message': 'Transaction not found'}), 404
+
+        path = receipt_cache.get('receipt', row.transaction_id, receipt_data(row))
+        return pdf_response(path, f'receipt_{row.bill_number or row.transaction_id}.pdf')
+
+    except Exception as e:
+        app.logger.error(f"Receipt error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
+@app.route('/api/student/statement/<roll_number>')
+def get_statement_pdf(roll_number):
+    """Fee statement PDF for one academic year (``?academicYear=``, default the student's current one)"""
+    try:
+        student = Student.query.filter_by(roll_number=roll_number).first()
+        if not student:
+            return jsonify({'success': False, 'message': 'Student not found'}), 404
+
+        academic_year = request.args.get('academicYear') or student.academic_year
+        path = receipt_cache.get('statement', (student.roll_number, academic_year),
+                                 statement_data(student, academic_year))
+        return pdf_response(path, f'statement_{student.roll_number}_{academic_year}.pdf')
+
+    except Exception as e:
+        app.logger.error(f"Statement error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
+@app.route('/api/events/config')
+def events_config():
+    """Whether this server holds SSE streams; clients poll when it does not"""
+    return jsonify({'success': True, 'streaming': app.config['EVENTS_STREAMING']})
+
+@app.route('/api/student/events')
+def student_events():
+    """SSE stream of the signed-in student's transaction and complaint updates"""
+    if not app.config['EVENTS_STREAMING']:
+        return jsonify({'success': False, 'message': 'Live updates are not enabled'}), 503
+    if 'student_id' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    return event_stream([student_channel(session['student_id'])])
+
+@app.route('/api/employee/events')
+def employee_events():
+    """SSE stream of submitted transactions, verifications and complaints"""
+    if not app.config['EVENTS_STREAMING']:
+        return jsonify({'success': False, 'message': 'Live updates are not enabled'}), 503
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    return event_stream([EMPLOYEE_CHANNEL])
+
+@app.route('/api/sync')
+def sync():
+    """Students, transactions and complaints changed since a cursor.
+
+    ``?since=`` is the ``cursor`` of the previous response (0 or absent for a
+    full sync) and ``?limit=`` caps the records per page; keep requesting
+    while ``hasMore`` is true. Students only receive their own records.
+    Records deleted since the cursor are listed under ``deleted``; a
+    ``reset`` response means local data must be discarded and synced from 0.
+    """
+    try:
+        if 'user_id' in session:
+            student_id = None
+        elif 'student_id' in session:
+            student_id = session['student_id']
+        else:
+            return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+
+        since = request.args.get('since', 0, type=int)
+        if since < 0:
+            return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+        limit = min(max(request.args.get('limit', SYNC_PAGE_SIZE, type=int), 1), SYNC_PAGE_SIZE_MAX)
+
+        return jsonify(dict(sync_changes(since, limit, student_id), success=True))
+
+    except Exception as e:
+        app.logger.error(f"Sync error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
 @app.route('/api/student/save', methods=['POST'])
 def save_student():
     try:
         data = request.get_json()
-        
-        # Check if student already exists
-        student = Student.query.filter_by(roll_number=data['rollNumber']).first()
-        
-        if student:
-            # Update existing student
-            student.name = data['name']
-            student.branch = data['branch']
-            student.academic_year = data['academicYear']
-            student.category = data['category']
-            student.total_fees = data['totalAmount']
-            student.paid_amount = data['paidAmount']
-            student.pending_amount = data['pendingAmount']
-        else:
-            # Create new student
-            student = Student(
-                name=data['name'],
-                roll_number=data['rollNumber'],
-                branch=data['branch'],
-                academic_year=data['academicYear'],
-                category=data['category'],
-                total_fees=data['totalAmount'],
-                paid_amount=data['paidAmount'],
-                pending_amount=data['pendingAmount']
-            )
-            db.session.add(student)
+        roll_number = data['rollNumber']
+        values = {
+            'name': data['name'],
+            'branch': data['branch'],
+            'academic_year': data['academicYear'],
+            'category': data['category'],
+            'total_fees': data['totalAmount'],
+            'paid_amount': data['paidAmount'],
+            'pending_amount': data['pendingAmount']
+        }
 
-        db.session.commit()
+        def save(executor):
+            # Update the student if it already exists, otherwise create it
+            student_id = executor.execute(
+                select(Student.id).where(Student.roll_number == roll_number)
+            ).scalar()
+            if student_id:
+                executor.execute(
+                    update(Student).where(Student.id == student_id)
+                    .values(revision=Student.revision + 1, **values)
+                    .execution_options(synchronize_session=False)
+                )
+            else:
+                student_id = executor.execute(
+                    insert(Student).values(roll_number=roll_number, **values)
+                ).inserted_primary_key[0]
+            reindex_search(students=[student_id], executor=executor)
+            record_changes(students=[student_id], executor=executor)
+
+        run_write(save)
+        invalidate_student_cache(roll_number)
         return jsonify({'success': True, 'message': 'Student saved successfully'})
 
     except Exception as e:
@@ -560,15 +2221,53 @@ def save_student():
 
 @app.route('/api/students/list')
 def get_students():
+    """List students a page at a time using keyset pagination on Student.id.
+
+    Query parameters:
+        limit: page size (default 500, capped at 1000)
+        after: id cursor returned as ``nextCursor`` by the previous page
+    """
     try:
-        students = Student.query.all()
+        limit = min(max(request.args.get('limit', STUDENT_PAGE_SIZE, type=int), 1), STUDENT_PAGE_SIZE_MAX)
+        after = request.args.get('after', type=int)
+
+        # Statistics in one aggregate instead of scanning the list in Python;
+        # the latest updated_at doubles as the version marker for the ETag
+        total, paid, pending, last_updated = db.session.query(
+            func.count(Student.id),
+            func.count(case((Student.pending_amount <= 0, 1))),
+            func.count(case((Student.pending_amount > 0, 1))),
+            func.max(Student.updated_at)
+        ).one()
+
+        etag = f"students-{total}-{last_updated.isoformat() if last_updated else 0}-{limit}-{after or 0}"
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+
+        # Select only the columns the response needs instead of full entities
+        query = db.session.query(
+            Student.id,
+            Student.name,
+            Student.roll_number,
+            Student.branch,
+            Student.academic_year,
+            Student.category,
+            Student.total_fees,
+            Student.paid_amount,
+            Student.pending_amount
+        ).order_by(Student.id)
+        if after is not None:
+            query = query.filter(Student.id > after)
+        rows = query.limit(limit).all()
+
         stats = {
-            'total': len(students),
-            'paid': len([s for s in students if s.pending_amount <= 0]),
-            'pending': len([s for s in students if s.pending_amount > 0])
+            'total': total,
+            'paid': paid,
+            'pending': pending
         }
-        
-        return jsonify({
+
+        return etag_response({
             'success': True,
             'students': [{
                 'name': s.name,
@@ -576,35 +2275,125 @@ def get_students():
                 'branch': s.branch,
                 'academicYear': s.academic_year,
                 'category': s.category,
-                'totalAmount': float(s.total_fees),
-                'paidAmount': float(s.paid_amount),
-                'pendingAmount': float(s.pending_amount)
-            } for s in students],
-            'statistics': stats
-        })
+                'totalAmount': float(s.total_fees or 0),
+                'paidAmount': float(s.paid_amount or 0),
+                'pendingAmount': float(s.pending_amount or 0)
+            } for s in rows],
+            'statistics': stats,
+            'nextCursor': rows[-1].id if len(rows) == limit else None
+        }, etag)
 
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def apply_student_filters(query, filters):
+    """Apply the employee dashboard's branch/year/category/list-type filters to a Student query"""
+    if filters.get('branch'):
+        query = query.filter(Student.branch == filters['branch'])
+    if filters.get('academicYear'):
+        query = query.filter(Student.academic_year == filters['academicYear'])
+    if filters.get('category'):
+        query = query.filter(Student.category == filters['category'])
+    if filters.get('listType'):
+        if filters['listType'] == 'paidFee':
+            query = query.filter(Student.pending_amount <= 0)
+        elif filters['listType'] == 'pendingFee':
+            query = query.filter(Student.pending_amount > 0)
+    return query
+
+def student_export_rows(filters):
+    """Headers and a lazily fetched row iterator for the student export"""
+    query = db.session.query(
+        Student.name,
+        Student.roll_number,
+        Student.branch,
+        Student.academic_year,
+        Student.category,
+        Student.total_fees,
+        Student.paid_amount,
+        Student.pending_amount
+    )
+    query = apply_student_filters(query, filters).order_by(Student.id)
+
+    headers = ['Name', 'Roll Number', 'Branch', 'Academic Year', 'Category',
+               'Total Amount', 'Paid Amount', 'Pending Amount']
+    rows = ((
+        s.name,
+        s.roll_number,
+        s.branch,
+        s.academic_year,
+        s.category,
+        float(s.total_fees or 0),
+        float(s.paid_amount or 0),
+        float(s.pending_amount or 0)
+    ) for s in query.yield_per(EXPORT_BATCH_SIZE))
+    return headers, rows
+
+def transaction_export_rows(filters):
+    """Headers and a lazily fetched row iterator for the transaction export
+    (filters: branch, academicYear, feeType, status)"""
+    query = db.session.query(
+        Transaction.transaction_id,
+        Student.roll_number,
+        Student.name,
+        Student.branch,
+        Transaction.academic_year,
+        Transaction.fee_type,
+        Transaction.amount,
+        Transaction.utr_number,
+        Transaction.bill_number,
+        Transaction.status,
+        Transaction.date
+    ).join(Student, Transaction.student_id == Student.id)
+
+    if filters.get('branch'):
+        query = query.filter(Student.branch == filters['branch'])
+    if filters.get('academicYear'):
+        query = query.filter(Transaction.academic_year == filters['academicYear'])
+    if filters.get('feeType'):
+        query = query.filter(Transaction.fee_type == filters['feeType'])
+    if filters.get('status'):
+        query = query.filter(Transaction.status == filters['status'])
+    query = query.order_by(Transaction.id)
+
+    headers = ['Transaction ID', 'Roll Number', 'Name', 'Branch', 'Academic Year', 'Fee Type',
+               'Amount', 'UTR Number', 'Bill Number', 'Status', 'Date']
+    rows = ((
+        t.transaction_id,
+        t.roll_number,
+        t.name,
+        t.branch,
+        t.academic_year,
+        t.fee_type,
+        float(t.amount),
+        t.utr_number,
+        t.bill_number,
+        t.status,
+        t.date.strftime('%Y-%m-%d') if t.date else None
+    ) for t in query.yield_per(EXPORT_BATCH_SIZE))
+    return headers, rows
+
+def export_response(headers, rows, export_format, filename, sheet_name):
+    """Stream rows to the client as CSV or XLSX"""
+    if export_format == 'xlsx':
+        body = iter_xlsx(headers, rows, sheet_name=sheet_name)
+        mimetype = XLSX_MIMETYPE
+    else:
+        body = iter_csv(headers, rows)
+        mimetype = CSV_MIMETYPE
+        export_format = 'csv'
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}.{export_format}'}
+    )
+
 @app.route('/api/students/filter', methods=['POST'])
 def filter_students():
     try:
         filters = request.get_json()
-        query = Student.query
-
-        if filters.get('branch'):
-            query = query.filter_by(branch=filters['branch'])
-        if filters.get('academicYear'):
-            query = query.filter_by(academic_year=filters['academicYear'])
-        if filters.get('category'):
-            query = query.filter_by(category=filters['category'])
-        if filters.get('listType'):
-            if filters['listType'] == 'paidFee':
-                query = query.filter(Student.pending_amount <= 0)
-            elif filters['listType'] == 'pendingFee':
-                query = query.filter(Student.pending_amount > 0)
-
-        students = query.all()
+        students = apply_student_filters(Student.query, filters).all()
         
         return jsonify({
             'success': True,
@@ -623,31 +2412,410 @@ def filter_students():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/students/export')
+def export_students():
+    """Stream the filtered student list as CSV (default) or XLSX (?format=xlsx).
+
+    Accepts the same filters as /api/students/filter as query parameters.
+    """
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in ['csv', 'xlsx']:
+            return jsonify({'success': False, 'message': 'Invalid format'}), 400
+
+        headers, rows = student_export_rows(request.args)
+        return export_response(headers, rows, export_format, 'student_data', 'Students')
+
+    except Exception as e:
+        app.logger.error(f"Student export error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
+@app.route('/api/transactions/export')
+def export_transactions():
+    """Stream transactions as CSV (default) or XLSX (?format=xlsx).
+
+    Optional filters: branch, academicYear, feeType, status.
+    """
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in ['csv', 'xlsx']:
+            return jsonify({'success': False, 'message': 'Invalid format'}), 400
+
+        headers, rows = transaction_export_rows(request.args)
+        return export_response(headers, rows, export_format, 'transaction_data', 'Transactions')
+
+    except Exception as e:
+        app.logger.error(f"Transaction export error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
+@app.route('/api/search')
+def search():
+    """Ranked prefix search over student names and roll numbers, transaction ids,
+    UTR and bill numbers, and complaint subjects.
+
+    Query parameters:
+        q: search text (at least 2 characters)
+        type: comma separated subset of student, transaction, complaint
+        page, perPage: 1-based page and page size (default 20, capped at 100)
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if len(query) < 2:
+            return jsonify({'success': False, 'message': 'Search text must be at least 2 characters'}), 400
+
+        kinds = [kind for kind in request.args.get('type', '').split(',') if kind]
+        if any(kind not in SEARCH_KINDS for kind in kinds):
+            return jsonify({'success': False, 'message': 'Invalid type'}), 400
+
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('perPage', SEARCH_PAGE_SIZE, type=int), 1), SEARCH_PAGE_SIZE_MAX)
+
+        # Fetch one extra hit to know whether another page exists without counting
+        hits = search_index.search(db.session, query, kinds=kinds, limit=per_page + 1,
+                                   offset=(page - 1) * per_page)
+
+        return jsonify({
+            'success': True,
+            'query': query,
+            'page': page,
+            'perPage': per_page,
+            'hasMore': len(hits) > per_page,
+            'results': [{
+                'type': hit.kind,
+                'id': hit.ref,
+                'rollNumber': hit.roll_number,
+                'title': hit.title,
+                'score': round(float(hit.score), 4)
+            } for hit in hits[:per_page]]
+        })
+
+    except Exception as e:
+        app.logger.error(f"Search error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
+@app.route('/api/analytics/summary')
+def analytics_summary():
+    """Verified collection totals overall, by branch, year and category, and per day.
+
+    Reads only the rollup table, so the cost does not grow with the number of
+    students or transactions. Optional filters: branch, academicYear,
+    category; ``days`` sets the length of the daily series (default 30).
+    """
+    try:
+        days = min(max(request.args.get('days', 30, type=int), 1), 366)
+        conditions = []
+        for param, column in (('branch', FeeCollectionRollup.branch),
+                              ('academicYear', FeeCollectionRollup.academic_year),
+                              ('category', FeeCollectionRollup.category)):
+            if request.args.get(param):
+                conditions.append(column == request.args[param])
+
+        def totals(*group_by):
+            query = db.session.query(
+                *group_by,
+                func.coalesce(func.sum(FeeCollectionRollup.transactions), 0),
+                func.coalesce(func.sum(FeeCollectionRollup.amount), 0)
+            ).filter(*conditions)
+            if group_by:
+                query = query.group_by(*group_by).order_by(*group_by)
+            return query.all()
+
+        def breakdown(column, key):
+            return [{key: value, 'transactions': int(count), 'amount': float(amount)}
+                    for value, count, amount in totals(column)]
+
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        conditions_with_days = conditions + [FeeCollectionRollup.day >= since]
+        daily = db.session.query(
+            FeeCollectionRollup.day,
+            func.sum(FeeCollectionRollup.transactions),
+            func.sum(FeeCollectionRollup.amount)
+        ).filter(*conditions_with_days).group_by(FeeCollectionRollup.day).order_by(FeeCollectionRollup.day)
+
+        total_count, total_amount = totals()[0]
+        return jsonify({
+            'success': True,
+            'totals': {'transactions': int(total_count), 'amount': float(total_amount)},
+            'byBranch': breakdown(FeeCollectionRollup.branch, 'branch'),
+            'byAcademicYear': breakdown(FeeCollectionRollup.academic_year, 'academicYear'),
+            'byCategory': breakdown(FeeCollectionRollup.category, 'category'),
+            'daily': [{'date': day.isoformat(), 'transactions': int(count), 'amount': float(amount)}
+                      for day, count, amount in daily]
+        })
+
+    except Exception as e:
+        app.logger.error(f"Analytics summary error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
 @app.route('/api/students', methods=['POST'])
 def add_student():
     try:
         data = request.json
-        new_student = Student(
-            name=data['name'],
-            roll_number=data['rollNumber'],
-            gender=data['gender'],
-            category=data['category'],
-            academic_year=data['academicYear'],
-            branch=data['branch'],
-            fee_type=data['feeType'],
-            bill_number=data['billNumber'],
-            total_fees=Decimal(str(data['totalAmount'])),
-            paid_amount=Decimal(str(data['paidAmount'])),
-            pending_amount=Decimal(str(data['totalAmount'])) - Decimal(str(data['paidAmount']))
-        )
-        
-        db.session.add(new_student)
-        db.session.commit()
+        values = {
+            'name': data['name'],
+            'roll_number': data['rollNumber'],
+            'gender': data['gender'],
+            'category': data['category'],
+            'academic_year': data['academicYear'],
+            'branch': data['branch'],
+            'fee_type': data['feeType'],
+            'bill_number': data['billNumber'],
+            'total_fees': Decimal(str(data['totalAmount'])),
+            'paid_amount': Decimal(str(data['paidAmount'])),
+            'pending_amount': Decimal(str(data['totalAmount'])) - Decimal(str(data['paidAmount']))
+        }
+
+        def add(executor):
+            row_id = executor.execute(insert(Student).values(**values)).inserted_primary_key[0]
+            reindex_search(students=[row_id], executor=executor)
+            record_changes(students=[row_id], executor=executor)
+            return row_id
+
+        new_student = db.session.get(Student, run_write(add))
+        invalidate_student_cache(new_student.roll_number)
         
         return jsonify({'message': 'Student added successfully', 'student': new_student.to_dict()}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/students/import', methods=['POST'])
+def import_students_upload():
+    """Bulk create/update students from an uploaded CSV or XLSX file (form field ``file``)"""
+    try:
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return jsonify({'success': False, 'message': 'No file uploaded'}), 400
+
+        file_format = request.form.get('format') or upload.filename.rsplit('.', 1)[-1].lower()
+        if file_format not in ['csv', 'xlsx']:
+            return jsonify({'success': False, 'message': 'Only CSV and XLSX files are supported'}), 400
+
+        summary = import_students(upload.stream, file_format)
+        return jsonify(dict(summary, success=True))
+
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Student import error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
+@app.route('/api/reconcile', methods=['POST'])
+def reconcile_upload():
+    """Reconcile an uploaded bank statement CSV (form field ``file``) by UTR.
+
+    Set form field ``autoVerify=true`` to verify pending transactions whose
+    UTR and amount both match a statement line.
+    """
+    try:
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return jsonify({'success': False, 'message': 'No file uploaded'}), 400
+        if upload.filename.rsplit('.', 1)[-1].lower() != 'csv':
+            return jsonify({'success': False, 'message': 'Only CSV statements are supported'}), 400
+
+        auto_verify = request.form.get('autoVerify', '').lower() in ('1', 'true', 'yes')
+        summary = reconcile_statement(upload.stream, auto_verify, verified_by=session.get('user_id'))
+        return jsonify(dict(summary, success=True))
+
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Reconciliation error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
+# Background jobs
+with app.app_context():
+    job_queue = JobQueue(db.engine, BackgroundJob.__table__, app.config['JOBS_DIR'],
+                         lease_seconds=app.config['JOBS_LEASE_SECONDS'])
+
+def job_concurrency(job_type, default):
+    return app.config['JOBS_CONCURRENCY'].get(job_type, default)
+
+EXPORT_DATASETS = {
+    'students': (student_export_rows, 'student_data', 'Students'),
+    'transactions': (transaction_export_rows, 'transaction_data', 'Transactions'),
+}
+
+@job_queue.register('import_students', concurrency=job_concurrency('import_students', 1), max_attempts=2)
+def import_students_job(ctx):
+    with open(ctx.path(ctx.payload['file']), 'rb') as f:
+        return import_students(f, ctx.payload['format'],
+                               progress=lambda rows: ctx.progress(rows, message=f'{rows} rows imported'))
+
+@job_queue.register('reconcile', concurrency=job_concurrency('reconcile', 1), max_attempts=2)
+def reconcile_job(ctx):
+    # Re-running is safe: lines verified by an earlier attempt come back as already processed
+    with open(ctx.path(ctx.payload['file']), 'rb') as f:
+        return reconcile_statement(f, ctx.payload.get('autoVerify', False), ctx.payload.get('verifiedBy'),
+                                   progress=lambda lines: ctx.progress(lines, message=f'{lines} lines matched'))
+
+@job_queue.register('export', concurrency=job_concurrency('export', 2))
+def export_job(ctx):
+    build_rows, filename, sheet_name = EXPORT_DATASETS[ctx.payload['dataset']]
+    export_format = ctx.payload.get('format', 'csv')
+    headers, rows = build_rows(ctx.payload.get('filters') or {})
+
+    def counted(rows):
+        for count, row in enumerate(rows, start=1):
+            if count % EXPORT_BATCH_SIZE == 0:
+                ctx.progress(count, message=f'{count} rows exported')
+            yield row
+
+    ctx.result_file = f'{filename}.{export_format}'
+    if export_format == 'xlsx':
+        chunks = iter_xlsx(headers, counted(rows), sheet_name=sheet_name)
+    else:
+        chunks = (chunk.encode('utf-8') for chunk in iter_csv(headers, counted(rows)))
+    with open(ctx.path(ctx.result_file), 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    return {'file': ctx.result_file}
+
+@job_queue.register('generate_receipts', concurrency=job_concurrency('generate_receipts', 1), max_attempts=2)
+def generate_receipts_job(ctx):
+    branch = ctx.payload['branch']
+    paths = generate_branch_receipts(branch, ctx.payload.get('academicYear'))
+    ctx.result_file = f'receipts_{branch}.zip'
+    zip_receipts(paths, ctx.path(ctx.result_file))
+    return {'receipts': len(paths)}
+
+@job_queue.register('init_db', concurrency=1, max_attempts=1)
+def init_db_job(ctx):
+    init_db(keep_jobs=True)
+    return {'initialized': True}
+
+def job_request_payload(job_type):
+    """Validate a POST /api/jobs request; returns ``(payload, upload, error)``"""
+    data = request.form if request.files else (request.get_json(silent=True) or {})
+    upload = request.files.get('file')
+    extension = upload.filename.rsplit('.', 1)[-1].lower() if upload and upload.filename else None
+
+    if job_type == 'import_students':
+        if extension not in ['csv', 'xlsx']:
+            return None, None, 'Upload a CSV or XLSX file'
+        return {'file': f'upload.{extension}', 'format': extension}, upload, None
+    if job_type == 'reconcile':
+        if extension != 'csv':
+            return None, None, 'Upload a CSV statement'
+        auto_verify = str(data.get('autoVerify', '')).lower() in ('1', 'true', 'yes')
+        return {'file': 'statement.csv', 'autoVerify': auto_verify,
+                'verifiedBy': session.get('user_id')}, upload, None
+    if job_type == 'export':
+        if data.get('dataset') not in EXPORT_DATASETS or data.get('format', 'csv') not in ['csv', 'xlsx']:
+            return None, None, 'Invalid dataset or format'
+        filters = data.get('filters') if isinstance(data.get('filters'), dict) else {}
+        return {'dataset': data['dataset'], 'format': data.get('format', 'csv'), 'filters': filters}, None, None
+    if job_type == 'generate_receipts':
+        if not data.get('branch'):
+            return None, None, 'Branch is required'
+        return {'branch': data['branch'], 'academicYear': data.get('academicYear')}, None, None
+    if job_type == 'init_db':
+        user = User.query.get(session['user_id']) if 'user_id' in session else None
+        if not user or user.role != 'admin':
+            return None, None, 'Only administrators can reinitialize the database'
+        return {}, None, None
+    return None, None, 'Unknown job type'
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Queue a background job and return it with status 202.
+
+    JSON (or multipart form for uploads, file in ``file``) with ``type`` one of
+    import_students, reconcile, export, generate_receipts or init_db, plus
+    that type's options. Poll ``GET /api/jobs/<id>`` for progress.
+    """
+    job_dir = None
+    try:
+        data = request.form if request.files else (request.get_json(silent=True) or {})
+        job_type = data.get('type')
+        payload, upload, error = job_request_payload(job_type)
+        if error:
+            return jsonify({'success': False, 'message': error}), 403 if job_type == 'init_db' else 400
+
+        created_by = session.get('user_id')
+
+        def create(executor):
+            nonlocal job_dir
+            job_id = job_queue.enqueue(executor, job_type, payload, created_by=created_by)
+            # Saved before the commit, so a worker never claims a job without its file
+            if upload:
+                job_dir = job_queue.work_dir(job_id)
+                os.makedirs(job_dir, exist_ok=True)
+                upload.save(os.path.join(job_dir, payload['file']))
+            return job_id
+
+        job_id = run_write(create)
+
+        return jsonify({'success': True, 'job': db.session.get(BackgroundJob, job_id).to_dict()}), 202
+
+    except Exception as e:
+        db.session.rollback()
+        if job_dir:
+            shutil.rmtree(job_dir, ignore_errors=True)
+        app.logger.error(f"Job creation error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
+@app.route('/api/jobs')
+def list_jobs():
+    """Most recent jobs, newest first (optional ``type``, ``status``, ``limit`` up to 100)"""
+    try:
+        query = BackgroundJob.query
+        if request.args.get('type'):
+            query = query.filter(BackgroundJob.job_type == request.args['type'])
+        if request.args.get('status'):
+            query = query.filter(BackgroundJob.status == request.args['status'])
+        limit = min(request.args.get('limit', 20, type=int) or 20, 100)
+        jobs = query.order_by(BackgroundJob.id.desc()).limit(limit).all()
+        return jsonify({'success': True, 'jobs': [job.to_dict() for job in jobs]})
+
+    except Exception as e:
+        app.logger.error(f"Job list error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
+@app.route('/api/jobs/<int:job_id>')
+def get_job(job_id):
+    try:
+        job = db.session.get(BackgroundJob, job_id)
+        if not job:
+            return jsonify({'success': False, 'message': 'Job not found'}), 404
+        return jsonify({'success': True, 'job': job.to_dict()})
+
+    except Exception as e:
+        app.logger.error(f"Job status error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
+@app.route('/api/jobs/<int:job_id>/result')
+def get_job_result(job_id):
+    """Download the file a finished job produced (export, receipts ZIP)"""
+    try:
+        job = db.session.get(BackgroundJob, job_id)
+        if not job or not job.result_file:
+            return jsonify({'success': False, 'message': 'No result file for this job'}), 404
+        path = os.path.join(job_queue.work_dir(job.id), job.result_file)
+        if not os.path.exists(path):
+            return jsonify({'success': False, 'message': 'Result file has expired'}), 410
+        return send_file(path, as_attachment=True, download_name=job.result_file)
+
+    except Exception as e:
+        app.logger.error(f"Job result error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
+@app.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a job that has not started yet"""
+    try:
+        cancelled = run_write(lambda executor: job_queue.cancel(executor, job_id))
+        if not cancelled:
+            return jsonify({'success': False, 'message': 'Only queued jobs can be cancelled'}), 409
+        return jsonify({'success': True, 'job': db.session.get(BackgroundJob, job_id).to_dict()})
+
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Job cancel error: {str(e)}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
 @app.route('/api/logout')
 def logout():
     session.clear()
@@ -664,17 +2832,23 @@ def get_employee_session():
         if not user:
             return jsonify({'success': False, 'message': 'User not found'}), 404
 
-        return jsonify({
+        user_data = {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'role': user.role,
+            'authMethod': user.auth_method,
+            'lastLogin': user.last_login.isoformat() if user.last_login else None
+        }
+        etag = 'session-' + hashlib.sha1(repr(sorted(user_data.items())).encode('utf-8')).hexdigest()
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+
+        return etag_response({
             'success': True,
-            'user': {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'role': user.role,
-                'authMethod': user.auth_method,
-                'lastLogin': user.last_login.isoformat() if user.last_login else None
-            }
-        })
+            'user': user_data
+        }, etag)
 
     except Exception as e:
         app.logger.error(f"Session error: {str(e)}")
@@ -721,6 +2895,8 @@ def employee_register():
             'message': 'Registration successful'
         })
 
+    except HashingBusy:
+        return jsonify({'success': False, 'message': 'Server busy, please try again'}), 503
     except Exception as e:
         app.logger.error(f"Registration error: {str(e)}")
         return jsonify({'success': False, 'message': 'Server error'}), 500
@@ -790,13 +2966,17 @@ def check_user_registration():
 
 
 # Create database tables
-def init_db():
+def init_db(keep_jobs=False):
     with app.app_context():
-        # Drop all tables
-        db.drop_all()
+        # Drop all tables (but the job table when running as a background job)
+        tables = [table for table in db.metadata.sorted_tables
+                  if not (keep_jobs and table is BackgroundJob.__table__)]
+        db.metadata.drop_all(bind=db.engine, tables=tables)
         
         # Create all tables
         db.create_all()
+        search_index.drop_schema(db.session)
+        search_index.create_schema(db.session)
         
         # Create admin user
         admin = User(
@@ -864,6 +3044,48 @@ def create_demo_user():
         app.logger.error(f"Demo user creation error: {str(e)}")
         return jsonify({'success': False, 'message': 'Server error'}), 500
 
+@app.route('/api/health/db')
+def database_health():
+    """Connection pool usage, connect latency and a live round-trip check"""
+    pool = db.engine.pool
+    started = time.perf_counter()
+    try:
+        with db.engine.connect() as connection:
+            connection.execute(db.text('SELECT 1'))
+        healthy, error = True, None
+    except Exception as e:
+        app.logger.error(f"Database health check error: {str(e)}")
+        healthy, error = False, str(e)
+    round_trip_ms = (time.perf_counter() - started) * 1000
+
+    pool_status = {'class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, name):
+            pool_status[name] = getattr(pool, name)()
+
+    with db_connect_stats_lock:
+        connect_stats = dict(db_connect_stats)
+
+    return jsonify({
+        'success': healthy,
+        'dialect': db.engine.dialect.name,
+        'roundTripMs': round(round_trip_ms, 2),
+        'pool': pool_status,
+        'connections': connect_stats,
+        'sqliteWriter': sqlite_writer.stats() if sqlite_writer is not None else None,
+        'error': error
+    }), 200 if healthy else 503
+
+@app.route('/api/health/hashing')
+def password_hashing_health():
+    """Password hashing pool load (in-flight and queued hash operations)"""
+    return jsonify({'success': True, 'hashing': password_hasher.stats()})
+
+@app.route('/api/health/events')
+def events_health():
+    """Event backend in use and SSE streams open in this worker"""
+    return jsonify({'success': True, 'backend': app.config['EVENTS_BACKEND'], 'events': broadcaster.stats()})
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -884,6 +3106,128 @@ def init_db_command():
     except Exception as e:
         print(f'Error initializing database: {str(e)}')
 
+@app.cli.command("rebuild-ledger")
+def rebuild_ledger_command():
+    """Rebuild the student fee ledger from verified transactions."""
+    try:
+        rebuild_fee_ledger()
+        print('Fee ledger rebuilt successfully.')
+    except Exception as e:
+        db.session.rollback()
+        print(f'Error rebuilding fee ledger: {str(e)}')
+
+@app.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Rebuild the fee collection rollups from verified transactions."""
+    try:
+        rebuild_collection_rollups()
+        print('Collection rollups rebuilt successfully.')
+    except Exception as e:
+        db.session.rollback()
+        print(f'Error rebuilding collection rollups: {str(e)}')
+
+@app.cli.command("rebuild-search-index")
+def rebuild_search_index_command():
+    """Rebuild the search index from students, transactions and complaints."""
+    try:
+        rebuild_search_index()
+        print('Search index rebuilt successfully.')
+    except Exception as e:
+        db.session.rollback()
+        print(f'Error rebuilding search index: {str(e)}')
+
+@app.cli.command("compact-change-log")
+def compact_change_log_command():
+    """Drop sync change log entries superseded by newer ones."""
+    try:
+        print(f'Removed {compact_change_log()} superseded change log entries.')
+    except Exception as e:
+        db.session.rollback()
+        print(f'Error compacting change log: {str(e)}')
+
+@app.cli.command("purge-idempotency-keys")
+def purge_idempotency_keys_command():
+    """Delete expired Idempotency-Key responses."""
+    try:
+        print(f'Deleted {idempotency_store.purge()} expired idempotency keys.')
+    except Exception as e:
+        print(f'Error purging idempotency keys: {str(e)}')
+
+@app.cli.command("generate-receipts")
+@click.argument("branch")
+@click.option("--academic-year", default=None, help="Only this academic year.")
+@click.option("--workers", type=int, default=None, help="Renderer processes (default: CPU count).")
+@click.option("--zip", "zip_path", type=click.Path(dir_okay=False), default=None,
+              help="Also bundle the receipts into this ZIP file.")
+def generate_receipts_command(branch, academic_year, workers, zip_path):
+    """Render the receipts of every verified payment in a branch."""
+    try:
+        paths = generate_branch_receipts(branch, academic_year, workers)
+        if zip_path:
+            zip_receipts(paths, zip_path)
+        print(f'Generated {len(paths)} receipts for {branch}.')
+    except Exception as e:
+        db.session.rollback()
+        print(f'Error generating receipts: {str(e)}')
+
+@app.cli.command("run-worker")
+@click.option("--concurrency", type=int, default=2, help="Jobs run at the same time by this process.")
+@click.option("--types", default=None, help="Comma separated job types to take (default: all).")
+def run_worker_command(concurrency, types):
+    """Run background jobs until stopped (SIGTERM lets running jobs finish)."""
+    worker = Worker(job_queue, app.app_context, app.logger, concurrency=concurrency,
+                    poll_interval=app.config['JOBS_POLL_INTERVAL'],
+                    types=types.split(',') if types else None)
+    print(f'Job worker {worker.worker_id} started ({concurrency} threads).')
+    worker.run()
+
+@app.cli.command("purge-jobs")
+@click.option("--days", type=int, default=7, help="Delete jobs finished more than this many days ago.")
+def purge_jobs_command(days):
+    """Delete finished background jobs and their files."""
+    try:
+        purged = job_queue.purge(datetime.utcnow() - timedelta(days=days))
+        print(f'Purged {purged} jobs.')
+    except Exception as e:
+        print(f'Error purging jobs: {str(e)}')
+
+@app.cli.command("import-students")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def import_students_command(path):
+    """Import students from a CSV or XLSX file."""
+    file_format = path.rsplit('.', 1)[-1].lower()
+    try:
+        with open(path, 'rb') as f:
+            summary = import_students(f, file_format)
+    except Exception as e:
+        print(f'Error importing students: {str(e)}')
+        return
+
+    for error in summary['errors']:
+        print(f"Row {error['row']} ({error['rollNumber'] or '-'}): {error['message']}")
+    print(f"Imported students: {summary['inserted']} inserted, "
+          f"{summary['updated']} updated, {summary['failed']} failed.")
+
+@app.cli.command("reconcile")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--auto-verify", is_flag=True, help="Verify pending transactions that match exactly.")
+def reconcile_command(path, auto_verify):
+    """Reconcile a bank statement CSV against submitted transactions."""
+    try:
+        with open(path, 'rb') as f:
+            summary = reconcile_statement(f, auto_verify)
+    except Exception as e:
+        db.session.rollback()
+        print(f'Error reconciling statement: {str(e)}')
+        return
+
+    for result in summary['results']:
+        if result['status'] not in (MATCHED, UNMATCHED):
+            print(f"Row {result['row']} ({result['utr'] or '-'}): "
+                  f"{result.get('message') or result['status']}")
+    counts = ', '.join(f"{summary.get(status, 0)} {status}" for status in RECONCILE_STATUSES)
+    print(f"Reconciled statement: {counts}; {summary['verified']} verified.")
+
 if __name__ == '__main__':
     try:
         init_db()
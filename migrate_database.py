@@ -1,149 +1,367 @@
 #!/usr/bin/env python3
 """
 Database Migration Script
-This script helps migrate data from SQLite to cloud databases
+This script copies data from the local SQLite database into the cloud database
+configured by DATABASE_URL (see config.py).
+
+Rows are streamed from SQLite in batches and written with bound, batched
+inserts (COPY on PostgreSQL), so memory use does not grow with table size.
+Each table resumes after the highest id already present in the target (tables
+without an id skip rows whose primary key is already there), so an
+interrupted run can simply be started again.
+
+Usage:
+    python migrate_database.py [--source PATH] [--batch-size N] [--workers N]
+                               [--tables users,students,...] [--no-copy] [--verify-only]
 """
 
 import os
 import sys
+import csv
+import io
+import time
 import sqlite3
+import hashlib
+import argparse
+import threading
 from datetime import datetime
 from decimal import Decimal
-import json
-
-def get_sqlite_data(db_path):
-    """Extract data from SQLite database"""
-    if not os.path.exists(db_path):
-        print(f"SQLite database not found at {db_path}")
-        return None
-    
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    data = {}
-    
-    # Get all tables
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tables = [row[0] for row in cursor.fetchall()]
-    
-    for table in tables:
-        cursor.execute(f"SELECT * FROM {table}")
-        rows = cursor.fetchall()
-        data[table] = [dict(row) for row in rows]
-        print(f"Extracted {len(rows)} records from {table}")
-    
-    conn.close()
-    return data
-
-def create_migration_sql(data):
-    """Create SQL migration script"""
-    sql_script = []
-    sql_script.append("-- Database Migration Script")
-    sql_script.append(f"-- Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    sql_script.append("")
-    
-    # Insert users data
-    if 'users' in data:
-        sql_script.append("-- Insert Users")
-        for user in data['users']:
-            sql_script.append(f"""
-INSERT INTO users (id, username, email, password_hash, role, created_at, last_login, is_active, biometric_id, face_data, auth_method)
-VALUES ({user['id']}, '{user['username']}', '{user['email']}', '{user['password_hash']}', '{user['role']}', 
-        '{user['created_at']}', {f"'{user['last_login']}'" if user['last_login'] else 'NULL'}, 
-        {user['is_active']}, {f"'{user['biometric_id']}'" if user['biometric_id'] else 'NULL'}, 
-        {f"'{user['face_data']}'" if user['face_data'] else 'NULL'}, 
-        {f"'{user['auth_method']}'" if user['auth_method'] else 'NULL'})
-ON CONFLICT (id) DO NOTHING;""")
-    
-    # Insert students data
-    if 'students' in data:
-        sql_script.append("\n-- Insert Students")
-        for student in data['students']:
-            sql_script.append(f"""
-INSERT INTO students (id, name, roll_number, gender, category, academic_year, branch, fee_type, bill_number, 
-                     total_fees, paid_amount, pending_amount, created_at, updated_at, biometric_id)
-VALUES ({student['id']}, '{student['name']}', '{student['roll_number']}', 
-        {f"'{student['gender']}'" if student['gender'] else 'NULL'}, 
-        '{student['category']}', '{student['academic_year']}', '{student['branch']}', 
-        {f"'{student['fee_type']}'" if student['fee_type'] else 'NULL'}, 
-        {f"'{student['bill_number']}'" if student['bill_number'] else 'NULL'}, 
-        {student['total_fees']}, {student['paid_amount']}, {student['pending_amount']}, 
-        '{student['created_at']}', '{student['updated_at']}', 
-        {f"'{student['biometric_id']}'" if student['biometric_id'] else 'NULL'})
-ON CONFLICT (id) DO NOTHING;""")
-    
-    # Insert transactions data
-    if 'transactions' in data:
-        sql_script.append("\n-- Insert Transactions")
-        for transaction in data['transactions']:
-            sql_script.append(f"""
-INSERT INTO transactions (id, transaction_id, student_id, amount, fee_type, academic_year, utr_number, 
-                         bill_number, status, verification_comment, verified_by, verified_at, date, 
-                         mobile_number, created_at)
-VALUES ({transaction['id']}, '{transaction['transaction_id']}', {transaction['student_id']}, 
-        {transaction['amount']}, '{transaction['fee_type']}', '{transaction['academic_year']}', 
-        {f"'{transaction['utr_number']}'" if transaction['utr_number'] else 'NULL'}, 
-        {f"'{transaction['bill_number']}'" if transaction['bill_number'] else 'NULL'}, 
-        '{transaction['status']}', 
-        {f"'{transaction['verification_comment']}'" if transaction['verification_comment'] else 'NULL'}, 
-        {transaction['verified_by'] if transaction['verified_by'] else 'NULL'}, 
-        {f"'{transaction['verified_at']}'" if transaction['verified_at'] else 'NULL'}, 
-        '{transaction['date']}', 
-        {f"'{transaction['mobile_number']}'" if transaction['mobile_number'] else 'NULL'}, 
-        '{transaction['created_at']}')
-ON CONFLICT (id) DO NOTHING;""")
-    
-    # Insert complaints data
-    if 'complaints' in data:
-        sql_script.append("\n-- Insert Complaints")
-        for complaint in data['complaints']:
-            sql_script.append(f"""
-INSERT INTO complaints (id, complaint_id, student_id, subject, description, status, response, 
-                       responded_by, created_at, updated_at)
-VALUES ({complaint['id']}, '{complaint['complaint_id']}', {complaint['student_id']}, 
-        '{complaint['subject']}', '{complaint['description']}', '{complaint['status']}', 
-        {f"'{complaint['response']}'" if complaint['response'] else 'NULL'}, 
-        {complaint['responded_by'] if complaint['responded_by'] else 'NULL'}, 
-        '{complaint['created_at']}', '{complaint['updated_at']}')
-ON CONFLICT (id) DO NOTHING;""")
-    
-    return "\n".join(sql_script)
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, MetaData, Boolean, DateTime, Numeric, func, select, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import ProductionConfig
+
+print_lock = threading.Lock()
+
+
+def log(message):
+    with print_lock:
+        print(message, flush=True)
+
+
+def get_target_url():
+    """Return the target database URL from config.py"""
+    url = ProductionConfig.SQLALCHEMY_DATABASE_URI
+    if url.startswith('postgres://'):
+        # Heroku-style URLs are not accepted by SQLAlchemy
+        url = url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+
+def source_tables(source):
+    """Return {table: [columns]} for every user table in the SQLite database"""
+    tables = {}
+    for (name,) in source.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"):
+        tables[name] = [row[1] for row in source.execute(f'PRAGMA table_info("{name}")')]
+    return tables
+
+
+def table_levels(metadata, names):
+    """Group tables so that every table comes after the tables it references.
+
+    Tables within one level have no foreign keys between them and can be
+    copied in parallel.
+    """
+    depth = {}
+    for table in metadata.sorted_tables:
+        if table.name not in names:
+            continue
+        parents = [fk.column.table.name for fk in table.foreign_keys
+                   if fk.column.table.name in depth and fk.column.table.name != table.name]
+        depth[table.name] = 1 + max((depth[p] for p in parents), default=-1)
+
+    levels = {}
+    for name, level in depth.items():
+        levels.setdefault(level, []).append(name)
+    return [levels[level] for level in sorted(levels)]
+
+
+def _parse_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def column_converters(table, columns):
+    """Per-column functions turning SQLite values into values the target driver accepts"""
+    converters = []
+    for name in columns:
+        column_type = table.c[name].type
+        if isinstance(column_type, Boolean):
+            converters.append(lambda v: None if v is None else bool(v))
+        elif isinstance(column_type, DateTime):
+            converters.append(_parse_datetime)
+        elif isinstance(column_type, Numeric):
+            converters.append(lambda v: None if v is None else Decimal(str(v)))
+        else:
+            converters.append(lambda v: v)
+    return converters
+
+
+def _copy_rows(connection, table, columns, rows, conflict_keys=None):
+    """Write a batch with PostgreSQL COPY.
+
+    With ``conflict_keys`` the batch is copied into a staging table and merged
+    with ON CONFLICT DO NOTHING, so rows already in the target are skipped.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['\\N' if v is None else v for v in row])
+    buffer.seek(0)
+
+    quoted = ', '.join(f'"{c}"' for c in columns)
+    destination = f'"{table.name}"'
+    cursor = connection.connection.cursor()
+    try:
+        if conflict_keys:
+            destination = f'"{table.name}_staging"'
+            cursor.execute(f'CREATE TEMP TABLE {destination} (LIKE "{table.name}" INCLUDING DEFAULTS) '
+                           f'ON COMMIT DROP')
+        cursor.copy_expert(
+            f'COPY {destination} ({quoted}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')', buffer)
+        if conflict_keys:
+            keys = ', '.join(f'"{c}"' for c in conflict_keys)
+            cursor.execute(f'INSERT INTO "{table.name}" ({quoted}) SELECT {quoted} FROM {destination} '
+                           f'ON CONFLICT ({keys}) DO NOTHING')
+    finally:
+        cursor.close()
+
+
+def _insert_rows(connection, table, rows, conflict_keys=None):
+    """Write a batch of column dicts with one executemany INSERT.
+
+    With ``conflict_keys`` rows whose key is already in the target are
+    skipped: ON CONFLICT DO NOTHING on PostgreSQL/SQLite, a key lookup
+    elsewhere.
+    """
+    if not conflict_keys:
+        connection.execute(table.insert(), rows)
+        return
+
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        connection.execute(dialect_insert(table).on_conflict_do_nothing(index_elements=conflict_keys), rows)
+        return
+
+    key_columns = [table.c[c] for c in conflict_keys]
+    existing = {tuple(key) for key in connection.execute(select(*key_columns).where(
+        tuple_(*key_columns).in_([tuple(row[c] for c in conflict_keys) for row in rows])
+    ))}
+    rows = [row for row in rows if tuple(row[c] for c in conflict_keys) not in existing]
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+def migrate_table(source_path, engine, table, source_columns, batch_size, use_copy):
+    """Stream one table from SQLite into the target, resuming after its max id.
+
+    Tables without an id column are copied in full on every run, skipping
+    rows whose primary key is already in the target.
+    """
+    columns = [c for c in source_columns if c in table.c]
+    converters = column_converters(table, columns)
+    has_id = 'id' in columns
+    conflict_keys = None if has_id else [c.name for c in table.primary_key.columns] or None
+
+    with engine.connect() as connection:
+        last_id = connection.execute(select(func.max(table.c.id))).scalar() if has_id else None
+    last_id = last_id or 0
+
+    source = sqlite3.connect(source_path)
+    try:
+        quoted = ', '.join(f'"{c}"' for c in columns)
+        if has_id:
+            cursor = source.execute(
+                f'SELECT {quoted} FROM "{table.name}" WHERE id > ? ORDER BY id', (last_id,))
+        else:
+            cursor = source.execute(f'SELECT {quoted} FROM "{table.name}"')
+
+        if last_id:
+            log(f"{table.name}: resuming after id {last_id}")
+        elif conflict_keys:
+            log(f"{table.name}: no id column, skipping rows already in the target")
+
+        copied = 0
+        started = time.monotonic()
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+
+            with engine.begin() as connection:
+                if use_copy:
+                    _copy_rows(connection, table, columns, rows, conflict_keys)
+                else:
+                    _insert_rows(connection, table, [
+                        {c: convert(v) for c, convert, v in zip(columns, converters, row)}
+                        for row in rows
+                    ], conflict_keys)
+
+            copied += len(rows)
+            elapsed = max(time.monotonic() - started, 1e-9)
+            log(f"{table.name}: {copied} rows ({copied / elapsed:,.0f} rows/sec), "
+                f"last id {rows[-1][columns.index('id')] if has_id else '-'}")
+    finally:
+        source.close()
+
+    if has_id and engine.dialect.name == 'postgresql' and copied:
+        # Explicit ids were inserted, so move the serial sequence past them
+        with engine.begin() as connection:
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), "
+                f"(SELECT MAX(id) FROM \"{table.name}\"))"))
+
+    if conflict_keys:
+        log(f"{table.name}: done, {copied} rows checked (rows already in the target skipped)")
+    else:
+        log(f"{table.name}: done, {copied} rows copied")
+    return copied
+
+
+def _normalize(value):
+    """Render a value the same way regardless of which backend returned it"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float, Decimal)):
+        normalized = Decimal(str(value)).normalize()
+        return format(normalized, 'f')
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ', timespec='microseconds')
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).isoformat(sep=' ', timespec='microseconds')
+        except ValueError:
+            return value
+    return str(value)
+
+
+def _checksum(rows):
+    digest = hashlib.sha256()
+    count = 0
+    for row in rows:
+        digest.update('\x1f'.join(_normalize(v) for v in row).encode('utf-8'))
+        digest.update(b'\x1e')
+        count += 1
+    return count, digest.hexdigest()
+
+
+def _iter_sqlite(source_path, table_name, columns, batch_size):
+    source = sqlite3.connect(source_path)
+    try:
+        quoted = ', '.join(f'"{c}"' for c in columns)
+        order = ' ORDER BY id' if 'id' in columns else ''
+        cursor = source.execute(f'SELECT {quoted} FROM "{table_name}"{order}')
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        source.close()
+
+
+def _iter_target(engine, table, columns, batch_size):
+    statement = select(*[table.c[c] for c in columns])
+    if 'id' in columns:
+        statement = statement.order_by(table.c.id)
+    with engine.connect() as connection:
+        result = connection.execution_options(yield_per=batch_size).execute(statement)
+        for partition in result.partitions():
+            yield from partition
+
+
+def verify_table(source_path, engine, table, source_columns, batch_size):
+    """Compare row count and content checksum of one table on both sides"""
+    columns = [c for c in source_columns if c in table.c]
+    source_count, source_hash = _checksum(_iter_sqlite(source_path, table.name, columns, batch_size))
+    target_count, target_hash = _checksum(_iter_target(engine, table, columns, batch_size))
+    return source_count, target_count, source_hash == target_hash
+
 
 def main():
     """Main migration function"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description='Copy the SQLite database into DATABASE_URL')
+    parser.add_argument('--source', default=os.path.join(base_dir, 'instance', 'fee_management.db'),
+                        help='path of the SQLite database to copy from')
+    parser.add_argument('--batch-size', type=int, default=1000, help='rows per fetch/insert batch')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='tables copied in parallel (within one dependency level)')
+    parser.add_argument('--tables', help='comma separated list of tables to copy (default: all)')
+    parser.add_argument('--no-copy', action='store_true',
+                        help='use batched INSERTs even when the target is PostgreSQL')
+    parser.add_argument('--verify-only', action='store_true', help='only compare checksums')
+    args = parser.parse_args()
+
     print("Fee Management System - Database Migration Tool")
     print("=" * 50)
-    
-    # Get SQLite database path
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    sqlite_path = os.path.join(base_dir, 'instance', 'fee_management.db')
-    
-    print(f"Looking for SQLite database at: {sqlite_path}")
-    
-    # Extract data from SQLite
-    data = get_sqlite_data(sqlite_path)
-    if not data:
-        print("No data found to migrate.")
-        return
-    
-    # Create migration SQL
-    migration_sql = create_migration_sql(data)
-    
-    # Save migration script
-    migration_file = os.path.join(base_dir, 'migration_script.sql')
-    with open(migration_file, 'w', encoding='utf-8') as f:
-        f.write(migration_sql)
-    
-    print(f"\nMigration script created: {migration_file}")
-    print("\nTo use this script:")
-    print("1. Set up your cloud database")
-    print("2. Run the Flask app to create tables in the cloud database")
-    print("3. Execute the migration script on your cloud database")
-    print("\nExample for PostgreSQL:")
-    print(f"psql -h your-host -U your-username -d your-database -f {migration_file}")
-    print("\nExample for MySQL:")
-    print(f"mysql -h your-host -u your-username -p your-database < {migration_file}")
+
+    if not os.path.exists(args.source):
+        print(f"SQLite database not found at {args.source}")
+        return False
+
+    target_url = get_target_url()
+    if target_url.startswith('sqlite') and os.path.abspath(args.source) in target_url:
+        print("DATABASE_URL is not set (target is the source SQLite database).")
+        return False
+
+    engine = create_engine(target_url, pool_pre_ping=True, pool_size=max(args.workers, 1))
+    metadata = MetaData()
+    metadata.reflect(engine)
+
+    source = sqlite3.connect(args.source)
+    try:
+        tables = source_tables(source)
+    finally:
+        source.close()
+
+    wanted = set(args.tables.split(',')) if args.tables else set(tables)
+    wanted.discard('alembic_version')
+    names = [name for name in tables if name in wanted and name in metadata.tables]
+    missing = sorted(name for name in wanted if name in tables and name not in metadata.tables)
+    if missing:
+        print(f"Skipping tables missing in the target (run 'flask db upgrade' first): {', '.join(missing)}")
+
+    use_copy = (engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2'
+                and not args.no_copy)
+    print(f"Source: {args.source}")
+    print(f"Target: {engine.url.render_as_string(hide_password=True)}"
+          f" ({'COPY' if use_copy else 'batched INSERT'})")
+
+    if not args.verify_only:
+        started = time.monotonic()
+        total = 0
+        with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+            for level in table_levels(metadata, names):
+                futures = [
+                    executor.submit(migrate_table, args.source, engine, metadata.tables[name],
+                                    tables[name], args.batch_size, use_copy)
+                    for name in level
+                ]
+                total += sum(future.result() for future in futures)
+        elapsed = max(time.monotonic() - started, 1e-9)
+        print(f"\nCopied {total} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/sec)")
+
+    print("\nVerifying checksums...")
+    all_match = True
+    for name in names:
+        source_count, target_count, match = verify_table(
+            args.source, engine, metadata.tables[name], tables[name], args.batch_size)
+        status = '✅' if match else '❌'
+        print(f"{status} {name}: source {source_count} rows, target {target_count} rows")
+        all_match = all_match and match
+
+    engine.dispose()
+    return all_match
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,49 @@
+"""add search index
+
+Revision ID: d52fa15b356f
+Revises: 7cb2e0f9fd46
+Create Date: 2026-10-18 01:35:19.547964
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import create_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'd52fa15b356f'
+down_revision = '7cb2e0f9fd46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Dialect specific (FTS5 / tsvector + pg_trgm), so not autogenerated
+    index = create_search_index(op.get_bind().dialect.name)
+    index.create_schema(op.get_bind())
+
+    # Backfill; document ids follow search.document_id()
+    id_column = 'rowid' if op.get_bind().dialect.name == 'sqlite' else 'id'
+    columns = f"{index.table} ({id_column}, kind, ref, roll_number, title, content)"
+    op.execute(
+        f"INSERT INTO {columns} "
+        "SELECT id * 3, 'student', roll_number, roll_number, name, name || ' ' || roll_number FROM students"
+    )
+    op.execute(
+        f"INSERT INTO {columns} "
+        "SELECT t.id * 3 + 1, 'transaction', t.transaction_id, s.roll_number, "
+        "COALESCE(t.utr_number, t.transaction_id), "
+        "t.transaction_id || COALESCE(' ' || t.utr_number, '') || COALESCE(' ' || t.bill_number, '') "
+        "FROM transactions t JOIN students s ON s.id = t.student_id"
+    )
+    op.execute(
+        f"INSERT INTO {columns} "
+        "SELECT c.id * 3 + 2, 'complaint', c.complaint_id, s.roll_number, c.subject, "
+        "c.complaint_id || ' ' || c.subject "
+        "FROM complaints c JOIN students s ON s.id = c.student_id"
+    )
+
+
+def downgrade():
+    create_search_index(op.get_bind().dialect.name).drop_schema(op.get_bind())
@@ -0,0 +1,96 @@
+"""
+Password hashing pool
+Runs werkzeug's CPU-bound password hashing in a bounded process pool so a
+burst of logins cannot monopolize the web worker, and reports how many hash
+operations are running or waiting.
+"""
+
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(RuntimeError):
+    """Raised when too many hash operations are already queued"""
+
+
+class PasswordHasher:
+    """Hash and verify passwords in a dedicated process pool.
+
+    ``max_workers`` processes hash concurrently and up to ``max_queue`` more
+    callers may wait for a free process; beyond that :class:`HashingBusy` is
+    raised after ``timeout`` seconds so the request can fail fast with a 503.
+    ``max_workers=0`` hashes inline in the calling thread.
+    """
+
+    def __init__(self, method='pbkdf2:sha256:600000', max_workers=2, max_queue=32, timeout=10):
+        self.method = method
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(max_workers, 1) + max_queue)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy('Too many password hashing requests in progress')
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            if self.max_workers <= 0:
+                return func(*args)
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if ``pwhash`` was made with different parameters than ``method``"""
+        return pwhash.split('$', 1)[0] != self.method
+
+    @property
+    def queue_depth(self):
+        """Hash operations waiting for a free process"""
+        with self._lock:
+            return max(self._in_flight - max(self.max_workers, 1), 0)
+
+    def stats(self):
+        with self._lock:
+            in_flight = self._in_flight
+            return {
+                'method': self.method,
+                'workers': self.max_workers,
+                'maxQueue': self.max_queue,
+                'inFlight': in_flight,
+                'queueDepth': max(in_flight - max(self.max_workers, 1), 0),
+                'completed': self.completed,
+                'rejected': self.rejected,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -0,0 +1,200 @@
+"""
+Request profiling
+Opt-in per-request instrumentation: SQL statement count and time (with the
+slowest statement) from SQLAlchemy cursor events, handler wall time, N+1
+detection for statements repeated within one request, ``Server-Timing``
+response headers, Prometheus-style metrics and cProfile dumps on demand.
+
+Metrics are kept per process; with several gunicorn workers each worker
+reports its own counters. Streamed responses (exports) are measured up to the
+point the handler returns, not while the body is generated.
+"""
+
+import hmac
+import os
+import time
+import random
+import cProfile
+import threading
+from collections import Counter, defaultdict
+
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+
+# Request duration histogram buckets (seconds)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """Thread-safe request/SQL counters rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()                # (endpoint, method, status) -> count
+        self.durations = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+        self.duration_sums = Counter()           # endpoint -> seconds
+        self.sql_statements = Counter()          # endpoint -> statements
+        self.sql_seconds = Counter()             # endpoint -> seconds
+        self.n_plus_one = Counter()              # endpoint -> requests flagged
+
+    def observe(self, endpoint, method, status, seconds, sql_count, sql_seconds, n_plus_one):
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            buckets = self.durations[endpoint]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            buckets[-1] += 1
+            self.duration_sums[endpoint] += seconds
+            self.sql_statements[endpoint] += sql_count
+            self.sql_seconds[endpoint] += sql_seconds
+            if n_plus_one:
+                self.n_plus_one[endpoint] += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines += ['# HELP http_requests_total Requests handled, by route, method and status',
+                      '# TYPE http_requests_total counter']
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{_label(endpoint)}",method="{method}",'
+                             f'status="{status}"}} {count}')
+
+            lines += ['# HELP http_request_duration_seconds Handler wall time',
+                      '# TYPE http_request_duration_seconds histogram']
+            for endpoint, buckets in sorted(self.durations.items()):
+                name = _label(endpoint)
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{endpoint="{name}",le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{endpoint="{name}",le="+Inf"}} {buckets[-1]}')
+                lines.append(f'http_request_duration_seconds_sum{{endpoint="{name}"}} '
+                             f'{self.duration_sums[endpoint]:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{endpoint="{name}"}} {buckets[-1]}')
+
+            for metric, values, kind, help_text in (
+                ('sql_statements_total', self.sql_statements, 'counter', 'SQL statements executed'),
+                ('sql_duration_seconds_total', self.sql_seconds, 'counter', 'Time spent in SQL'),
+                ('sql_n_plus_one_requests_total', self.n_plus_one, 'counter',
+                 'Requests that repeated one statement past the N+1 threshold'),
+            ):
+                lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+                for endpoint, value in sorted(values.items()):
+                    value = f'{value:.6f}' if isinstance(value, float) else value
+                    lines.append(f'{metric}{{endpoint="{_label(endpoint)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class RequestProfiler:
+    """Flask extension collecting per-request SQL and timing data.
+
+    ``n_plus_one_threshold`` is how often the same statement may run in one
+    request before it is reported. A cProfile dump is written to
+    ``profile_dir`` for requests carrying ``X-Profile: <token>`` and for a
+    random ``sample_rate`` fraction. Without a token the header is ignored,
+    so clients cannot make the server profile and dump their requests.
+    """
+
+    def __init__(self, app=None, engine=None, n_plus_one_threshold=5, sample_rate=0.0,
+                 token=None, profile_dir='profiles'):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.sample_rate = sample_rate
+        self.token = token
+        self.profile_dir = profile_dir
+        self.metrics = Metrics()
+        self.logger = None
+        if app is not None:
+            self.init_app(app, engine)
+
+    def init_app(self, app, engine):
+        self.logger = app.logger
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    # SQLAlchemy cursor events
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'profile' in g:
+            conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not (has_request_context() and 'profile' in g):
+            return
+        started = conn.info.get('profile_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        profile = g.profile
+        profile['sql_count'] += 1
+        profile['sql_seconds'] += elapsed
+        profile['statements'][statement] += 1
+        if elapsed > profile['slowest'][0]:
+            profile['slowest'] = (elapsed, statement)
+
+    # Flask hooks
+    def _profile_requested(self):
+        header = request.headers.get('X-Profile')
+        if self.token and header is not None and hmac.compare_digest(header, self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _before_request(self):
+        g.profile = {
+            'started': time.perf_counter(),
+            'sql_count': 0,
+            'sql_seconds': 0.0,
+            'slowest': (0.0, None),
+            'statements': Counter(),
+            'cprofile': None,
+        }
+        if self._profile_requested():
+            g.profile['cprofile'] = cProfile.Profile()
+            g.profile['cprofile'].enable()
+
+    def _after_request(self, response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+
+        elapsed = time.perf_counter() - profile['started']
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        if profile['cprofile'] is not None:
+            profile['cprofile'].disable()
+            self._dump(profile['cprofile'], endpoint)
+
+        repeated = [(statement, count) for statement, count in profile['statements'].items()
+                    if count >= self.n_plus_one_threshold]
+        for statement, count in repeated:
+            self.logger.warning(f"Possible N+1 on {request.method} {endpoint}: "
+                                f"{count}x {' '.join(statement.split())[:300]}")
+
+        sql_ms = profile['sql_seconds'] * 1000
+        timings = [
+            f'sql;dur={sql_ms:.2f};desc="{profile["sql_count"]} statements"',
+            f'handler;dur={elapsed * 1000:.2f}',
+        ]
+        if profile['slowest'][1] is not None:
+            timings.append(f'sql-slowest;dur={profile["slowest"][0] * 1000:.2f}')
+        if repeated:
+            timings.append(f'n-plus-one;desc="{max(count for _, count in repeated)}x repeated statement"')
+        response.headers.add('Server-Timing', ', '.join(timings))
+
+        self.metrics.observe(endpoint, request.method, response.status_code, elapsed,
+                             profile['sql_count'], profile['sql_seconds'], bool(repeated))
+        return response
+
+    def _dump(self, profiler, endpoint):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = endpoint.strip('/').replace('/', '_').replace('<', '').replace('>', '') or 'root'
+        path = os.path.join(self.profile_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{name}.prof')
+        profiler.dump_stats(path)
+        self.logger.info(f"Profile written to {path}")
+
+    def metrics_view(self):
+        return Response(self.metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,313 @@
+"""
+Receipt and fee statement PDFs
+Render payment receipts and per-year fee statements as text-only PDFs (the
+standard Helvetica fonts, no external dependencies) and keep them in a disk
+cache keyed by a hash of the data they were rendered from.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+PDF_MIMETYPE = 'application/pdf'
+
+# Part of every cache key; bump it when the layout changes so cached files are re-rendered
+RENDER_VERSION = 1
+
+# Superseded PDFs are deleted only once unused for this long, so a request
+# still sending an older version never finds its file gone
+STALE_GRACE_SECONDS = 300
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+
+# Helvetica advance widths (1/1000 em) for the characters amounts are made of;
+# everything else is approximated, which is close enough for right alignment
+_HELVETICA_WIDTHS = dict.fromkeys('0123456789', 556)
+_HELVETICA_WIDTHS.update({'.': 278, ',': 278, ' ': 278, '-': 333, 'R': 722, 's': 500})
+
+
+def text_width(value, size):
+    return sum(_HELVETICA_WIDTHS.get(ch, 556) for ch in value) * size / 1000
+
+
+def _pdf_string(value):
+    data = str(value).encode('cp1252', errors='replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+class PDFWriter:
+    """Just enough of PDF 1.4 for text, rules and shaded boxes on A4 pages"""
+
+    def __init__(self):
+        self.pages = []
+
+    def add_page(self):
+        self.pages.append([])
+
+    def _op(self, op):
+        self.pages[-1].append(op if isinstance(op, bytes) else op.encode('ascii'))
+
+    def text(self, x, y, value, size=10, bold=False, align='left'):
+        if align == 'right':
+            x -= text_width(str(value), size)
+        font = 'F2' if bold else 'F1'
+        self._op(b'BT /%s %d Tf %.2f %.2f Td (%s) Tj ET'
+                 % (font.encode('ascii'), size, x, y, _pdf_string(value)))
+
+    def line(self, x1, y1, x2, y2, width=0.5):
+        self._op(f'{width} w {x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S')
+
+    def box(self, x, y, width, height, gray=0.93):
+        self._op(f'{gray} g {x:.2f} {y:.2f} {width:.2f} {height:.2f} re f 0 g')
+
+    def output(self):
+        objects = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            None,  # page tree, filled in once the page object numbers are known
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        ]
+        page_refs = []
+        for ops in self.pages:
+            content = b'\n'.join(ops)
+            objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content))
+            objects.append(
+                b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+                b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>'
+                % (PAGE_WIDTH, PAGE_HEIGHT, len(objects))
+            )
+            page_refs.append(b'%d 0 R' % len(objects))
+        objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(page_refs), len(page_refs))
+
+        out = bytearray(b'%PDF-1.4\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+        xref = len(out)
+        out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+        out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+        out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+        return bytes(out)
+
+
+def format_amount(amount):
+    return f'Rs. {float(amount or 0):,.2f}'
+
+
+def _header(pdf, institution, title, subtitle=None):
+    pdf.add_page()
+    top = PAGE_HEIGHT - MARGIN
+    pdf.text(MARGIN, top - 10, institution, size=16, bold=True)
+    pdf.text(MARGIN, top - 32, title, size=12, bold=True)
+    if subtitle:
+        pdf.text(PAGE_WIDTH - MARGIN, top - 32, subtitle, size=9, align='right')
+    pdf.line(MARGIN, top - 42, PAGE_WIDTH - MARGIN, top - 42, width=1)
+    return top - 66
+
+
+def _fields(pdf, y, fields, label_width=130):
+    for label, value in fields:
+        pdf.text(MARGIN, y, label, bold=True)
+        pdf.text(MARGIN + label_width, y, value if value not in (None, '') else '-')
+        y -= 18
+    return y
+
+
+def render_receipt(data):
+    """PDF bytes for one transaction (see ``receipt_data`` in main.py for the keys)"""
+    pdf = PDFWriter()
+    student = data['student']
+    y = _header(pdf, data['institution'], 'Fee Payment Receipt', f"Receipt No. {data['billNumber'] or '-'}")
+
+    status = data['status']
+    if status != 'verified':
+        pdf.box(MARGIN, y - 6, PAGE_WIDTH - 2 * MARGIN, 22, gray=0.85)
+        pdf.text(MARGIN + 8, y, 'PAYMENT REJECTED - NOT A VALID RECEIPT' if status == 'rejected'
+                 else 'PROVISIONAL - PAYMENT PENDING VERIFICATION', bold=True)
+        y -= 36
+
+    y = _fields(pdf, y, [
+        ('Bill Number', data['billNumber']),
+        ('Transaction ID', data['transactionId']),
+        ('Status', status.capitalize()),
+        ('Payment Date', data['date']),
+        ('Verified On', data['verifiedAt']),
+        ('UTR Number', data['utrNumber']),
+    ])
+    y -= 10
+    y = _fields(pdf, y, [
+        ('Student Name', student['name']),
+        ('Roll Number', student['rollNumber']),
+        ('Branch', student['branch']),
+        ('Category', student['category']),
+        ('Academic Year', data['academicYear']),
+        ('Fee Type', data['feeType']),
+    ])
+
+    y -= 14
+    pdf.box(MARGIN, y - 10, PAGE_WIDTH - 2 * MARGIN, 32)
+    pdf.text(MARGIN + 10, y, 'Amount Paid', size=12, bold=True)
+    pdf.text(PAGE_WIDTH - MARGIN - 10, y, format_amount(data['amount']), size=12, bold=True, align='right')
+
+    pdf.line(PAGE_WIDTH - MARGIN - 160, MARGIN + 60, PAGE_WIDTH - MARGIN, MARGIN + 60)
+    pdf.text(PAGE_WIDTH - MARGIN - 40, MARGIN + 46, 'Authorised Signatory', size=9, align='right')
+    pdf.text(MARGIN, MARGIN, 'This is a computer generated receipt.', size=8)
+    return pdf.output()
+
+
+# Statement table columns: (heading, key, x offset, right aligned)
+_STATEMENT_COLUMNS = (
+    ('Date', 'date', 0, False),
+    ('Transaction ID', 'transactionId', 62, False),
+    ('Fee Type', 'feeType', 150, False),
+    ('Bill Number', 'billNumber', 240, False),
+    ('Status', 'status', 330, False),
+    ('Amount', 'amount', 495, True),
+)
+_STATEMENT_ROWS_PER_PAGE = 30
+
+
+def _statement_table_header(pdf, y):
+    pdf.box(MARGIN, y - 5, PAGE_WIDTH - 2 * MARGIN, 18)
+    for heading, _, offset, right in _STATEMENT_COLUMNS:
+        pdf.text(MARGIN + offset, y, heading, size=9, bold=True, align='right' if right else 'left')
+    return y - 18
+
+
+def render_statement(data):
+    """PDF bytes for a student's fee statement for one academic year"""
+    pdf = PDFWriter()
+    student = data['student']
+    title = f"Fee Statement - Academic Year {data['academicYear']}"
+    subtitle = f"Roll No. {student['rollNumber']}"
+    y = _header(pdf, data['institution'], title, subtitle)
+    y = _fields(pdf, y, [
+        ('Student Name', student['name']),
+        ('Roll Number', student['rollNumber']),
+        ('Branch', student['branch']),
+        ('Category', student['category']),
+    ])
+    y = _statement_table_header(pdf, y - 10)
+
+    for index, transaction in enumerate(data['transactions']):
+        if index and index % _STATEMENT_ROWS_PER_PAGE == 0:
+            y = _statement_table_header(pdf, _header(pdf, data['institution'], title, subtitle))
+        for _, key, offset, right in _STATEMENT_COLUMNS:
+            value = transaction[key]
+            if key == 'amount':
+                value = format_amount(value)
+            elif key == 'status':
+                value = value.capitalize()
+            pdf.text(MARGIN + offset, y, value or '-', size=9, align='right' if right else 'left')
+        y -= 16
+    if not data['transactions']:
+        pdf.text(MARGIN, y, 'No payments recorded for this academic year.', size=9)
+        y -= 16
+
+    if y < MARGIN + 60 + 16 * (len(data['feeTypes']) + 4):
+        y = _header(pdf, data['institution'], title, subtitle)
+    pdf.line(MARGIN, y + 4, PAGE_WIDTH - MARGIN, y + 4)
+    y -= 14
+    summary = [('Total Fees', data['totalFees'])]
+    summary += [(f'Paid - {fee_type}', amount) for fee_type, amount in data['feeTypes']]
+    summary += [('Total Paid (verified)', data['paid']), ('Pending Verification', data['pendingVerification'])]
+    for label, amount in summary:
+        pdf.text(MARGIN + 300, y, label, size=9)
+        pdf.text(PAGE_WIDTH - MARGIN, y, format_amount(amount), size=9, align='right')
+        y -= 16
+    pdf.text(MARGIN + 300, y, 'Outstanding Balance', size=10, bold=True)
+    pdf.text(PAGE_WIDTH - MARGIN, y, format_amount(data['outstanding']), size=10, bold=True, align='right')
+    return pdf.output()
+
+
+RENDERERS = {'receipt': render_receipt, 'statement': render_statement}
+
+
+def _safe_segment(value):
+    return ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in str(value)) or '_'
+
+
+class ReceiptCache:
+    """Rendered PDFs on disk under ``<directory>/<kind>/<ref...>/<hash>.pdf``.
+
+    The file name is a hash of the render data, so a transaction whose status
+    or bill number changed never hits a stale file. Files are written to a
+    temp file and renamed into place; a hit refreshes the file's mtime, and
+    older versions are deleted by later renders (or ``invalidate``) once they
+    have not been used for ``grace_seconds``.
+    """
+
+    def __init__(self, directory, grace_seconds=STALE_GRACE_SECONDS):
+        self.directory = directory
+        self.grace_seconds = grace_seconds
+
+    def _ref_dir(self, kind, ref):
+        parts = ref if isinstance(ref, (tuple, list)) else (ref,)
+        return os.path.join(self.directory, kind, *(_safe_segment(part) for part in parts))
+
+    @staticmethod
+    def digest(kind, data):
+        payload = json.dumps([RENDER_VERSION, kind, data], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+    def get(self, kind, ref, data):
+        """Path of the PDF for ``data``, rendering and storing it on a miss"""
+        ref_dir = self._ref_dir(kind, ref)
+        path = os.path.join(ref_dir, self.digest(kind, data) + '.pdf')
+        try:
+            # Mark the version as in use so it outlives the grace period
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        content = RENDERERS[kind](data)
+        os.makedirs(ref_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=ref_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        self._prune(ref_dir, keep=path)
+        return path
+
+    def invalidate(self, kind, *refs):
+        """Delete the unused versions of ``refs`` (see grace_seconds)"""
+        for ref in refs:
+            self._prune(self._ref_dir(kind, ref))
+
+    def _prune(self, ref_dir, keep=None):
+        cutoff = time.time() - self.grace_seconds
+        try:
+            names = os.listdir(ref_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            file_path = os.path.join(ref_dir, name)
+            if file_path == keep or not name.endswith(('.pdf', '.tmp')):
+                continue
+            try:
+                if os.path.getmtime(file_path) < cutoff:
+                    os.remove(file_path)
+            except OSError:
+                pass
+
+
+def _render_job(directory, job):
+    kind, ref, data = job
+    return ReceiptCache(directory).get(kind, ref, data)
+
+
+def render_batch(directory, jobs, workers=None):
+    """Render ``(kind, ref, data)`` jobs into the cache in a process pool; returns the paths"""
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(partial(_render_job, directory), jobs, chunksize=max(1, len(jobs) // 64)))
@@ -0,0 +1,107 @@
+"""
+Bank statement reconciliation
+Read (UTR, amount) credit lines from a bank statement CSV one row at a time
+and classify them against the app's transactions in batches.
+"""
+
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+# Normalized header -> statement field; banks label these columns differently
+HEADER_ALIASES = {
+    'utr': 'utr',
+    'utrnumber': 'utr',
+    'utrno': 'utr',
+    'reference': 'utr',
+    'referenceno': 'utr',
+    'referencenumber': 'utr',
+    'refno': 'utr',
+    'transactionreference': 'utr',
+    'amount': 'amount',
+    'credit': 'amount',
+    'creditamount': 'amount',
+    'deposit': 'amount',
+    'depositamount': 'amount',
+}
+
+# Outcome of one statement line
+MATCHED = 'matched'
+AMOUNT_MISMATCH = 'amountMismatch'
+ALREADY_PROCESSED = 'alreadyProcessed'
+UNMATCHED = 'unmatched'
+DUPLICATE = 'duplicateInStatement'
+INVALID = 'invalid'
+
+
+def normalize_utr(utr):
+    """Canonical form used by the UTR registry (case and surrounding spaces ignored)"""
+    return str(utr or '').strip().upper()
+
+
+def _normalize_header(header):
+    key = ''.join(ch for ch in str(header or '').lower() if ch.isalnum())
+    return HEADER_ALIASES.get(key)
+
+
+def _amount(value):
+    try:
+        amount = Decimal(str(value).strip().replace(',', ''))
+        # NaN/Infinity parse as decimals but cannot be compared or quantized
+        if not amount.is_finite() or amount <= 0:
+            return None
+        return amount.quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None
+
+
+def iter_statement_rows(stream):
+    """Yield ``(row_number, utr, amount, error)`` for each data row of a statement CSV.
+
+    Rows without a UTR or with a non-positive amount (debits) come back with
+    an error. Row numbers are 1-based and count the header.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = [_normalize_header(h) for h in next(reader, [])]
+    if 'utr' not in header or 'amount' not in header:
+        raise ValueError('Statement needs a UTR/reference column and an amount column')
+    utr_index, amount_index = header.index('utr'), header.index('amount')
+
+    for row_number, values in enumerate(reader, start=2):
+        if not any(values):
+            continue
+        utr = normalize_utr(values[utr_index] if utr_index < len(values) else '')
+        amount = _amount(values[amount_index]) if amount_index < len(values) else None
+        if not utr:
+            yield row_number, None, None, 'Missing UTR'
+        elif amount is None:
+            yield row_number, utr, None, 'Invalid or non-credit amount'
+        else:
+            yield row_number, utr, amount, None
+
+
+def classify(lines, transactions):
+    """Match a batch of statement lines against the transactions registered for their UTRs.
+
+    ``lines`` are ``(row_number, utr, amount)``; ``transactions`` maps UTR to a
+    row with ``transaction_id``, ``amount`` and ``status``. Returns a result
+    dict per line.
+    """
+    results = []
+    for row_number, utr, amount in lines:
+        result = {'row': row_number, 'utr': utr, 'amount': float(amount)}
+        transaction = transactions.get(utr)
+        if transaction is None:
+            result['status'] = UNMATCHED
+        else:
+            result['transactionId'] = transaction.transaction_id
+            if transaction.status != 'pending':
+                result['status'] = ALREADY_PROCESSED
+            elif Decimal(transaction.amount) != amount:
+                result['status'] = AMOUNT_MISMATCH
+                result['expectedAmount'] = float(transaction.amount)
+            else:
+                result['status'] = MATCHED
+        results.append(result)
+    return results
@@ -0,0 +1,178 @@
+"""
+Search index
+One document per student, transaction and complaint holding the fields staff
+search by (name, roll number, UTR, bill number, complaint subject), stored in
+an SQLite FTS5 table or, on PostgreSQL, a table with a tsvector and pg_trgm
+indexes. Other databases fall back to a plain table searched with LIKE.
+
+The app refreshes documents from its write paths; nothing here knows about
+the models.
+"""
+
+import re
+
+from sqlalchemy import bindparam, text
+
+# Document ids are derived from the source row id so a row maps to exactly one
+# document and can be replaced by primary key
+DOCUMENT_KINDS = {'student': 0, 'transaction': 1, 'complaint': 2}
+
+
+def document_id(kind, row_id):
+    return row_id * len(DOCUMENT_KINDS) + DOCUMENT_KINDS[kind]
+
+
+def query_terms(query):
+    """Lower-cased word tokens of a user query (everything else is dropped)"""
+    return re.findall(r'\w+', query.lower())
+
+
+class SearchIndex:
+    """Plain table searched with LIKE; base class for the dialect indexes"""
+
+    table = 'search_documents'
+
+    def create_schema(self, executor):
+        executor.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {self.table} ('
+            'id BIGINT PRIMARY KEY, kind VARCHAR(20) NOT NULL, ref VARCHAR(50) NOT NULL, '
+            'roll_number VARCHAR(20), title VARCHAR(200), content TEXT NOT NULL)'
+        ))
+
+    def drop_schema(self, executor):
+        executor.execute(text(f'DROP TABLE IF EXISTS {self.table}'))
+
+    def clear(self, executor):
+        executor.execute(text(f'DELETE FROM {self.table}'))
+
+    def replace(self, executor, documents):
+        """Insert or replace documents (dicts with id, kind, ref, roll_number, title, content)"""
+        if not documents:
+            return
+        executor.execute(
+            text(f'DELETE FROM {self.table} WHERE id IN :ids').bindparams(bindparam('ids', expanding=True)),
+            {'ids': [document['id'] for document in documents]}
+        )
+        executor.execute(text(
+            f'INSERT INTO {self.table} (id, kind, ref, roll_number, title, content) '
+            'VALUES (:id, :kind, :ref, :roll_number, :title, :content)'
+        ), documents)
+
+    def _kind_filter(self, kinds, params):
+        if not kinds:
+            return ''
+        params['kinds'] = list(kinds)
+        return ' AND kind IN :kinds'
+
+    def _execute(self, executor, sql, params):
+        statement = text(sql)
+        if 'kinds' in params:
+            statement = statement.bindparams(bindparam('kinds', expanding=True))
+        return executor.execute(statement, params).all()
+
+    def search(self, executor, query, kinds=None, limit=20, offset=0):
+        """Return ``(kind, ref, roll_number, title, score)`` rows, best first"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+        params = {'limit': limit, 'offset': offset}
+        conditions = []
+        for i, term in enumerate(terms):
+            params[f'term{i}'] = f'%{term}%'
+            conditions.append(f'LOWER(content) LIKE :term{i}')
+        return self._execute(executor, (
+            f'SELECT kind, ref, roll_number, title, 1.0 AS score FROM {self.table} '
+            f'WHERE {" AND ".join(conditions)}{self._kind_filter(kinds, params)} '
+            'ORDER BY kind, ref LIMIT :limit OFFSET :offset'
+        ), params)
+
+
+class SQLiteSearchIndex(SearchIndex):
+    """FTS5 table ranked with bm25; every query term matches as a prefix"""
+
+    table = 'search_index'
+
+    def create_schema(self, executor):
+        executor.execute(text(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5('
+            'kind UNINDEXED, ref UNINDEXED, roll_number UNINDEXED, title UNINDEXED, content, '
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+        ))
+
+    def replace(self, executor, documents):
+        if not documents:
+            return
+        executor.execute(
+            text(f'DELETE FROM {self.table} WHERE rowid IN :ids').bindparams(bindparam('ids', expanding=True)),
+            {'ids': [document['id'] for document in documents]}
+        )
+        executor.execute(text(
+            f'INSERT INTO {self.table} (rowid, kind, ref, roll_number, title, content) '
+            'VALUES (:id, :kind, :ref, :roll_number, :title, :content)'
+        ), documents)
+
+    def search(self, executor, query, kinds=None, limit=20, offset=0):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        params = {'match': ' '.join(f'"{term}"*' for term in terms), 'limit': limit, 'offset': offset}
+        # FTS5's built-in rank column is bm25() and lets SQLite sort inside the index
+        return self._execute(executor, (
+            f'SELECT kind, ref, roll_number, title, -rank AS score FROM {self.table} '
+            f'WHERE {self.table} MATCH :match{self._kind_filter(kinds, params)} '
+            'ORDER BY rank LIMIT :limit OFFSET :offset'
+        ), params)
+
+
+class PostgresSearchIndex(SearchIndex):
+    """tsvector prefix matching plus pg_trgm substring matching, ranked by both"""
+
+    def create_schema(self, executor):
+        executor.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        executor.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {self.table} ('
+            'id BIGINT PRIMARY KEY, kind VARCHAR(20) NOT NULL, ref VARCHAR(50) NOT NULL, '
+            'roll_number VARCHAR(20), title VARCHAR(200), content TEXT NOT NULL, '
+            "tsv tsvector GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED)"
+        ))
+        executor.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{self.table}_tsv ON {self.table} USING GIN (tsv)'
+        ))
+        executor.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{self.table}_trgm ON {self.table} USING GIN (content gin_trgm_ops)'
+        ))
+
+    def search(self, executor, query, kinds=None, limit=20, offset=0):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        params = {
+            'tsquery': ' & '.join(f'{term}:*' for term in terms),
+            'like': '%' + ' '.join(terms).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%',
+            'query': ' '.join(terms),
+            'limit': limit,
+            'offset': offset,
+        }
+        return self._execute(executor, (
+            f"SELECT kind, ref, roll_number, title, "
+            f"ts_rank(tsv, to_tsquery('simple', :tsquery)) + similarity(content, :query) AS score "
+            f"FROM {self.table} "
+            f"WHERE (tsv @@ to_tsquery('simple', :tsquery) OR content ILIKE :like)"
+            f"{self._kind_filter(kinds, params)} "
+            'ORDER BY score DESC LIMIT :limit OFFSET :offset'
+        ), params)
+
+
+def create_search_index(dialect_name):
+    """Pick the index implementation for a SQLAlchemy dialect name"""
+    if dialect_name == 'sqlite':
+        return SQLiteSearchIndex()
+    if dialect_name == 'postgresql':
+        return PostgresSearchIndex()
+    return SearchIndex()
+
+
+def exclude_from_migrations(obj, name, type_, reflected, compare_to):
+    """Alembic ``include_object`` hook: the index tables (and FTS5's shadow
+    tables) are created by hand, so autogenerate must not try to drop them"""
+    return not (type_ == 'table' and reflected and name.startswith(('search_index', 'search_documents')))
@@ -1,12 +1,57 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef, useCallback } from 'react'
 import { Smartphone, Monitor, Tablet, Wifi, WifiOff, RefreshCw } from 'lucide-react'
 import { useAuth } from '../contexts/AuthContext'
+import { useServerEvents } from '../hooks/useServerEvents'
+import { syncAPI } from '../services/api'
 
-export default function DeviceSync() {
-  const { syncData } = useAuth()
+interface DeviceSyncProps {
+  // Reloads the page's data; called when the server reports a change
+  onUpdate?: () => void | Promise<void>
+}
+
+const EVENT_STREAMS = {
+  student: '/api/student/events',
+  employee: '/api/employee/events',
+}
+
+export default function DeviceSync({ onUpdate }: DeviceSyncProps) {
+  const { user, syncData } = useAuth()
   const [isOnline, setIsOnline] = useState(navigator.onLine)
   const [lastSync, setLastSync] = useState<Date | null>(null)
   const [syncing, setSyncing] = useState(false)
+  // Streams are only opened when the server can hold them; until then, poll
+  const [streaming, setStreaming] = useState(false)
+  const refreshTimer = useRef<ReturnType<typeof setTimeout>>()
+
+  const handleSync = useCallback(async () => {
+    if (!navigator.onLine) return
+
+    setSyncing(true)
+    try {
+      await syncData()
+      if (onUpdate) await onUpdate()
+      setLastSync(new Date())
+    } catch (error) {
+      console.error('Sync failed:', error)
+    } finally {
+      setSyncing(false)
+    }
+  }, [syncData, onUpdate])
+
+  // Pushed changes trigger a refresh; a burst of events (bulk verification) is coalesced
+  const live = useServerEvents(
+    isOnline && user && streaming ? EVENT_STREAMS[user.type] : null,
+    () => {
+      clearTimeout(refreshTimer.current)
+      refreshTimer.current = setTimeout(handleSync, 500)
+    }
+  )
+
+  useEffect(() => {
+    syncAPI.getEventsConfig()
+      .then((response) => setStreaming(Boolean(response.data.streaming)))
+      .catch(() => setStreaming(false))
+  }, [])
 
   useEffect(() => {
     const handleOnline = () => setIsOnline(true)
@@ -15,33 +60,23 @@ export default function DeviceSync() {
     window.addEventListener('online', handleOnline)
     window.addEventListener('offline', handleOffline)
 
-    // Auto-sync every 30 seconds when online
-    const syncInterval = setInterval(() => {
-      if (isOnline && !syncing) {
-        handleSync()
-      }
-    }, 30000)
+    // Without live streams (server or browser) fall back to syncing every 30 seconds
+    const syncInterval = !streaming || typeof EventSource === 'undefined'
+      ? setInterval(() => {
+          if (isOnline && !syncing) {
+            handleSync()
+          }
+        }, 30000)
+      : undefined
 
     return () => {
       window.removeEventListener('online', handleOnline)
       window.removeEventListener('offline', handleOffline)
       clearInterval(syncInterval)
     }
-  }, [isOnline, syncing])
+  }, [isOnline, syncing, streaming, handleSync])
 
-  const handleSync = async () => {
-    if (!isOnline) return
-    
-    setSyncing(true)
-    try {
-      await syncData()
-      setLastSync(new Date())
-    } catch (error) {
-      console.error('Sync failed:', error)
-    } finally {
-      setSyncing(false)
-    }
-  }
+  useEffect(() => () => clearTimeout(refreshTimer.current), [])
 
   const getDeviceIcon = () => {
     const width = window.innerWidth
@@ -58,7 +93,7 @@ export default function DeviceSync() {
           <div>
             <p className="text-white font-medium text-sm">Cross-Device Access</p>
             <p className="text-white/70 text-xs">
-              {isOnline ? 'Connected' : 'Offline'} • 
+              {isOnline ? (live ? 'Live' : 'Connected') : 'Offline'} • 
               {lastSync ? ` Last sync: ${lastSync.toLocaleTimeString()}` : ' Never synced'}
             </p>
           </div>
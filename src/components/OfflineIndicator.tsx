@@ -1,13 +1,25 @@
 import React, { useState, useEffect } from 'react'
 import { Wifi, WifiOff, CloudOff } from 'lucide-react'
+import { useAuth } from '../contexts/AuthContext'
+import { getQueuedWrites, QUEUE_CHANGED_EVENT } from '../utils/offlineQueue'
 
 export default function OfflineIndicator() {
+  const { syncData } = useAuth()
   const [isOnline, setIsOnline] = useState(navigator.onLine)
   const [showOfflineMessage, setShowOfflineMessage] = useState(false)
+  const [queued, setQueued] = useState(getQueuedWrites().length)
 
   useEffect(() => {
-    const handleOnline = () => {
+    const handleQueueChanged = () => setQueued(getQueuedWrites().length)
+    window.addEventListener(QUEUE_CHANGED_EVENT, handleQueueChanged)
+    return () => window.removeEventListener(QUEUE_CHANGED_EVENT, handleQueueChanged)
+  }, [])
+
+  useEffect(() => {
+    const handleOnline = async () => {
       setIsOnline(true)
+      // Replay writes queued while offline and pull what changed meanwhile
+      await syncData()
       setShowOfflineMessage(false)
     }
 
@@ -23,7 +35,7 @@ export default function OfflineIndicator() {
       window.removeEventListener('online', handleOnline)
       window.removeEventListener('offline', handleOffline)
     }
-  }, [])
+  }, [syncData])
 
   if (!showOfflineMessage && isOnline) {
     return null
@@ -51,9 +63,9 @@ export default function OfflineIndicator() {
               {isOnline ? 'Back Online' : 'You\'re Offline'}
             </p>
             <p className="text-white/60 text-xs">
-              {isOnline 
-                ? 'Data will sync automatically' 
-                : 'Using cached data'
+              {isOnline
+                ? (queued ? `Sending ${queued} queued change${queued === 1 ? '' : 's'}...` : 'Data will sync automatically')
+                : (queued ? `Using cached data • ${queued} change${queued === 1 ? '' : 's'} waiting to sync` : 'Using cached data')
               }
             </p>
           </div>
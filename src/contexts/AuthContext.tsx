@@ -1,5 +1,6 @@
 import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react'
-import { api } from '../services/api'
+import { api, syncAPI } from '../services/api'
+import { replayQueuedWrites } from '../utils/offlineQueue'
 
 interface User {
   id: string
@@ -21,6 +22,33 @@ interface AuthContextType {
 
 const AuthContext = createContext<AuthContextType | undefined>(undefined)
 
+// Local copy of the records visible to the user, kept current by /api/sync
+interface SyncState {
+  cursor: number
+  students: Record<string, any>
+  transactions: Record<string, any>
+  complaints: Record<string, any>
+}
+
+const SYNC_STATE_KEY = 'syncState'
+const SYNC_COLLECTIONS = [
+  ['students', 'rollNumber'],
+  ['transactions', 'id'],
+  ['complaints', 'id'],
+] as const
+
+function emptySyncState(): SyncState {
+  return { cursor: 0, students: {}, transactions: {}, complaints: {} }
+}
+
+function loadSyncState(): SyncState {
+  try {
+    return { ...emptySyncState(), ...JSON.parse(localStorage.getItem(SYNC_STATE_KEY) || '{}') }
+  } catch (error) {
+    return emptySyncState()
+  }
+}
+
 export function AuthProvider({ children }: { children: ReactNode }) {
   const [user, setUser] = useState<User | null>(null)
   const [loading, setLoading] = useState(true)
@@ -96,19 +124,36 @@ export function AuthProvider({ children }: { children: ReactNode }) {
     // Clear any other stored data
     localStorage.removeItem('studentData')
     localStorage.removeItem('employeeData')
+    localStorage.removeItem(SYNC_STATE_KEY)
   }
 
   const syncData = async () => {
-    // This function can be used to sync data across devices
-    if (user?.type === 'student' && user.rollNumber) {
-      try {
-        const response = await api.get(`/api/student/payment-details/${user.rollNumber}`)
-        if (response.data.success) {
-          localStorage.setItem('studentData', JSON.stringify(response.data))
+    if (!user) return
+    try {
+      // Deliver writes queued while offline before pulling changes
+      await replayQueuedWrites()
+
+      // Pull only the records changed since the last sync
+      let state = loadSyncState()
+      let hasMore = true
+      while (hasMore) {
+        const { data } = await syncAPI.getChanges(state.cursor)
+        if (!data.success) break
+        if (data.reset) {
+          // The server's change log was reset: rebuild from scratch
+          state = emptySyncState()
+          continue
         }
-      } catch (error) {
-        console.error('Sync error:', error)
+        for (const [name, key] of SYNC_COLLECTIONS) {
+          data[name].forEach((record: any) => { state[name][record[key]] = record })
+          data.deleted[name].forEach((id: string) => { delete state[name][id] })
+        }
+        hasMore = data.hasMore && data.cursor !== state.cursor
+        state.cursor = data.cursor
       }
+      localStorage.setItem(SYNC_STATE_KEY, JSON.stringify(state))
+    } catch (error) {
+      console.error('Sync error:', error)
     }
   }
 
@@ -0,0 +1,46 @@
+import { useEffect, useRef, useState } from 'react'
+
+const SERVER_EVENTS = ['transaction.submitted', 'transaction.updated', 'complaint.submitted']
+
+// Subscribe to a server-sent event stream; onEvent gets the event name and its data.
+// Returns whether the stream is currently connected.
+export function useServerEvents(
+  url: string | null,
+  onEvent: (event: string, data: any) => void
+) {
+  const [connected, setConnected] = useState(false)
+  const handlerRef = useRef(onEvent)
+
+  // Keep the latest handler without reopening the stream
+  useEffect(() => {
+    handlerRef.current = onEvent
+  }, [onEvent])
+
+  useEffect(() => {
+    if (!url || typeof EventSource === 'undefined') return
+
+    // EventSource reconnects by itself after the server closes the stream
+    const source = new EventSource(url, { withCredentials: true })
+    const listeners = SERVER_EVENTS.map((name) => {
+      const listener = (e: MessageEvent) => {
+        try {
+          handlerRef.current(name, JSON.parse(e.data))
+        } catch (error) {
+          console.error(`Invalid ${name} event:`, error)
+        }
+      }
+      source.addEventListener(name, listener)
+      return [name, listener] as const
+    })
+    source.onopen = () => setConnected(true)
+    source.onerror = () => setConnected(false)
+
+    return () => {
+      listeners.forEach(([name, listener]) => source.removeEventListener(name, listener))
+      source.close()
+      setConnected(false)
+    }
+  }, [url])
+
+  return connected
+}
@@ -33,6 +33,8 @@ export default function EmployeeDashboard() {
   const [filteredStudents, setFilteredStudents] = useState<Student[]>([])
   const [loading, setLoading] = useState(true)
   const [searchTerm, setSearchTerm] = useState('')
+  // Roll numbers returned by the server-side search index (null = match locally)
+  const [searchMatches, setSearchMatches] = useState<Set<string> | null>(null)
   const [filters, setFilters] = useState({
     branch: '',
     academicYear: '',
@@ -51,17 +53,45 @@ export default function EmployeeDashboard() {
 
   useEffect(() => {
     filterStudents()
-  }, [students, searchTerm, filters])
+  }, [students, searchTerm, searchMatches, filters])
+
+  useEffect(() => {
+    if (searchTerm.trim().length < 2) {
+      setSearchMatches(null)
+      return
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const response = await employeeAPI.search({ q: searchTerm, type: 'student', perPage: 100 })
+        if (response.data.success) {
+          setSearchMatches(new Set(response.data.results.map((hit: any) => hit.rollNumber)))
+        }
+      } catch (error) {
+        // Offline: fall back to matching the locally loaded list
+        setSearchMatches(null)
+      }
+    }, 250)
+    return () => clearTimeout(timer)
+  }, [searchTerm])
 
   const fetchStudents = async () => {
     try {
       setLoading(true)
-      const response = await employeeAPI.getStudents()
+      // Walk the keyset-paginated list until the server stops returning a cursor
+      let response = await employeeAPI.getStudents()
+      const allStudents = [...response.data.students]
+      while (response.data.success && response.data.nextCursor) {
+        response = await employeeAPI.getStudents({ after: response.data.nextCursor })
+        allStudents.push(...response.data.students)
+      }
       if (response.data.success) {
-        setStudents(response.data.students)
+        setStudents(allStudents)
         setStatistics(response.data.statistics)
         // Store data locally for offline access
-        localStorage.setItem('employeeData', JSON.stringify(response.data))
+        localStorage.setItem('employeeData', JSON.stringify({
+          ...response.data,
+          students: allStudents
+        }))
       }
     } catch (error) {
       console.error('Error fetching students:', error)
@@ -81,7 +111,9 @@ export default function EmployeeDashboard() {
     let filtered = students
 
     // Apply search filter
-    if (searchTerm) {
+    if (searchTerm && searchMatches) {
+      filtered = filtered.filter(student => searchMatches.has(student.rollNumber))
+    } else if (searchTerm) {
       filtered = filtered.filter(student =>
         student.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
         student.rollNumber.toLowerCase().includes(searchTerm.toLowerCase())
@@ -154,7 +186,7 @@ export default function EmployeeDashboard() {
         </div>
 
         {/* Device Sync Component */}
-        <DeviceSync />
+        <DeviceSync onUpdate={fetchStudents} />
 
         {/* Statistics Cards */}
         <div className="grid md:grid-cols-3 gap-6 mb-8">
@@ -47,24 +47,15 @@ export default function StudentDashboard() {
     try {
       setLoading(true)
       
-      // Fetch payment details
-      const paymentResponse = await studentAPI.getPaymentDetails(user.rollNumber)
-      if (paymentResponse.data.success) {
-        setPaymentData(paymentResponse.data)
+      // Payment details, transactions and complaints in one round trip
+      const response = await studentAPI.getDashboard(user.rollNumber)
+      if (response.data.success) {
+        const { transactions, complaints, ...paymentData } = response.data
+        setPaymentData(paymentData)
+        setTransactions(transactions)
+        setComplaints(complaints)
         // Store data locally for offline access
-        localStorage.setItem('studentData', JSON.stringify(paymentResponse.data))
-      }
-
-      // Fetch transactions
-      const transactionsResponse = await studentAPI.getTransactions(user.rollNumber)
-      if (transactionsResponse.data.success) {
-        setTransactions(transactionsResponse.data.transactions)
-      }
-
-      // Fetch complaints
-      const complaintsResponse = await studentAPI.getComplaints(user.rollNumber)
-      if (complaintsResponse.data.success) {
-        setComplaints(complaintsResponse.data.complaints)
+        localStorage.setItem('studentData', JSON.stringify(paymentData))
       }
 
     } catch (error) {
@@ -130,7 +121,7 @@ export default function StudentDashboard() {
         </div>
 
         {/* Device Sync Component */}
-        <DeviceSync />
+        <DeviceSync onUpdate={fetchStudentData} />
 
         {/* Fee Overview Cards */}
         {paymentData && (
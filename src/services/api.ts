@@ -7,12 +7,23 @@ export const api = axios.create({
   headers: {
     'Content-Type': 'application/json',
   },
+  // 304 Not Modified is answered from the ETag cache below
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
 })
 
+// Last ETag and body seen for each GET URL
+const etagCache = new Map<string, { etag: string; data: any }>()
+
 // Request interceptor to add auth tokens if needed
 api.interceptors.request.use(
   (config) => {
     // Add any auth headers here if needed
+    if (config.method === 'get') {
+      const cached = etagCache.get(api.getUri(config))
+      if (cached) {
+        config.headers['If-None-Match'] = cached.etag
+      }
+    }
     return config
   },
   (error) => {
@@ -23,6 +34,17 @@ api.interceptors.request.use(
 // Response interceptor for error handling
 api.interceptors.response.use(
   (response) => {
+    if (response.config.method === 'get') {
+      const key = api.getUri(response.config)
+      if (response.status === 304) {
+        const cached = etagCache.get(key)
+        if (cached) {
+          return { ...response, status: 200, data: cached.data }
+        }
+      } else if (response.headers.etag) {
+        etagCache.set(key, { etag: response.headers.etag, data: response.data })
+      }
+    }
     return response
   },
   (error) => {
@@ -40,11 +62,19 @@ export const studentAPI = {
   login: (rollNumber: string, password: string) =>
     api.post('/api/student/auth', { rollNumber, password }),
   
+  getDashboard: (rollNumber: string, fields?: string[]) =>
+    api.get(`/api/student/dashboard/${rollNumber}`, {
+      params: fields ? { fields: fields.join(',') } : undefined,
+    }),
+
   getPaymentDetails: (rollNumber: string) =>
     api.get(`/api/student/payment-details/${rollNumber}`),
   
-  submitTransaction: (transactionData: any) =>
-    api.post('/api/student/submit-transaction', transactionData),
+  // Retrying with the same idempotencyKey returns the first response instead of a duplicate
+  submitTransaction: (transactionData: any, idempotencyKey?: string) =>
+    api.post('/api/student/submit-transaction', transactionData, {
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : undefined,
+    }),
   
   getTransactions: (rollNumber: string) =>
     api.get(`/api/student/transactions/${rollNumber}`),
@@ -54,14 +84,20 @@ export const studentAPI = {
   
   submitComplaint: (complaintData: any) =>
     api.post('/api/student/complaint', complaintData),
+
+  getReceiptPdf: (transactionId: string) =>
+    api.get(`/api/student/receipt/${encodeURIComponent(transactionId)}`, { responseType: 'blob' }),
+
+  getStatementPdf: (rollNumber: string, academicYear?: string) =>
+    api.get(`/api/student/statement/${rollNumber}`, { params: { academicYear }, responseType: 'blob' }),
 }
 
 export const employeeAPI = {
   login: (email: string, password: string) =>
     api.post('/api/employee/auth', { email, password }),
   
-  getStudents: () =>
-    api.get('/api/students/list'),
+  getStudents: (params?: { limit?: number; after?: number }) =>
+    api.get('/api/students/list', { params }),
   
   filterStudents: (filters: any) =>
     api.post('/api/students/filter', filters),
@@ -69,9 +105,55 @@ export const employeeAPI = {
   addStudent: (studentData: any) =>
     api.post('/api/students', studentData),
   
-  verifyTransaction: (transactionData: any) =>
-    api.post('/api/verify-transaction', transactionData),
+  verifyTransaction: (transactionData: any, idempotencyKey?: string) =>
+    api.post('/api/verify-transaction', transactionData, {
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : undefined,
+    }),
+
+  verifyTransactionsBulk: (transactions: any[]) =>
+    api.post('/api/verify-transactions/bulk', { transactions }),
+
+  getAnalyticsSummary: (params?: { branch?: string; academicYear?: string; category?: string; days?: number }) =>
+    api.get('/api/analytics/summary', { params }),
+
+  search: (params: { q: string; type?: string; page?: number; perPage?: number }) =>
+    api.get('/api/search', { params }),
+
+  createJob: (type: string, options: Record<string, any> = {}, file?: File) => {
+    if (!file) return api.post('/api/jobs', { type, ...options })
+    const form = new FormData()
+    form.append('type', type)
+    form.append('file', file)
+    Object.entries(options).forEach(([key, value]) => form.append(key, String(value)))
+    return api.post('/api/jobs', form)
+  },
+
+  getJob: (jobId: number) =>
+    api.get(`/api/jobs/${jobId}`),
+
+  listJobs: (params?: { type?: string; status?: string; limit?: number }) =>
+    api.get('/api/jobs', { params }),
+
+  cancelJob: (jobId: number) =>
+    api.post(`/api/jobs/${jobId}/cancel`),
+
+  reconcileStatement: (file: File, autoVerify = false) => {
+    const form = new FormData()
+    form.append('file', file)
+    form.append('autoVerify', String(autoVerify))
+    return api.post('/api/reconcile', form)
+  },
   
   getSession: () =>
     api.get('/api/employee/session'),
-}
\ No newline at end of file
+}
+
+export const syncAPI = {
+  // Records changed since a cursor from a previous response (0 for everything)
+  getChanges: (since = 0, limit?: number) =>
+    api.get('/api/sync', { params: { since, limit } }),
+
+  // Whether the server holds live event streams (otherwise clients poll)
+  getEventsConfig: () =>
+    api.get('/api/events/config'),
+}
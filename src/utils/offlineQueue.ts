@@ -0,0 +1,101 @@
+import { api } from '../services/api'
+
+// Writes made while offline, replayed in order once the connection is back.
+// Each carries a clientKey so the server stores it only once, however often
+// the replay is retried.
+export type QueuedWriteKind = 'transaction' | 'complaint'
+
+export interface QueuedWrite {
+  clientKey: string
+  kind: QueuedWriteKind
+  payload: Record<string, any>
+  queuedAt: string
+}
+
+const STORAGE_KEY = 'offlineQueue'
+export const QUEUE_CHANGED_EVENT = 'offline-queue-changed'
+
+const ENDPOINTS: Record<QueuedWriteKind, string> = {
+  transaction: '/api/student/submit-transaction',
+  complaint: '/api/student/complaint',
+}
+
+function newClientKey(): string {
+  if (typeof crypto !== 'undefined' && 'randomUUID' in crypto) {
+    return crypto.randomUUID()
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`
+}
+
+export function getQueuedWrites(): QueuedWrite[] {
+  try {
+    return JSON.parse(localStorage.getItem(STORAGE_KEY) || '[]')
+  } catch (error) {
+    return []
+  }
+}
+
+function saveQueue(queue: QueuedWrite[]) {
+  localStorage.setItem(STORAGE_KEY, JSON.stringify(queue))
+  window.dispatchEvent(new Event(QUEUE_CHANGED_EVENT))
+}
+
+function newWrite(kind: QueuedWriteKind, payload: Record<string, any>): QueuedWrite {
+  return { clientKey: newClientKey(), kind, payload, queuedAt: new Date().toISOString() }
+}
+
+export function queueWrite(kind: QueuedWriteKind, payload: Record<string, any>): QueuedWrite {
+  const write = newWrite(kind, payload)
+  saveQueue([...getQueuedWrites(), write])
+  return write
+}
+
+function postWrite(write: QueuedWrite) {
+  return api.post(ENDPOINTS[write.kind], { ...write.payload, clientKey: write.clientKey }, {
+    headers: { 'Idempotency-Key': write.clientKey },
+  })
+}
+
+// Submit now when possible; queue the write if the network is unavailable.
+// Returns the server response, or null when the write was queued.
+export async function submitOrQueue(kind: QueuedWriteKind, payload: Record<string, any>) {
+  const write = newWrite(kind, payload)
+  if (navigator.onLine) {
+    try {
+      return await postWrite(write)
+    } catch (error: any) {
+      // The server answered: report the error instead of retrying later
+      if (error.response) throw error
+    }
+  }
+  saveQueue([...getQueuedWrites(), write])
+  return null
+}
+
+let replaying: Promise<number> | null = null
+
+// Send queued writes in order; returns how many were delivered. Stops at the
+// first network or server error and keeps the rest for the next attempt.
+export function replayQueuedWrites(): Promise<number> {
+  if (!replaying) {
+    replaying = (async () => {
+      let delivered = 0
+      for (const write of getQueuedWrites()) {
+        try {
+          await postWrite(write)
+          delivered++
+        } catch (error: any) {
+          const status = error.response?.status
+          if (!status || status >= 500 || status === 408 || status === 429) break
+          // Rejected for good (e.g. duplicate UTR): drop it rather than retry forever
+          console.error(`Queued ${write.kind} rejected:`, error.response?.data?.message)
+        }
+        saveQueue(getQueuedWrites().filter((queued) => queued.clientKey !== write.clientKey))
+      }
+      return delivered
+    })().finally(() => {
+      replaying = null
+    })
+  }
+  return replaying
+}
@@ -0,0 +1,228 @@
+"""
+Structured logging pipeline
+Request threads only put log records on an in-memory queue; a
+QueueListener thread per process formats them as JSON lines and writes them
+to a rotating file of its own (or to stdout for platforms that collect it),
+so file I/O and rotation never run on the request path and gunicorn workers
+never rotate a shared file under each other.
+
+Files are named by slot (``app-0.log``, ``app-1.log``, ...), not by pid: a
+process takes the lowest slot whose lock file no other live process holds,
+so restarted workers and CLI commands reuse the same few files.
+
+Each request gets an id (taken from X-Request-ID or generated) that is added
+to every record logged while handling it and to a sampled access log line
+with route, status and latency.
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import uuid
+import queue
+import atexit
+import random
+import logging
+import threading
+import multiprocessing
+try:
+    import fcntl
+except ImportError:  # Windows: no fork either, one file per process id
+    fcntl = None
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import current_app, g, request, has_request_context
+
+CONTEXT_FIELDS = ('request_id', 'method', 'route', 'path', 'status', 'latency_ms')
+
+
+class JSONFormatter(logging.Formatter):
+    """Format a record as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'source': f'{record.filename}:{record.lineno}',
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestQueueHandler(QueueHandler):
+    """Enqueue records with the current request's context attached.
+
+    Runs in the thread that logs, so the request id and route are read here;
+    the message and traceback are rendered now because the listener thread
+    has neither the request nor the live exception. ``on_emit`` is called
+    before each record is queued (the pipeline starts its listener there).
+    """
+
+    def __init__(self, queue, on_emit=None):
+        super().__init__(queue)
+        self.on_emit = on_emit
+
+    def emit(self, record):
+        if self.on_emit is not None:
+            self.on_emit()
+        super().emit(record)
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if has_request_context():
+            record.request_id = getattr(record, 'request_id', None) or g.get('request_id')
+            record.method = getattr(record, 'method', None) or request.method
+            record.route = getattr(record, 'route', None) or (
+                request.url_rule.rule if request.url_rule else None)
+        return record
+
+
+class AccessLogSampler(logging.Filter):
+    """Keep a ``rate`` fraction of access log lines; errors and slow requests always pass"""
+
+    def __init__(self, rate=1.0, slow_ms=1000):
+        super().__init__()
+        self.rate = rate
+        self.slow_ms = slow_ms
+
+    def filter(self, record):
+        if not getattr(record, 'access', False) or self.rate >= 1:
+            return True
+        if getattr(record, 'status', 0) >= 500 or getattr(record, 'latency_ms', 0) >= self.slow_ms:
+            return True
+        return random.random() < self.rate
+
+
+class LoggingPipeline:
+    """Queue-based JSON logging for a Flask app.
+
+    ``target`` is ``'file'`` (``<log_dir>/app-<slot>.log``, rotated by the
+    listener thread) or ``'stdout'``.
+    """
+
+    def __init__(self, app=None, log_dir='logs', target='file', level=logging.INFO,
+                 access_sample_rate=1.0, slow_request_ms=1000, max_bytes=10000000, backup_count=5):
+        self.log_dir = log_dir
+        self.target = target
+        self.level = level
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue = queue.SimpleQueue()
+        self.queue_handler = RequestQueueHandler(self.queue, on_emit=self._ensure_listener)
+        self.queue_handler.addFilter(AccessLogSampler(access_sample_rate, slow_request_ms))
+        self.listener = None
+        self._slot_lock = None
+        self._start_lock = threading.Lock()
+        self._start_pending = False
+        if app is not None:
+            self.init_app(app)
+
+    def _claim_slot(self):
+        """Lowest slot not locked by another live process (the lock lasts until exit)"""
+        if fcntl is None:
+            return os.getpid()
+        slot = 0
+        while True:
+            lock = open(os.path.join(self.log_dir, f'app-{slot}.lock'), 'a')
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                slot += 1
+                continue
+            self._slot_lock = lock
+            return slot
+
+    def _output_handler(self):
+        if self.target == 'stdout':
+            handler = logging.StreamHandler(sys.stdout)
+        else:
+            handler = RotatingFileHandler(
+                os.path.join(self.log_dir, f'app-{self._claim_slot()}.log'),
+                maxBytes=self.max_bytes,
+                backupCount=self.backup_count,
+                delay=True
+            )
+        handler.setFormatter(JSONFormatter())
+        return handler
+
+    def start(self):
+        self.listener = QueueListener(self.queue, self._output_handler(), respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def _after_fork(self):
+        # The listener thread does not survive fork. Closing the inherited lock
+        # copy leaves the parent's slot locked; the child only claims a slot of
+        # its own once it logs something (see _ensure_listener), so the
+        # ProcessPoolExecutor children used for password hashing and receipt
+        # rendering never start a listener or take an app-N.log file.
+        if self._slot_lock is not None:
+            self._slot_lock.close()
+            self._slot_lock = None
+        self.listener = None
+        self._start_lock = threading.Lock()
+        self._start_pending = True
+        self.queue = queue.SimpleQueue()
+        self.queue_handler.queue = self.queue
+
+    def _ensure_listener(self):
+        # Not decidable in _after_fork: a multiprocessing child is still named
+        # 'MainProcess' while the fork hooks run. Gunicorn workers are plain
+        # forks and keep that name.
+        if not self._start_pending or multiprocessing.current_process().name != 'MainProcess':
+            return
+        with self._start_lock:
+            if self._start_pending:
+                self.start()
+                self._start_pending = False
+
+    def init_app(self, app):
+        os.makedirs(self.log_dir, exist_ok=True)
+        for handler in list(app.logger.handlers):
+            app.logger.removeHandler(handler)
+        app.logger.addHandler(self.queue_handler)
+        app.logger.setLevel(self.level)
+        app.logger.propagate = False
+
+        self.start()
+        atexit.register(self.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _before_request(self):
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    def _after_request(self, response):
+        latency_ms = round((time.perf_counter() - g.pop('request_started', time.perf_counter())) * 1000, 2)
+        response.headers['X-Request-ID'] = g.get('request_id', '')
+        current_app.logger.info(
+            f'{request.method} {request.path} {response.status_code}',
+            extra={'access': True, 'path': request.path, 'status': response.status_code,
+                   'latency_ms': latency_ms}
+        )
+        return response
@@ -0,0 +1,153 @@
+"""
+Student import parsing
+Read student rows from CSV or XLSX files and validate them one row at a time
+"""
+
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+# Normalized header -> Student field
+HEADER_ALIASES = {
+    'name': 'name',
+    'studentname': 'name',
+    'rollnumber': 'roll_number',
+    'rollno': 'roll_number',
+    'gender': 'gender',
+    'category': 'category',
+    'academicyear': 'academic_year',
+    'year': 'academic_year',
+    'branch': 'branch',
+    'feetype': 'fee_type',
+    'billnumber': 'bill_number',
+    'totalamount': 'total_fees',
+    'totalfees': 'total_fees',
+    'paidamount': 'paid_amount',
+}
+
+REQUIRED_FIELDS = ['name', 'roll_number', 'category', 'academic_year', 'branch']
+
+# Maximum column lengths from the Student model
+FIELD_LENGTHS = {
+    'name': 100,
+    'roll_number': 20,
+    'gender': 10,
+    'category': 50,
+    'academic_year': 20,
+    'branch': 50,
+    'fee_type': 50,
+    'bill_number': 50,
+}
+
+
+class RowError(ValueError):
+    """Raised for a row that cannot be imported"""
+
+
+def _normalize_header(header):
+    key = ''.join(ch for ch in str(header or '').lower() if ch.isalnum())
+    return HEADER_ALIASES.get(key)
+
+
+def _amount(value, field):
+    if value is None or str(value).strip() == '':
+        return Decimal('0')
+    try:
+        amount = Decimal(str(value).strip().replace(',', ''))
+        # NaN/Infinity parse as decimals but cannot be compared or quantized
+        if not amount.is_finite():
+            raise InvalidOperation
+        if amount < 0:
+            raise RowError(f'{field} cannot be negative')
+        return amount.quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise RowError(f'Invalid {field}: {value}')
+
+
+def validate_row(raw):
+    """Turn a raw {field: value} row into Student column values or raise RowError.
+
+    Optional fields and total_fees are only returned when the file has their
+    column, so re-importing a file without them leaves existing values alone.
+    paid_amount and pending_amount are always returned for new students; an
+    existing student keeps its own (see upsert_students in main.py).
+    """
+    row = {}
+    for field, length in FIELD_LENGTHS.items():
+        if field not in REQUIRED_FIELDS and field not in raw:
+            continue
+        value = raw.get(field)
+        value = str(value).strip() if value is not None else ''
+        if len(value) > length:
+            raise RowError(f'{field} longer than {length} characters')
+        row[field] = value or None
+
+    missing = [field for field in REQUIRED_FIELDS if not row[field]]
+    if missing:
+        raise RowError(f"Missing required fields: {', '.join(missing)}")
+
+    total_fees = _amount(raw.get('total_fees'), 'total_fees')
+    if 'total_fees' in raw:
+        row['total_fees'] = total_fees
+    row['paid_amount'] = _amount(raw.get('paid_amount'), 'paid_amount')
+    row['pending_amount'] = total_fees - row['paid_amount']
+    return row
+
+
+def _iter_csv(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return
+    yield [_normalize_header(h) for h in header]
+    yield from reader
+
+
+def _iter_xlsx(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('XLSX import requires openpyxl (pip install openpyxl)')
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield [_normalize_header(h) for h in header]
+        yield from rows
+    finally:
+        workbook.close()
+
+
+def iter_student_rows(stream, file_format):
+    """Yield ``(row_number, row, error)`` for each data row of a CSV or XLSX file.
+
+    ``row`` is a dict of Student column values when the row is valid, otherwise
+    ``error`` holds the reason. Row numbers are 1-based and count the header,
+    so they match what a spreadsheet shows.
+    """
+    if file_format == 'xlsx':
+        rows = _iter_xlsx(stream)
+    elif file_format == 'csv':
+        rows = _iter_csv(stream)
+    else:
+        raise ValueError(f'Unsupported file format: {file_format}')
+
+    header = next(rows, None)
+    if header is None:
+        return
+    if 'roll_number' not in header:
+        raise ValueError('File has no roll number column')
+
+    for row_number, values in enumerate(rows, start=2):
+        if not any(v not in (None, '') for v in values):
+            continue
+        # Every column of the header is present, even when the row is short
+        raw = {field: values[i] if i < len(values) else None for i, field in enumerate(header) if field}
+        try:
+            yield row_number, validate_row(raw), None
+        except RowError as e:
+            yield row_number, None, str(e)
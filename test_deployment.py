@@ -93,6 +93,158 @@ def test_basic_operations():
         print(f"❌ Basic operations error: {e}")
         return False
 
+def test_query_plans():
+    """Test that per-student and filter queries use an index (SQLite only)"""
+    print("Testing query plans...")
+    try:
+        from main import app, db, Student, Transaction, Complaint, apply_student_filters
+        with app.app_context():
+            if db.engine.dialect.name != 'sqlite':
+                print("⏭️  Query plan check only runs on SQLite")
+                return True
+
+            queries = {
+                'student lookup': Student.query.filter_by(roll_number='R1'),
+                'student payment details': Transaction.query.filter_by(student_id=1),
+                'student transactions by year': Transaction.query.filter_by(
+                    student_id=1, academic_year='2024', status='verified'),
+                'student complaints': Complaint.query.filter_by(student_id=1),
+                'filter students': apply_student_filters(Student.query, {
+                    'branch': 'CSE', 'academicYear': '2024', 'category': 'GEN'}),
+                'pending students': apply_student_filters(Student.query, {'listType': 'pendingFee'}),
+                'pending transactions': Transaction.query.filter_by(status='pending'),
+            }
+
+            full_scans = []
+            for name, query in queries.items():
+                sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+                plan = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')).fetchall()
+                details = [row[-1] for row in plan]
+                if any(d.startswith('SCAN') and 'USING' not in d for d in details):
+                    full_scans.append(f"{name}: {'; '.join(details)}")
+
+            if full_scans:
+                print("❌ Queries doing full table scans:")
+                for scan in full_scans:
+                    print(f"   {scan}")
+                return False
+            else:
+                print("✅ All queries use an index")
+                return True
+    except Exception as e:
+        print(f"❌ Query plan check error: {e}")
+        return False
+
+def test_dropped_connections():
+    """Test that the pool recovers when the server drops pooled connections"""
+    print("Testing dropped connection recovery...")
+    try:
+        from sqlalchemy import create_engine
+        from sqlalchemy.pool import NullPool
+        from main import app, db, db_connect_stats
+        with app.app_context():
+            engine = db.engine
+            invalidated_before = db_connect_stats['invalidated']
+
+            # Simulate the server dropping an idle pooled connection
+            with engine.connect() as connection:
+                dbapi_connection = connection.connection.dbapi_connection
+                if engine.dialect.name == 'postgresql':
+                    pid = connection.execute(db.text('SELECT pg_backend_pid()')).scalar()
+
+            if engine.dialect.name == 'postgresql':
+                killer = create_engine(engine.url, poolclass=NullPool)
+                with killer.connect() as connection:
+                    connection.execute(db.text('SELECT pg_terminate_backend(:pid)'), {'pid': pid})
+                killer.dispose()
+            else:
+                # SQLite stand-in: close the idle DBAPI connection directly
+                dbapi_connection.close()
+
+            # The next checkout must transparently reconnect (pool_pre_ping)
+            with engine.connect() as connection:
+                result = connection.execute(db.text('SELECT 1')).scalar()
+
+            if result == 1 and db_connect_stats['invalidated'] > invalidated_before:
+                print("✅ Dropped connection detected and replaced")
+                return True
+            else:
+                print("❌ Dropped connection was not detected by the pool")
+                return False
+    except Exception as e:
+        print(f"❌ Dropped connection error: {e}")
+        return False
+
+def test_migration_rerun():
+    """Test that running the SQLite migration twice copies every row once"""
+    print("Testing migration rerun...")
+    try:
+        import sqlite3
+        import shutil
+        import tempfile
+        from datetime import datetime
+        from sqlalchemy import create_engine, MetaData, func, select
+        from main import db
+        from migrate_database import source_tables, table_levels, migrate_table
+
+        workdir = tempfile.mkdtemp()
+        try:
+            source_path = os.path.join(workdir, 'source.db')
+            source = create_engine(f'sqlite:///{source_path}')
+            db.metadata.create_all(source)
+            now = datetime.utcnow()
+            t = db.metadata.tables
+            with source.begin() as connection:
+                connection.execute(t['students'].insert(), [
+                    {'id': 1, 'name': 'Migration Test', 'roll_number': 'MIG1', 'category': 'GEN',
+                     'academic_year': '2024', 'branch': 'CSE', 'revision': 0}])
+                connection.execute(t['transactions'].insert(), [
+                    {'id': i, 'transaction_id': f'TXNMIG{i}', 'student_id': 1, 'amount': 10,
+                     'fee_type': 'Tuition', 'academic_year': '2024'} for i in range(1, 4)])
+                # Tables keyed by something other than an id column
+                connection.execute(t['utr_registry'].insert(), [
+                    {'utr_number': f'UTRMIG{i}', 'transaction_id': i, 'created_at': now} for i in range(1, 4)])
+                connection.execute(t['idempotency_keys'].insert(), [
+                    {'key': f'key-{i}', 'fingerprint': 'f', 'status': 'completed',
+                     'created_at': now, 'expires_at': now} for i in range(2)])
+            source.dispose()
+
+            target = create_engine(f"sqlite:///{os.path.join(workdir, 'target.db')}")
+            db.metadata.create_all(target)
+            metadata = MetaData()
+            metadata.reflect(target)
+            connection = sqlite3.connect(source_path)
+            try:
+                tables = source_tables(connection)
+            finally:
+                connection.close()
+            names = [name for name in tables if name in metadata.tables]
+
+            # The second run must resume past everything the first one copied
+            for _ in range(2):
+                for level in table_levels(metadata, names):
+                    for name in level:
+                        migrate_table(source_path, target, metadata.tables[name], tables[name],
+                                      batch_size=2, use_copy=False)
+
+            expected = {'students': 1, 'transactions': 3, 'utr_registry': 3, 'idempotency_keys': 2}
+            with target.connect() as connection:
+                counts = {name: connection.execute(
+                    select(func.count()).select_from(metadata.tables[name])).scalar() for name in expected}
+            target.dispose()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if counts == expected:
+            print("✅ Rerunning the migration copied no row twice")
+            return True
+        else:
+            print(f"❌ Row counts after two runs: {counts}, expected {expected}")
+            return False
+    except Exception as e:
+        print(f"❌ Migration rerun error: {e}")
+        return False
+
 def main():
     """Main test function"""
     print("🧪 Fee Management System - Deployment Test")
@@ -114,6 +266,9 @@ def main():
         test_imports,
         test_database_connection,
         test_tables_exist,
+        test_query_plans,
+        test_dropped_connections,
+        test_migration_rerun,
         test_basic_operations
     ]
     